@@ -0,0 +1,10 @@
+from .corpus import Corpus, CorpusSpec, generate_corpus
+from .suite import (
+    RULES,
+    BenchmarkResult,
+    benchmark_end_to_end,
+    benchmark_rule,
+    create_context,
+    scaling_curve,
+    scaling_exponent,
+)
@@ -0,0 +1,73 @@
+import sys
+import argparse
+import functools
+
+from mddocformatter import DeploymentStyle
+from .corpus import CorpusSpec
+from .suite import RULES, SUPERLINEAR_EXPONENT, benchmark_end_to_end, benchmark_rule, scaling_curve, scaling_exponent
+
+
+def _counts(value):
+    try:
+        return [int(x) for x in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a comma separated list of whole numbers, got: {}".format(value))
+
+
+def main(argv: list | None = None) -> int:
+    """
+    Run the benchmarks on synthetic corpora of increasing size and print the results, along with how each benchmark
+    scales with the size of the corpus.
+    :param argv: argument list from the command line.
+    :return: 1 if any benchmark scales worse than linearly, otherwise 0.
+    """
+    names = [x.name for x in RULES]
+    parser = argparse.ArgumentParser(description="Benchmark the mddocformatter rules on synthetic documentation.")
+    parser.add_argument("--pages", default=[50, 100, 200, 400], type=_counts, help="The page counts to run with.")
+    parser.add_argument("--depth", default=2, type=int, help="The depth of the directory tree.")
+    parser.add_argument("--page-size", default=4000, type=int, help="The approximate size of each page.")
+    parser.add_argument("--link-density", default=0.02, type=float, help="The fraction of words which are links.")
+    parser.add_argument("--macro-density", default=0.01, type=float, help="The fraction of words which are macros.")
+    parser.add_argument("--glossary-size", default=50, type=int, help="The number of glossary terms.")
+    parser.add_argument("--seed", default=0, type=int, help="The seed used to generate the corpus.")
+    parser.add_argument("--repeat", default=3, type=int, help="The number of repeats, the best time is kept.")
+    parser.add_argument("--rules", default=names, type=lambda x: x.split(","), help="The rules to benchmark.")
+    parser.add_argument("--end-to-end", default=False, action="store_true", help="Also benchmark process_docs.")
+    parser.add_argument("--jobs", default=1, type=int, help="The number of workers for the end-to-end benchmark.")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.rules) - set(names)
+    if unknown:
+        parser.error(f"Unknown rules: {', '.join(sorted(unknown))}, expected some of: {', '.join(names)}")
+
+    spec = CorpusSpec(
+        depth=args.depth,
+        page_size=args.page_size,
+        link_density=args.link_density,
+        macro_density=args.macro_density,
+        glossary_size=args.glossary_size,
+        seed=args.seed,
+    )
+    benchmarks = [functools.partial(benchmark_rule, x, repeat=args.repeat) for x in RULES if x.name in args.rules]
+    if args.end_to_end:
+        benchmarks.append(
+            functools.partial(
+                benchmark_end_to_end, style=DeploymentStyle.CONFLUENCE, repeat=args.repeat, jobs=args.jobs
+            )
+        )
+
+    print(f"{spec}, with page counts: {args.pages}")
+    superlinear = False
+    for benchmark in benchmarks:
+        results = scaling_curve(benchmark, spec, args.pages)
+        for result in results:
+            print(result)
+        exponent = scaling_exponent(results)
+        superlinear = superlinear or exponent > SUPERLINEAR_EXPONENT
+        warning = "  <-- grows faster than linearly" if exponent > SUPERLINEAR_EXPONENT else ""
+        print(f"{results[0].name} scaling exponent: {exponent:.2f}{warning}\n")
+    return 1 if superlinear else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
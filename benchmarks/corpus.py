@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import os
+import random
+
+from pathlib import Path
+from urllib.parse import quote
+from typing import Dict, List
+from mddocformatter import FunctionMacro
+
+N_CONST_MACROS = 10
+WORDS = (
+    "the documentation describes how a system is configured and deployed along with the reasons behind each choice "
+    "which keeps readers informed while they work through every step of the process in order"
+).split()
+
+
+def badge(name: str) -> str:
+    """A function macro used by the generated pages."""
+    return f"![{name}](<badges/{name}.svg>)"
+
+
+def version(major: str, minor: str) -> str:
+    """A function macro, with more than one argument, used by the generated pages."""
+    return f"v{major}.{minor}"
+
+
+class CorpusSpec(object):
+    def __init__(
+        self,
+        pages: int = 100,
+        depth: int = 2,
+        page_size: int = 4000,
+        link_density: float = 0.02,
+        macro_density: float = 0.01,
+        glossary_size: int = 50,
+        seed: int = 0,
+    ):
+        """
+        The shape of a synthetic documentation tree.
+        :param pages: The number of pages, not counting the glossary.
+        :param depth: How many levels of directories the pages are spread over.
+        :param page_size: The approximate size of each page in characters.
+        :param link_density: The fraction of words which are links to other pages.
+        :param macro_density: The fraction of words which are macros.
+        :param glossary_size: The number of terms in the glossary.
+        :param seed: The seed for the random choices, the same spec always generates the same corpus.
+        """
+        self.pages = pages
+        self.depth = depth
+        self.page_size = page_size
+        self.link_density = link_density
+        self.macro_density = macro_density
+        self.glossary_size = glossary_size
+        self.seed = seed
+
+    def __repr__(self) -> str:
+        return f"CorpusSpec({', '.join(f'{k}={v!r}' for k, v in vars(self).items())})"
+
+
+class Corpus(object):
+    def __init__(self, spec: CorpusSpec, documents: Dict[str, str]):
+        """
+        A generated documentation tree, held in memory.
+        :param spec: The spec it was generated from.
+        :param documents: The contents of each document, by its posix path relative to the root of the tree.
+        """
+        self.spec = spec
+        self.documents = documents
+        self.const_macros = {f"const_{i}": f"constant value {i}" for i in range(N_CONST_MACROS)}
+        self.function_macros: Dict[str, FunctionMacro] = {"badge": badge, "version": version}
+
+    @property
+    def size(self) -> int:
+        """:return: The total size of the documents in characters."""
+        return sum(len(x) for x in self.documents.values())
+
+    def write(self, root: Path):
+        """
+        Write the documents to disk.
+        :param root: The directory to write the tree under.
+        """
+        for name, contents in self.documents.items():
+            path = root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w") as fd:
+                fd.write(contents)
+
+
+def _directories(depth: int, branching: int = 3) -> List[str]:
+    directories, level = [""], [""]
+    for d in range(depth):
+        level = [f"{parent}area {d}-{i}/" for parent in level for i in range(branching)]
+        directories.extend(level)
+    return directories
+
+
+def _glossary(terms: List[str]) -> str:
+    lines = ["# Glossary"]
+    for i, term in enumerate(terms):
+        lines.extend([f"### {term}", f"__*Synonyms: {term} alias, alt {i}*__", f"The definition of {term}.", ""])
+    return "\n".join(lines)
+
+
+class _PageWriter(object):
+    def __init__(self, spec: CorpusSpec, rng: random.Random, names: List[str], terms: List[str]):
+        self.spec = spec
+        self.rng = rng
+        self.names = names
+        self.terms = terms
+
+    def _link(self, source: str) -> str:
+        target = self.rng.choice(self.names)
+        relative = os.path.relpath(target, os.path.dirname(source) or ".").replace("\\", "/")
+        section = "#section 1" if self.rng.random() < 0.3 else ""
+        if self.rng.random() < 0.5:
+            return f"[{self.rng.choice(WORDS)}]({quote(relative + section)})"
+        return f"[{self.rng.choice(WORDS)}](<{relative}{section}>)"
+
+    def _macro(self) -> str:
+        choice = self.rng.random()
+        if choice < 0.6:
+            return f"${{const_{self.rng.randrange(N_CONST_MACROS)}}}"
+        elif choice < 0.8:
+            return f"${{badge({self.rng.choice(WORDS)})}}"
+        return f"${{version({self.rng.randrange(5)}, {self.rng.randrange(10)})}}"
+
+    def _word(self, source: str) -> str:
+        choice = self.rng.random()
+        if choice < self.spec.link_density:
+            return self._link(source)
+        choice -= self.spec.link_density
+        if choice < self.spec.macro_density:
+            return self._macro()
+        choice -= self.spec.macro_density
+        if self.terms and choice < 0.01:
+            return self.rng.choice(self.terms)
+        return self.rng.choice(WORDS)
+
+    def page(self, index: int, source: str) -> str:
+        lines = [f"# Page {index}", "${create_table_of_contents}", ""]
+        size, section = 0, 0
+        while size < self.spec.page_size:
+            if self.rng.random() < 0.15:
+                section += 1
+                line = f"{'#' * self.rng.randint(2, 4)} Section {section}"
+            elif self.rng.random() < 0.05:
+                line = f"```\ncode with ${{const_0}} and [a link]({self.names[0]})\n```"
+            else:
+                line = " ".join(self._word(source) for _ in range(self.rng.randint(20, 60))) + "."
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines) + "\n"
+
+
+def generate_corpus(spec: CorpusSpec) -> Corpus:
+    """
+    Generate a synthetic documentation tree, with headings, code blocks, links, macros and glossary terms.
+    :param spec: The shape of the tree.
+    :return: The corpus.
+    """
+    rng = random.Random(spec.seed)
+    directories = _directories(spec.depth)
+    names = [f"{directories[i % len(directories)]}page {i}.md" for i in range(spec.pages)]
+    terms = [f"term {i}" for i in range(spec.glossary_size)]
+    writer = _PageWriter(spec, rng, names, terms)
+    documents = {name: writer.page(i, name) for i, name in enumerate(names)}
+    if terms:
+        documents["glossary.md"] = _glossary(terms)
+    return Corpus(spec, documents)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import math
+import time
+import tempfile
+
+from pathlib import Path
+from typing import Callable, List, Sequence
+from mddocformatter import DeploymentStyle, Document, DocumentRule, ProcessingContext, ProcessingSettings, rules
+from mddocformatter import process_docs
+from mddocformatter._execution import DispatchPlan
+from .corpus import Corpus, CorpusSpec, generate_corpus
+
+# Where the in-memory corpus pretends to live, it is never read from or written to.
+CORPUS_ROOT = Path("benchmark corpus").resolve()
+# A scaling exponent above this suggests a rule's cost is growing faster than linearly with the size of the input.
+SUPERLINEAR_EXPONENT = 1.5
+
+RULES: List[DocumentRule] = [
+    rules.add_glossary_links,
+    rules.apply_macros,
+    rules.santize_internal_links,
+    rules.create_table_of_contents,
+    rules.rename_uniquely_for_confluence,
+    rules.fused_toc_and_macros,
+    rules.fused_links_and_glossary,
+]
+
+
+class BenchmarkResult(object):
+    def __init__(self, name: str, pages: int, size: int, seconds: float):
+        """
+        The best time from a number of repeats of a benchmark.
+        :param name: The name of what was benchmarked.
+        :param pages: The number of pages processed.
+        :param size: The total size of the pages, in characters.
+        :param seconds: The time taken.
+        """
+        self.name = name
+        self.pages = pages
+        self.size = size
+        self.seconds = seconds
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else math.inf
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.size / 1e6 / self.seconds if self.seconds else math.inf
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<32} {self.pages:>7} pages {self.size / 1e6:>8.2f}MB {self.seconds * 1000:>10.1f}ms "
+            f"{self.pages_per_second:>10.0f} pages/s {self.mb_per_second:>8.2f}MB/s"
+        )
+
+
+def create_context(corpus: Corpus, rule_set: Sequence[DocumentRule] = ()) -> ProcessingContext:
+    """
+    Create a context holding the documents of a corpus in memory.
+    :param corpus: The corpus.
+    :param rule_set: The rules for the context's settings.
+    :return: The context.
+    """
+    settings = ProcessingSettings(
+        CORPUS_ROOT,
+        CORPUS_ROOT.parent / "benchmark output",
+        "bench",
+        list(rule_set),
+        corpus.const_macros,
+        corpus.function_macros,
+    )
+    context = ProcessingContext(settings)
+    for name, contents in corpus.documents.items():
+        context.add_document(Document(CORPUS_ROOT / name, contents))
+    return context
+
+
+def benchmark_rule(rule: DocumentRule, corpus: Corpus, repeat: int = 3) -> BenchmarkResult:
+    """
+    Time a single rule applied to every document in a corpus it applies to, each repeat using a new context. The
+    documents are matched against the rule's file filter before timing starts, as they are when processing, so only
+    the rule's own work, including preparing it, is timed.
+    :param rule: The rule.
+    :param corpus: The corpus.
+    :param repeat: The number of times to run the benchmark, the best time is kept.
+    :return: The result.
+    """
+    best = math.inf
+    for _ in range(repeat):
+        context = create_context(corpus, [rule])
+        plan = DispatchPlan([rule], context.documents.values())
+        documents = [x for x in context.documents.values() if plan.rules_for(rule.pass_index, x)]
+        start = time.perf_counter()
+        if rule.prepare is not None:
+            rule.prepare(context)
+        for document in documents:
+            rule.apply(context, document)
+        best = min(best, time.perf_counter() - start)
+    return BenchmarkResult(rule.name, len(corpus.documents), corpus.size, best)
+
+
+def benchmark_end_to_end(
+    corpus: Corpus, style: DeploymentStyle = DeploymentStyle.CONFLUENCE, repeat: int = 3, jobs: int = 1
+) -> BenchmarkResult:
+    """
+    Time process_docs on a corpus written to disk, including discovery, loading and saving.
+    :param corpus: The corpus.
+    :param style: The style whose rules are used.
+    :param repeat: The number of times to run the benchmark, the best time is kept.
+    :param jobs: The number of workers to process with.
+    :return: The result.
+    """
+    best = math.inf
+    with tempfile.TemporaryDirectory(prefix="mddocformatter-bench") as tempdir:
+        input_dir = Path(tempdir) / "docs"
+        corpus.write(input_dir)
+        for i in range(repeat):
+            rule_set = rules.GetRulesForStyle(style)
+            start = time.perf_counter()
+            process_docs(
+                input_dir,
+                Path(tempdir) / f"output {i}",
+                rule_set,
+                corpus.const_macros,
+                corpus.function_macros,
+                "bench",
+                jobs=jobs,
+            )
+            best = min(best, time.perf_counter() - start)
+    return BenchmarkResult(f"end to end ({style.value}, jobs={jobs})", len(corpus.documents), corpus.size, best)
+
+
+def scaling_curve(
+    benchmark: Callable[[Corpus], BenchmarkResult], spec: CorpusSpec, page_counts: Sequence[int]
+) -> List[BenchmarkResult]:
+    """
+    Run a benchmark on corpora of increasing size, which are otherwise the same shape.
+    :param benchmark: The benchmark to run on each corpus.
+    :param spec: The shape of the corpora, the number of pages is replaced by each of the page counts.
+    :param page_counts: The number of pages in each corpus.
+    :return: The result for each corpus.
+    """
+    results = []
+    for pages in page_counts:
+        sized = CorpusSpec(**{**vars(spec), "pages": pages})
+        results.append(benchmark(generate_corpus(sized)))
+    return results
+
+
+def scaling_exponent(results: Sequence[BenchmarkResult]) -> float:
+    """
+    Estimate how the time taken grows with the size of the input, i.e. k where time is proportional to size^k, from a
+    least squares fit on a log-log scale. Roughly 1 for linear and 2 for quadratic.
+    :param results: The results of a scaling curve.
+    :return: The exponent, or nan if there aren't enough distinct results to fit.
+    """
+    points = [(math.log(x.size), math.log(x.seconds)) for x in results if x.size > 0 and x.seconds > 0]
+    if len({x for x, _ in points}) < 2:
+        return math.nan
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return covariance / variance
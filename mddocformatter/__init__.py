@@ -3,8 +3,19 @@ from . import rules
 from . import loading as loading
 from .rules import DocumentRule, document_rule
 from ._processing import ProcessingSettings, ProcessingContext, process_docs, validate_docs
+from ._watch import Watcher, WatchChanges, watch_docs
+from ._tracing import Tracer, trace, trace_to
+from ._bench import BenchResult, Slowdown, bench_docs, compare_results, run_bench
 from ._document import Document
-from ._consts import DeploymentStyle, FunctionMacro, Passes
+from ._saving import SaveReport, save_documents
+from ._reading import LoadReport, read_documents
+from ._validation import ValidationReport, diff_documents, is_unchanged, validate_documents
+from ._discovery import DocumentScanner, IgnoreRules, discover_documents
+from ._spans import AnchorIndex, SpanIndex
+from ._macros import MacroStatistics, impure_macro
+from ._execution import RuleStatistics
+from ._scheduling import RuleScheduler
+from ._consts import DeploymentStyle, ExecutionBackend, FunctionMacro, Passes, RuleData, SpanType
 
 
 _logging.getLogger(__name__).addHandler(_logging.NullHandler())
@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+class AhoCorasick(object):
+    def __init__(self, patterns: Sequence[str]):
+        """
+        A multi-pattern string matcher which finds every occurrence of every pattern in a text in a single pass over
+        it, regardless of the number of patterns.
+        :param patterns: The strings to search for. Empty patterns are ignored.
+        """
+        self.patterns = list(patterns)
+        self._transitions: List[Dict[str, int]] = [{}]
+        self._failures: List[int] = [0]
+        self._outputs: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(self.patterns):
+            if pattern:
+                self._add_pattern(index, pattern)
+        self._build_failures()
+
+    def _add_pattern(self, index: int, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._transitions[state].get(char, None)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions[state][char] = next_state
+                self._transitions.append({})
+                self._failures.append(0)
+                self._outputs.append(())
+            state = next_state
+        self._outputs[state] += (index,)
+
+    def _build_failures(self):
+        queue = deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._transitions[state].items():
+                queue.append(next_state)
+                failure = self._failures[state]
+                while failure and char not in self._transitions[failure]:
+                    failure = self._failures[failure]
+                self._failures[next_state] = self._transitions[failure].get(char, 0)
+                self._outputs[next_state] += self._outputs[self._failures[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Find all occurrences of the patterns in a text, including overlapping ones.
+        :param text: The text to search.
+        :return: An iterator of (start index, pattern index) tuples, ordered by the end index of each occurrence.
+        """
+        transitions, failures, outputs, patterns = self._transitions, self._failures, self._outputs, self.patterns
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(char, 0)
+            for index in outputs[state]:
+                yield i + 1 - len(patterns[index]), index
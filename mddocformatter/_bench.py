@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+import logging
+import tempfile
+
+from pathlib import Path
+from typing import Dict, List
+from ._consts import FunctionMacro, BENCH_FORMAT_VERSION, BENCH_SIGNIFICANCE, BENCH_THRESHOLD
+from ._processing import _process_docs
+
+
+logger = logging.getLogger(__name__)
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _variance(values: List[float]) -> float:
+    if len(values) < 2:
+        return 0.0
+    mean = _mean(values)
+    return sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+
+class BenchResult(object):
+    def __init__(
+        self,
+        documents: int = 0,
+        phases: Dict[str, List[float]] | None = None,
+        rules: Dict[str, List[float]] | None = None,
+    ):
+        """
+        The timings from a number of runs over the same documentation.
+        :param documents: The number of documents processed in each run.
+        :param phases: The wall time in seconds of each phase, e.g. "discovery", "pass first" or "total", for each run.
+        :param rules: The time in seconds spent in each rule, summed over all documents, for each run.
+        """
+        self.documents = documents
+        self.phases: Dict[str, List[float]] = phases or {}
+        self.rules: Dict[str, List[float]] = rules or {}
+
+    @property
+    def runs(self) -> int:
+        """:return: The number of runs recorded."""
+        return len(self.phases.get("total", []))
+
+    def add_run(self, documents: int, phases: Dict[str, float], rules: Dict[str, float]):
+        """
+        Record the timings from a run.
+        :param documents: The number of documents processed.
+        :param phases: The time spent in each phase.
+        :param rules: The time spent in each rule.
+        """
+        self.documents = documents
+        for table, timings in ((self.phases, phases), (self.rules, rules)):
+            for name, seconds in timings.items():
+                table.setdefault(name, []).append(seconds)
+
+    def to_json(self) -> dict:
+        return {
+            "version": BENCH_FORMAT_VERSION,
+            "documents": self.documents,
+            "phases": self.phases,
+            "rules": self.rules,
+        }
+
+    @staticmethod
+    def from_json(data: dict) -> BenchResult:
+        if data.get("version", None) != BENCH_FORMAT_VERSION:
+            raise ValueError(f"Unsupported bench result version: {data.get('version', None)}")
+        return BenchResult(data["documents"], data["phases"], data["rules"])
+
+    def save(self, path: Path):
+        """
+        Write the result to a JSON file.
+        :param path: The file to write.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as fd:
+            json.dump(self.to_json(), fd, indent=2)
+
+    @staticmethod
+    def load(path: Path) -> BenchResult:
+        """
+        Read a result from a JSON file written by save.
+        :param path: The file to read.
+        :return: The result.
+        """
+        with open(path, "r") as fd:
+            return BenchResult.from_json(json.load(fd))
+
+    def summary(self) -> List[str]:
+        """:return: A line giving the mean and spread of each timing, phases first, then rules."""
+        lines = []
+        for kind, table in (("phase", self.phases), ("rule", self.rules)):
+            for name, values in table.items():
+                spread = math.sqrt(_variance(values))
+                lines.append(f"{kind} {name}: {_mean(values) * 1000:.2f}ms +/- {spread * 1000:.2f}ms")
+        return lines
+
+
+class Slowdown(object):
+    def __init__(self, name: str, baseline: float, current: float, t: float):
+        """
+        A timing which got significantly slower than the baseline.
+        :param name: The name of the timing, e.g. "phase total" or "rule apply_macros".
+        :param baseline: The mean time in the baseline, in seconds.
+        :param current: The mean time now, in seconds.
+        :param t: Welch's t statistic for the difference, inf when neither side varies between runs.
+        """
+        self.name = name
+        self.baseline = baseline
+        self.current = current
+        self.t = t
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else math.inf
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.baseline * 1000:.2f}ms -> {self.current * 1000:.2f}ms "
+            f"({(self.ratio - 1) * 100:+.1f}%, t={self.t:.2f})"
+        )
+
+
+def _welch_t(baseline: List[float], current: List[float]) -> float:
+    difference = _mean(current) - _mean(baseline)
+    error = math.sqrt(_variance(baseline) / len(baseline) + _variance(current) / len(current))
+    if error == 0.0:
+        return math.copysign(math.inf, difference) if difference else 0.0
+    return difference / error
+
+
+def compare_results(
+    current: BenchResult,
+    baseline: BenchResult,
+    threshold: float = BENCH_THRESHOLD,
+    significance: float = BENCH_SIGNIFICANCE,
+) -> List[Slowdown]:
+    """
+    Find the timings which are slower than the baseline by more than noise. A timing is flagged when its mean is more
+    than threshold slower, relative to the baseline, and Welch's t statistic for the difference is above significance,
+    which approximates a one sided test at the 95% level for a handful of runs.
+    :param current: The new result.
+    :param baseline: The result to compare against.
+    :param threshold: The smallest relative slowdown worth reporting, e.g. 0.05 for 5%.
+    :param significance: The t statistic above which a difference is taken to be real.
+    :return: The slowdowns found, the largest relative slowdown first.
+    """
+    slowdowns = []
+    for kind, tables in (("phase", (current.phases, baseline.phases)), ("rule", (current.rules, baseline.rules))):
+        now, before = tables
+        for name in now.keys() & before.keys():
+            if not now[name] or not before[name]:
+                continue
+            mean_now, mean_before = _mean(now[name]), _mean(before[name])
+            t = _welch_t(before[name], now[name])
+            if mean_now > mean_before * (1.0 + threshold) and t > significance:
+                slowdowns.append(Slowdown(f"{kind} {name}", mean_before, mean_now, t))
+    return sorted(slowdowns, key=lambda x: (-x.ratio, x.name))
+
+
+def run_bench(
+    input_dir: Path,
+    rule_set: list,
+    const_macros: Dict[str, str] | None = None,
+    function_macros: Dict[str, FunctionMacro] | None = None,
+    version_name: str = "",
+    jobs: int = 1,
+    runs: int = 5,
+) -> BenchResult:
+    """
+    Process the documentation a number of times and record how long each phase and rule takes. Nothing is written to
+    the input directory, the save phase is timed by saving to a temporary directory which is then discarded.
+    :param input_dir: The root of the documentation tree.
+    :param rule_set: The rules to run on each doc.
+    :param const_macros: A table of const value macros.
+    :param function_macros: A table of function macros which take 0 or more strings as args and returns a string.
+    :param version_name: The name of the version of the documentation.
+    :param jobs: The number of workers to spread the processing over.
+    :param runs: The number of times to process the documentation.
+    :return: The timings from every run.
+    """
+    result = BenchResult()
+    for i in range(runs):
+        with tempfile.TemporaryDirectory(prefix="mddocformatter-bench") as output_dir:
+            start = time.perf_counter()
+            context, _ = _process_docs(
+                input_dir,
+                Path(output_dir),
+                list(rule_set),
+                const_macros,
+                function_macros,
+                version_name,
+                jobs,
+                preload=True,
+            )
+            context.save()
+            context.add_timing("total", time.perf_counter() - start)
+        result.add_run(len(context.documents), context.timings, context.rule_timings)
+        logger.info(f"Bench run {i + 1} of {runs}: {context.timings['total'] * 1000:.2f}ms")
+    return result
+
+
+def bench_docs(
+    input_dir: Path,
+    rule_set: list,
+    const_macros: Dict[str, str] | None = None,
+    function_macros: Dict[str, FunctionMacro] | None = None,
+    version_name: str = "",
+    jobs: int = 1,
+    runs: int = 5,
+    output_path: Path | None = None,
+    baseline_path: Path | None = None,
+    threshold: float = BENCH_THRESHOLD,
+) -> bool:
+    """
+    Benchmark the processing of the documentation in the input_dir, without changing it, and optionally compare the
+    result with a baseline from an earlier bench.
+    :param input_dir: The root of the documentation tree.
+    :param rule_set: The rules to run on each doc.
+    :param const_macros: A table of const value macros.
+    :param function_macros: A table of function macros which take 0 or more strings as args and returns a string.
+    :param version_name: The name of the version of the documentation.
+    :param jobs: The number of workers to spread the processing over.
+    :param runs: The number of times to process the documentation.
+    :param output_path: Where to write the result as JSON, which can be used as the baseline for a later bench.
+    :param baseline_path: A result to compare against.
+    :param threshold: The smallest relative slowdown to report, e.g. 0.05 for 5%.
+    :return: True unless something got significantly slower than the baseline.
+    """
+    result = run_bench(input_dir, rule_set, const_macros, function_macros, version_name, jobs, runs)
+    summary = "\n    - ".join(result.summary())
+    logging.info(f"Bench of {result.documents} documents over {result.runs} runs: \n    - {summary}")
+    if output_path is not None:
+        result.save(output_path)
+        logging.info(f"Bench result written to {output_path}")
+    if baseline_path is None:
+        return True
+    slowdowns = compare_results(result, BenchResult.load(baseline_path), threshold)
+    if slowdowns:
+        slowdowns_list = "\n    - ".join(str(x) for x in slowdowns)
+        logging.warning(f"Significantly slower than the baseline {baseline_path}: \n    - {slowdowns_list}")
+        return False
+    logging.info(f"No significant slowdowns compared to the baseline {baseline_path}.")
+    return True
@@ -24,15 +24,79 @@ class Passes(Enum):
     FINALIZE = 2
 
 
+class ExecutionBackend(Enum):
+    """
+    The type of worker pool used to run the passes when processing with more than one job. SCHEDULED doesn't wait for
+    every document to finish a pass before starting the next, but runs each rule on a thread pool as soon as the data it
+    reads is ready, see: RuleScheduler.
+    """
+
+    PROCESS = "process"
+    THREAD = "thread"
+    SCHEDULED = "scheduled"
+
+
+class RuleData(Enum):
+    """
+    The data a rule reads or writes, which the scheduler orders the rules by. A rule only writes the document it's run
+    on, but may read other documents: the contents or target paths of the documents it links to, or the glossary's
+    target path.
+    """
+
+    CONTENTS = "contents"
+    TARGET_PATH = "target_path"
+    LINKED_CONTENTS = "linked_contents"
+    LINKED_TARGET_PATHS = "linked_target_paths"
+    GLOSSARY = "glossary"
+
+
+class SpanType(Enum):
+    """
+    The types of region, in the contents of a markdown document, that are tracked by a document's span index.
+    """
+
+    LINK = "link"
+    CODE_FENCE = "code_fence"
+    INLINE_CODE = "inline_code"
+    HEADING = "heading"
+
+
 P = ParamSpec("P")
 FunctionMacro = Callable[P, str]
 
 
-regex_const_macro = re.compile(r"\${([\w]+)}")
-regex_function_macro = re.compile(r"\${([\w]+)\(([\w\s,]*)\)}")
+regex_macro_start = re.compile(r"\${")
+regex_macro_name = re.compile(r"\w+")
+regex_macro_args = re.compile(r"[\w\s,]*")
 regex_markdown_link = re.compile(r"\[(.+?)\]\([<]*(.+?)[>]*\)")
 regex_markdown_link_with_subsection = re.compile(r"\[(.+?)\]\([<]*(.+?[^>])#+(.*?)[>]*\)")
 regex_glossary_synonyms = re.compile(r"synonyms: ([\w\s,]+)", re.IGNORECASE)
 
 
+GLOSSARY_DOCUMENT_NAME = "glossary.md"
+
 N_CONTEXT_LINES_IN_DIFF = 3
+N_CHUNKS_PER_JOB = 4
+N_NAME_INDEX_TIERS = 8
+N_CACHED_RELATIVE_LINKS = 65536
+
+WATCH_INTERVAL = 0.25
+WATCH_DEBOUNCE = 0.1
+
+BENCH_FORMAT_VERSION = 1
+# A slowdown must be at least this much, relative to the baseline, and have at least this t statistic to be reported.
+BENCH_THRESHOLD = 0.05
+BENCH_SIGNIFICANCE = 2.0
+
+CACHE_DIRECTORY_NAME = ".mddocformatter"
+# Directories which never hold documentation, so discovery doesn't enter them.
+IGNORED_DIRECTORY_NAMES = (".git", ".hg", ".svn", "node_modules", "__pycache__", CACHE_DIRECTORY_NAME)
+IGNORE_FILE_NAMES = (".gitignore", ".mdignore")
+DISCOVERY_JOBS = 8
+SAVE_JOBS = 8
+LOAD_JOBS = 8
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# The name, in a macros or rules module loaded from a file, of the hash of the module's source.
+SOURCE_HASH_NAME = "__source_hash__"
+GLOSSARY_CACHE_DIRECTORY_NAME = "glossary"
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import os
+import re
+import logging
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set, Tuple
+from ._consts import DISCOVERY_JOBS, IGNORED_DIRECTORY_NAMES, IGNORE_FILE_NAMES
+
+
+logger = logging.getLogger(__name__)
+
+# Identifies a file or directory regardless of the path it's reached by, i.e. through a symlink.
+FileKey = Tuple[int, int]
+
+
+def _translate_pattern(pattern: str) -> str:
+    """:return: A regex matching the same paths, relative to the ignore file's directory, as a gitignore pattern."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    parts = [] if anchored else ["(?:.*/)?"]
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        elif c == "*":
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                parts.append("[^" + body[1:] + "]" if body[0] in "!^" else "[" + body + "]")
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    # Matching a directory also matches everything in it.
+    return "".join(parts) + "(?:/.*)?"
+
+
+class IgnoreRules(object):
+    def __init__(self, base: str, lines: Iterable[str]):
+        """
+        The patterns from a .gitignore style file: blank lines and # comments are skipped, ! re-includes what an
+        earlier pattern excluded, a trailing / only matches directories, and a pattern with any other / is relative to
+        the directory of the file rather than matching at any depth. The last pattern to match a path wins.
+        :param base: The directory of the ignore file, as a posix path relative to the root being scanned, "" for the
+                     root itself.
+        :param lines: The lines of the ignore file.
+        """
+        self.base = base
+        self.patterns: List[Tuple[re.Pattern, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n\r")
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip(" ")
+            negated = line.startswith("!")
+            line = line[1:] if negated else line
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                self.patterns.append((re.compile(_translate_pattern(line)), negated, directory_only))
+
+    @staticmethod
+    def load(path: Path, base: str) -> IgnoreRules:
+        """
+        Read an ignore file.
+        :param path: The ignore file.
+        :param base: The directory of the ignore file, relative to the root being scanned.
+        :return: The rules.
+        """
+        with open(path, "r", encoding="utf-8", errors="replace") as fd:
+            return IgnoreRules(base, fd.readlines())
+
+    def match(self, relative_path: str, is_directory: bool) -> bool | None:
+        """
+        :param relative_path: A posix path relative to the root being scanned.
+        :param is_directory: Whether the path is a directory.
+        :return: True if the path is ignored, False if it's explicitly re-included and None if no pattern matches.
+        """
+        if self.base:
+            if not relative_path.startswith(self.base + "/"):
+                return None
+            relative_path = relative_path[len(self.base) + 1 :]
+        result = None
+        for pattern, negated, directory_only in self.patterns:
+            if (is_directory or not directory_only) and pattern.fullmatch(relative_path):
+                result = not negated
+        return result
+
+
+def is_ignored(rules: Iterable[IgnoreRules], relative_path: str, is_directory: bool) -> bool:
+    """
+    :param rules: The rules which apply to the path, outermost directory first.
+    :param relative_path: A posix path relative to the root being scanned.
+    :param is_directory: Whether the path is a directory.
+    :return: True if the last rule to match the path ignores it.
+    """
+    ignored = False
+    for x in rules:
+        result = x.match(relative_path, is_directory)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+class _Listing(object):
+    def __init__(self, directory: Path, relative: str):
+        self.directory = directory
+        self.relative = relative
+        self.files: List[Tuple[str, FileKey]] = []
+        self.directories: List[Tuple[str, FileKey]] = []
+        self.rules: List[IgnoreRules] = []
+
+
+class DocumentScanner(object):
+    def __init__(
+        self,
+        root: Path,
+        excluded: Iterable[Path] = (),
+        ignored_directory_names: Iterable[str] = IGNORED_DIRECTORY_NAMES,
+        ignore_file_names: Iterable[str] = IGNORE_FILE_NAMES,
+        jobs: int = DISCOVERY_JOBS,
+    ):
+        """
+        Finds the files under a directory. Directories are listed with os.scandir on a pool of threads, ahead of the
+        walk reaching them, while the files are yielded in the same order every time: each directory's files, sorted
+        by name, and then its subdirectories. Files and directories reached more than once through symlinks are only
+        yielded once.
+        :param root: The directory to scan.
+        :param excluded: Paths to leave out along with everything under them, e.g. the output directory.
+        :param ignored_directory_names: Directories with these names are never entered, e.g. .git.
+        :param ignore_file_names: Files holding .gitignore style patterns for their directory and its subdirectories.
+        :param jobs: The number of threads listing directories.
+        """
+        self.root = root
+        self.excluded = {x for x in excluded if x != root}
+        self.ignored_directory_names = set(ignored_directory_names)
+        self.ignore_file_names = list(ignore_file_names)
+        self.jobs = max(1, jobs)
+
+    def _list(self, directory: Path, relative: str) -> _Listing:
+        listing = _Listing(directory, relative)
+        try:
+            device = os.stat(directory).st_dev
+            with os.scandir(directory) as entries:
+                for entry in sorted(entries, key=lambda x: x.name):
+                    try:
+                        if entry.is_dir():
+                            stat = entry.stat()
+                            listing.directories.append((entry.name, (stat.st_dev, stat.st_ino)))
+                        elif entry.is_file():
+                            if entry.is_symlink():
+                                stat = entry.stat()
+                                listing.files.append((entry.name, (stat.st_dev, stat.st_ino)))
+                            else:
+                                listing.files.append((entry.name, (device, entry.inode())))
+                    except OSError:
+                        logger.warning(f"Unable to read {entry.path}, skipping it.")
+        except OSError:
+            logger.warning(f"Unable to list {directory}, skipping it.")
+        names = {x for x, _ in listing.files}
+        for name in self.ignore_file_names:
+            if name in names:
+                try:
+                    listing.rules.append(IgnoreRules.load(directory / name, relative))
+                except OSError:
+                    logger.warning(f"Unable to read {directory / name}, its patterns are ignored.")
+        return listing
+
+    def _skip_directory(self, name: str, path: Path) -> bool:
+        return name in self.ignored_directory_names or path in self.excluded
+
+    def scan(self) -> Iterator[Path]:
+        """
+        :return: A generator of the paths of the files under the root, which aren't ignored.
+        """
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="mddocformatter-discovery") as pool:
+            seen_directories: Set[FileKey] = set()
+            seen_files: Set[FileKey] = set()
+            root_stat = os.stat(self.root)
+            seen_directories.add((root_stat.st_dev, root_stat.st_ino))
+            pending: List[Tuple[Future[_Listing], Tuple[IgnoreRules, ...]]] = [
+                (pool.submit(self._list, self.root, ""), ())
+            ]
+            while pending:
+                future, inherited = pending.pop()
+                listing = future.result()
+                rules = inherited + tuple(listing.rules)
+                prefix = listing.relative + "/" if listing.relative else ""
+                for name, key in listing.files:
+                    if key in seen_files or is_ignored(rules, prefix + name, False):
+                        continue
+                    seen_files.add(key)
+                    yield listing.directory / name
+                children = []
+                for name, key in listing.directories:
+                    path = listing.directory / name
+                    if key in seen_directories or self._skip_directory(name, path):
+                        continue
+                    if is_ignored(rules, prefix + name, True):
+                        continue
+                    seen_directories.add(key)
+                    children.append((pool.submit(self._list, path, prefix + name), rules))
+                pending.extend(reversed(children))
+
+
+def discover_documents(root: Path, excluded: Iterable[Path] = (), jobs: int = DISCOVERY_JOBS) -> Iterator[Path]:
+    """
+    Find the documents under a directory, skipping the directories which never hold documentation, e.g. .git and
+    node_modules, and anything matched by a .gitignore or .mdignore file.
+    :param root: The root of the documentation tree.
+    :param excluded: Paths to leave out along with everything under them, e.g. the output directory.
+    :param jobs: The number of threads listing directories.
+    :return: A generator of the paths of the documents.
+    """
+    return DocumentScanner(root, excluded, jobs=jobs).scan()
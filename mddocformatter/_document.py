@@ -1,33 +1,212 @@
+from __future__ import annotations
+
+import os
+import re
 import difflib
+import threading
 
 from pathlib import Path
+from typing import Iterator, List, Tuple
 from ._consts import N_CONTEXT_LINES_IN_DIFF
+from ._spans import SpanIndex
+from ._tracing import trace
 
 
 class Document(object):
-    def __init__(self, input_path: Path, data: str = ""):
+    def __init__(self, input_path: Path, data: str | None = ""):
         """
         Holds a file, referenced by relative_path, and it's contents, for manipulation by document rule_set.
         :param input_path: The relative_path to the input file.
+        :param data: The contents of the document, or None to read them from the input file when they're first used.
         """
         self.input_path: Path = input_path
-        self.target_path: Path = Path(input_path)
-        self._original_contents: str = data
-        self.contents: str = data
+        self._source_path: Path = input_path
+        self._target_parts: Tuple[str, ...] | None = None
+        self.target_path = Path(input_path)
+        self._original_contents: str | None = data
+        # None until the contents are first used, after which it's the same object as the original until changed.
+        self._contents: str | None = data
+        self._spans: SpanIndex | None = None
+        # Guards loading and replacing the contents, which rules on other threads can do to a linked document.
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def target_path(self) -> Path:
+        """
+        :return: The path the document will be saved to.
+        """
+        return self._target_path
+
+    @target_path.setter
+    def target_path(self, value: Path):
+        self._target_path = value
+        self._target_parts = None
+
+    @property
+    def target_parts(self) -> Tuple[str, ...]:
+        """
+        :return: The parts of the target path, split once and kept until the target path is set again, so forming
+                 links to the document doesn't split it every time.
+        """
+        if self._target_parts is None:
+            self._target_parts = self._target_path.parts
+        return self._target_parts
+
+    @property
+    def source_path(self) -> Path:
+        """
+        :return: The file the contents are read from when they're first used, the input file unless restored from
+                 elsewhere, see: restore.
+        """
+        return self._source_path
+
+    def restore(self, path: Path):
+        """
+        Read the contents, when they're first used, from a previous output of the document rather than from the input
+        file, e.g. to reuse the result of an earlier build. Any contents in memory are dropped.
+        :param path: The file to read the contents from.
+        """
+        with self._lock:
+            self._source_path = path
+            self._original_contents = self._contents = self._spans = None
+
+    @property
+    def loaded(self) -> bool:
+        """
+        :return: True if the contents of the document are in memory, i.e. they have been read, set, or were given when
+                 it was created.
+        """
+        return self._contents is not None
+
+    @property
+    def modified(self) -> bool:
+        """
+        :return: True if the contents have been set since the document was loaded. Cheaper than unchanged, but the
+                 contents may have been set to the same value.
+        """
+        return self._contents is not None and self._contents is not self._original_contents
+
+    @property
+    def size(self) -> int:
+        """
+        :return: The length of the contents, or the size of the source file if the contents haven't been read yet.
+        """
+        return len(self.contents) if self.loaded else self._source_path.stat().st_size
+
+    @property
+    def contents(self) -> str:
+        """
+        :return: The current contents of the document.
+        """
+        contents = self._contents
+        if contents is None:
+            original = self.original_contents
+            with self._lock:  # only if nothing has set them since, e.g. a rule on another thread.
+                if self._contents is None:
+                    self._contents = original
+                contents = self._contents
+        return contents
+
+    @contents.setter
+    def contents(self, value: str):
+        with self._lock:
+            self._contents = value
+            self._spans = None
+
+    def release(self):
+        """
+        Drop the contents of the document, e.g. once it has been saved, to free the memory. If they're used again the
+        contents are read from the source file again.
+        """
+        with self._lock:
+            self._original_contents = self._contents = self._spans = None
+
+    @property
+    def spans(self) -> SpanIndex:
+        """
+        :return: The index of the links, code and headings in the current contents, which is built on first use and
+                 rebuilt after the contents change. An index is only used for the contents it was built from, so one
+                 built by another thread from contents which have since been replaced is never used.
+        """
+        contents = self.contents
+        spans = self._spans
+        if spans is None or spans.text is not contents:
+            spans = self._spans = SpanIndex(contents)
+        return spans
+
+    def edit(self) -> DocumentEdit:
+        """
+        Start a batch of edits to the contents, see: DocumentEdit.
+        :return: The edit, which should be used as a context manager so it is committed at the end.
+        """
+        return DocumentEdit(self)
 
     @property
     def original_contents(self) -> str:
         """
-        :return: The contents as it was when the document was first loaded.
+        :return: The contents as it was when the document was first loaded. The input file is read at most once, even
+                 when several threads use the document at the same time.
         """
-        return self._original_contents
+        original = self._original_contents
+        if original is None:
+            with self._lock:
+                if self._original_contents is None:
+                    self._original_contents, _ = self._read()
+                original = self._original_contents
+        return original
+
+    def _read(self) -> Tuple[str, int]:
+        """:return: The contents of the source file, and its size in bytes."""
+        with trace("load_document", "load", path=str(self._source_path)):
+            with open(self._source_path, "r") as fd:
+                size = os.fstat(fd.fileno()).st_size
+                return fd.read(), size
+
+    def load(self) -> int:
+        """
+        Read the contents of the input file now, rather than when they're first used.
+        :return: The number of bytes read, 0 if the contents were already in memory.
+        """
+        if self.loaded:
+            return 0
+        with self._lock:
+            if self._contents is not None:
+                return 0
+            size = 0
+            if self._original_contents is None:
+                self._original_contents, size = self._read()
+            self._contents = self._original_contents
+        return size
 
     @property
     def unchanged(self) -> bool:
         """
         :return: True if the document is currently unchanged compared to its original contents.
         """
-        return self._original_contents == self.contents
+        return not self.modified or self.original_contents == self.contents
+
+    def iter_changes(self, n_context_lines=N_CONTEXT_LINES_IN_DIFF) -> Iterator[str]:
+        """
+        Get the changes between the original content when the document was loaded and the current contents, a line at
+        a time, so a large diff can be written out as it's computed. If there are no changes, nothing is yielded.
+        :param n_context_lines: The number of "context" lines to show above+below a change.
+        :return: A generator of the lines describing the difference, each ending with a newline.
+        """
+        if not self.unchanged:
+            a = self.original_contents.split("\n")
+            b = self.contents.split("\n")
+            for text in difflib.unified_diff(a, b, n=n_context_lines):
+                if text[:3] not in ("+++", "---", "@@ "):
+                    yield text + "\n"
 
     def changes(self, n_context_lines=N_CONTEXT_LINES_IN_DIFF) -> str:
         """
@@ -36,14 +215,78 @@ class Document(object):
         :param n_context_lines: The number of "context" lines to show above+below a change.
         :return: A string describing the difference between the original document contents and the current contents.
         """
+        return "".join(self.iter_changes(n_context_lines))
 
-        if not self.unchanged:
-            a = self._original_contents.split("\n")
-            b = self.contents.split("\n")
-            result = ""
-            for text in difflib.unified_diff(a, b, n=n_context_lines):
-                if text[:3] not in ("+++", "---", "@@ "):
-                    result += text + "\n"
-            return result
-        else:
-            return ""
+
+class DocumentEdit(object):
+    def __init__(self, document: Document):
+        """
+        A batch of replacements in the contents of a document. The contents are scanned, from a cursor, as they were
+        when the edit started and the replacements are only applied, in a single pass, when the edit is committed. This
+        means each edit costs the same as a single replacement, no matter how many spans are replaced. The document's
+        span index still describes the text being scanned until the edit is committed.
+        :param document: The document to edit.
+        """
+        self.document = document
+        self.text: str = document.contents
+        self.pointer: int = 0
+        self._patches: List[Tuple[int, int, str]] = []
+
+    def __enter__(self) -> DocumentEdit:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    @property
+    def changed(self) -> bool:
+        """
+        :return: True if any replacements have been made.
+        """
+        return bool(self._patches)
+
+    def find(self, pattern: re.Pattern) -> re.Match | None:
+        """
+        Find the next match of a pattern, after the cursor, and move the cursor to the end of it.
+        :param pattern: The compiled regular expression to search for.
+        :return: The match, or None if there are no more matches.
+        """
+        match = pattern.search(self.text, self.pointer)
+        if match is not None:
+            self.pointer = max(match.end(), match.start() + 1)
+        return match
+
+    def matches(self, pattern: re.Pattern) -> Iterator[re.Match]:
+        """
+        :param pattern: The compiled regular expression to search for.
+        :return: An iterator over the matches of a pattern, from the cursor to the end of the text.
+        """
+        match = self.find(pattern)
+        while match is not None:
+            yield match
+            match = self.find(pattern)
+
+    def replace(self, start: int, end: int, replacement: str):
+        """
+        Replace a span of the text. Replacements must be made in order and must not overlap.
+        :param start: The start of the span, in the text as it was when the edit started.
+        :param end: The end of the span.
+        :param replacement: The string to replace the span with - does not need to be the same length.
+        """
+        if self._patches and start < self._patches[-1][1]:
+            raise ValueError(f"Replacement of {start}:{end} overlaps, or comes before, a previous replacement.")
+        self._patches.append((start, end, replacement))
+
+    def commit(self):
+        """
+        Apply the replacements to the document. Any further edits apply to the new contents, from the start.
+        """
+        if self._patches:
+            pieces, pointer = [], 0
+            for start, end, replacement in self._patches:
+                pieces.extend([self.text[pointer:start], replacement])
+                pointer = end
+            pieces.append(self.text[pointer:])
+            self.document.contents = "".join(pieces)
+            self.text, self.pointer, self._patches = self.document.contents, 0, []
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import time
+import heapq
+import logging
+import multiprocessing
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple, TYPE_CHECKING
+from ._consts import ExecutionBackend, Passes, N_CHUNKS_PER_JOB
+from ._macros import MacroStatistics, merge_macro_statistics
+from ._tracing import active_tracer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ._document import Document
+    from ._processing import ProcessingContext
+    from .rules import DocumentRule
+
+
+logger = logging.getLogger(__name__)
+
+# The context being processed by a forked worker process, and the plan for it - inherited from the parent when the pool
+# is created.
+_worker_context: ProcessingContext | None = None
+_worker_plan: DispatchPlan | None = None
+
+DocumentUpdate = Tuple[Path, str | None, Path, Set[Path], Set[str]]
+
+
+class RuleStatistics(object):
+    def __init__(self, runs: int = 0, skips: int = 0):
+        """
+        How often a rule was run while processing, and how often it was skipped because none of its triggers were in
+        the document.
+        :param runs: The number of documents the rule was run on.
+        :param skips: The number of documents the rule was skipped for.
+        """
+        self.runs = runs
+        self.skips = skips
+
+    @property
+    def skip_rate(self) -> float:
+        """:return: The fraction of the documents the rule applied to which it was skipped for."""
+        total = self.runs + self.skips
+        return self.skips / total if total else 0.0
+
+    def add(self, other: RuleStatistics):
+        """
+        Add the statistics from elsewhere, e.g. a worker process, to these.
+        :param other: The statistics to add.
+        """
+        self.runs += other.runs
+        self.skips += other.skips
+
+
+def merge_rule_statistics(target: Dict[str, RuleStatistics], source: Dict[str, RuleStatistics]):
+    """
+    Add one table of rule statistics into another.
+    :param target: The table to update.
+    :param source: The statistics to add, by rule name.
+    """
+    for name, statistics in source.items():
+        target.setdefault(name, RuleStatistics()).add(statistics)
+
+
+def format_rule_statistics(statistics: Dict[str, RuleStatistics]) -> Iterable[str]:
+    """:return: A line describing each rule's statistics, the most skipped first."""
+    for name, x in sorted(statistics.items(), key=lambda item: (-item[1].skips, item[0])):
+        yield f"{name}: {x.runs} runs, {x.skips} skipped ({x.skip_rate:.0%})"
+
+
+class FeatureIndex(object):
+    def __init__(self, rules: Iterable[DocumentRule]):
+        """
+        Which of the rules' triggers each document contains, kept as a bitmap per document so every trigger is looked
+        for once per version of the contents, however many rules share it. Documents are only scanned when a rule with
+        triggers is about to run on them, and are scanned again once their contents change.
+        :param rules: The rules whose triggers to look for.
+        """
+        rules = list(rules)
+        triggers = sorted({x for rule in rules for x in rule.triggers})
+        self._bits: Dict[str, int] = {x: 1 << i for i, x in enumerate(triggers)}
+        self._masks: Dict[int, int] = {}
+        for rule in rules:
+            mask = 0
+            for trigger in rule.triggers:
+                mask |= self._bits[trigger]
+            self._masks[id(rule)] = mask
+        self._scans: Dict[Path, Tuple[str, int]] = {}
+
+    def features(self, document: Document) -> int:
+        """
+        :param document: The document to scan.
+        :return: The bitmap of the triggers in the current contents of the document.
+        """
+        contents = document.contents
+        scan = self._scans.get(document.input_path, None)
+        if scan is not None and scan[0] is contents:
+            return scan[1]
+        features = 0
+        for trigger, bit in self._bits.items():
+            if trigger in contents:
+                features |= bit
+        self._scans[document.input_path] = (contents, features)
+        return features
+
+    def triggered(self, rule: DocumentRule, document: Document) -> bool:
+        """
+        :param rule: A rule the index was created with, or any rule without triggers.
+        :param document: The document the rule is about to run on.
+        :return: False if the rule has triggers and the document contains none of them.
+        """
+        mask = self._masks.get(id(rule), 0)
+        return not mask or bool(self.features(document) & mask)
+
+
+class DispatchPlan(object):
+    def __init__(
+        self,
+        rules: Sequence[DocumentRule],
+        documents: Iterable[Document] = (),
+        resolved_paths: Dict[Path, str] | None = None,
+    ):
+        """
+        The rules to apply to each document in each pass, worked out once before the passes start, so running a pass is
+        a plain loop over lists rather than filtering the rule set for every document. Rules with triggers are further
+        skipped, as they're reached, for documents which contain none of them, see: FeatureIndex.
+        :param rules: The rules to run, in order.
+        :param documents: The documents to plan for up front. Any other document is planned for when first used.
+        :param resolved_paths: A cache of the resolved input paths the file filters are matched against, which can be
+                               shared between plans to save resolving the same paths again.
+        """
+        self.passes: Dict[Passes, List[DocumentRule]] = {x: [r for r in rules if r.pass_index == x] for x in Passes}
+        self.features = FeatureIndex(rules)
+        self._resolved_paths: Dict[Path, str] = {} if resolved_paths is None else resolved_paths
+        self._plans: Dict[Path, Dict[Passes, List[DocumentRule]]] = {}
+        for document in documents:
+            self._plan(document.input_path)
+
+    def _plan(self, path: Path) -> Dict[Passes, List[DocumentRule]]:
+        resolved_path = self._resolved_paths.get(path, None)
+        if resolved_path is None:
+            resolved_path = self._resolved_paths[path] = str(path.resolve())
+        plan = self._plans[path] = {
+            x: [r for r in rules if r.applies_to(resolved_path)] for x, rules in self.passes.items()
+        }
+        return plan
+
+    def rules_for(self, pass_index: Passes, document: Document) -> List[DocumentRule]:
+        """
+        :param pass_index: The pass being run.
+        :param document: The document being processed.
+        :return: The rules to apply to the document in the pass, in order.
+        """
+        plan = self._plans.get(document.input_path, None)
+        if plan is None:
+            plan = self._plan(document.input_path)
+        return plan[pass_index]
+
+
+def apply_rules(
+    context: ProcessingContext,
+    document: Document,
+    rules: Sequence[DocumentRule],
+    rule_timings: Dict[str, float] | None = None,
+    features: FeatureIndex | None = None,
+    rule_statistics: Dict[str, RuleStatistics] | None = None,
+):
+    """
+    Apply a list of rules, in order, to a single document. The rules are expected to have been filtered for the
+    document already, e.g. by a DispatchPlan.
+    :param context: The ProcessingContext.
+    :param document: The document being processed.
+    :param rules: The rules to apply.
+    :param rule_timings: Where to add the time spent in each rule, by rule name.
+    :param features: The triggers in each document, to skip the rules which have nothing to do. When not given every
+                     rule is run.
+    :param rule_statistics: Where to count the documents each rule was run on and skipped for, by rule name.
+    """
+    tracer = active_tracer()
+    for rule in rules:
+        if features is not None and not features.triggered(rule, document):
+            if rule_statistics is not None:
+                rule_statistics.setdefault(rule.name, RuleStatistics()).skips += 1
+            if rule_timings is not None:
+                rule_timings.setdefault(rule.name, 0.0)
+            continue
+        if rule_statistics is not None:
+            rule_statistics.setdefault(rule.name, RuleStatistics()).runs += 1
+        if rule_timings is None and tracer is None:
+            rule.apply(context, document)
+            continue
+        start = time.perf_counter()
+        rule.apply(context, document)
+        end = time.perf_counter()
+        if rule_timings is not None:
+            rule_timings[rule.name] = rule_timings.get(rule.name, 0.0) + end - start
+        if tracer is not None:
+            tracer.add_span(rule.name, "rule", start, end, {"document": str(document.input_path)})
+
+
+def merge_timings(target: Dict[str, float], source: Dict[str, float]):
+    """
+    Add one table of timings into another.
+    :param target: The table to update.
+    :param source: The times to add, in seconds, by name.
+    """
+    for name, seconds in source.items():
+        target[name] = target.get(name, 0.0) + seconds
+
+
+def chunk_documents(documents: Sequence[Document], n_chunks: int) -> List[List[Document]]:
+    """
+    Split a set of documents into chunks of roughly equal total size, so that one giant page doesn't stall a worker
+    that also has to get through a long list of other pages. Documents keep their relative order within a chunk.
+    :param documents: The documents to split up.
+    :param n_chunks: The maximum number of chunks to create.
+    :return: A list of non-empty chunks.
+    """
+    n_chunks = max(1, min(n_chunks, len(documents)))
+    bins: List[Tuple[int, int]] = [(0, i) for i in range(n_chunks)]
+    assignments: List[List[Tuple[int, Document]]] = [[] for _ in range(n_chunks)]
+    sizes = [x.size for x in documents]
+    by_size = sorted(enumerate(documents), key=lambda x: sizes[x[0]], reverse=True)
+    for order, document in by_size:
+        size, index = heapq.heappop(bins)
+        assignments[index].append((order, document))
+        heapq.heappush(bins, (size + sizes[order] + 1, index))
+    return [[document for _, document in sorted(chunk, key=lambda x: x[0])] for chunk in assignments if chunk]
+
+
+def _process_chunk(pass_index: Passes, paths: List[Path]) -> Tuple[
+    List[DocumentUpdate],
+    Dict[str, MacroStatistics],
+    Dict[str, float],
+    Dict[str, RuleStatistics],
+    List[Dict[str, Any]],
+]:
+    """
+    Worker process entry point: apply the rules for a pass to a chunk of documents and return the results, along with
+    the macro statistics, rule timings, rule statistics and trace events for the chunk.
+    """
+    context, plan = _worker_context, _worker_plan
+    assert context is not None and plan is not None, "Worker process has no context to process."
+    results: List[DocumentUpdate] = []
+    rule_timings: Dict[str, float] = {}
+    rule_statistics: Dict[str, RuleStatistics] = {}
+    for path in paths:
+        document = context.documents[path]
+        before = document.contents if document.loaded else None
+        rules = plan.rules_for(pass_index, document)
+        apply_rules(context, document, rules, rule_timings, plan.features, rule_statistics)
+        changed = document.modified if before is None else document.contents is not before
+        contents = document.contents if changed else None
+        dependencies = context.dependencies.get(path, set())
+        macro_dependencies = context.macro_dependencies.get(path, set())
+        results.append((path, contents, document.target_path, dependencies, macro_dependencies))
+    macro_statistics, context.macro_statistics = context.macro_statistics, {}
+    tracer = active_tracer()
+    return results, macro_statistics, rule_timings, rule_statistics, [] if tracer is None else tracer.drain()
+
+
+def _process_chunk_in_place(
+    context: ProcessingContext, plan: DispatchPlan, pass_index: Passes, chunk: List[Document]
+) -> Tuple[Dict[str, float], Dict[str, RuleStatistics]]:
+    rule_timings: Dict[str, float] = {}
+    rule_statistics: Dict[str, RuleStatistics] = {}
+    for document in chunk:
+        apply_rules(
+            context, document, plan.rules_for(pass_index, document), rule_timings, plan.features, rule_statistics
+        )
+    return rule_timings, rule_statistics
+
+
+def _initialize_worker():
+    """
+    Worker process initializer: forget the statistics and trace events inherited from the parent, so only new ones are
+    returned.
+    """
+    if _worker_context is not None:
+        _worker_context.macro_statistics = {}
+    tracer = active_tracer()
+    if tracer is not None:
+        tracer.drain()
+
+
+def _create_process_pool(jobs: int) -> Executor | None:
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("Process based execution requires fork support, falling back to a thread pool.")
+        return None
+    context = multiprocessing.get_context("fork")
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_initialize_worker)
+
+
+def run_pass_parallel(
+    context: ProcessingContext, plan: DispatchPlan, pass_index: Passes, documents: Sequence[Document]
+):
+    """
+    Apply the rules for a single pass to a set of documents in the context, fanned out across a pool of workers. This
+    returns once every document has finished the pass, so it acts as a barrier between passes.
+    :param context: The ProcessingContext.
+    :param plan: The rules to apply to each document.
+    :param pass_index: The pass being run.
+    :param documents: The documents to process.
+    """
+    global _worker_context, _worker_plan
+
+    jobs = context.settings.jobs
+    chunks = chunk_documents(documents, jobs * N_CHUNKS_PER_JOB)
+    pool = _create_process_pool(jobs) if context.settings.backend == ExecutionBackend.PROCESS else None
+    if pool is None:
+        with ThreadPoolExecutor(max_workers=jobs) as thread_pool:
+            in_place = [thread_pool.submit(_process_chunk_in_place, context, plan, pass_index, x) for x in chunks]
+            for result in in_place:
+                rule_timings, rule_statistics = result.result()
+                merge_timings(context.rule_timings, rule_timings)
+                merge_rule_statistics(context.rule_statistics, rule_statistics)
+        return
+
+    _worker_context, _worker_plan = context, plan
+    try:
+        with pool:
+            futures = [pool.submit(_process_chunk, pass_index, [x.input_path for x in chunk]) for chunk in chunks]
+            for future in futures:
+                updates, macro_statistics, rule_timings, rule_statistics, trace_events = future.result()
+                merge_macro_statistics(context.macro_statistics, macro_statistics)
+                merge_timings(context.rule_timings, rule_timings)
+                merge_rule_statistics(context.rule_statistics, rule_statistics)
+                tracer = active_tracer()
+                if tracer is not None:
+                    tracer.events.extend(trace_events)
+                for path, contents, target_path, dependencies, macro_dependencies in updates:
+                    document = context.documents[path]
+                    if contents is not None:
+                        document.contents = contents
+                    document.target_path = target_path
+                    context.dependencies.setdefault(path, set()).update(dependencies)
+                    context.macro_dependencies.setdefault(path, set()).update(macro_dependencies)
+    finally:
+        _worker_context, _worker_plan = None, None
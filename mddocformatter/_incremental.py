@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import os
+import json
+import types
+import functools
+import hashlib
+import logging
+
+from pathlib import Path
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Set, Tuple, TypeVar, TYPE_CHECKING
+from ._consts import MANIFEST_VERSION, SOURCE_HASH_NAME
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ._document import Document
+    from ._processing import ProcessingContext, ProcessingSettings
+
+
+logger = logging.getLogger(__name__)
+
+Key = TypeVar("Key", bound=Hashable)
+
+
+def add_dependents(affected: Set[Key], dependencies: Mapping[Key, Iterable[Key]]) -> Set[Key]:
+    """
+    Add the documents which depend on any of the affected documents, directly or through other documents.
+    :param affected: The documents affected by a change, which is added to.
+    :param dependencies: The documents each document depends on.
+    :return: The affected documents.
+    """
+    dependents: Dict[Key, List[Key]] = defaultdict(list)
+    for key, keys in dependencies.items():
+        for dependency in keys:
+            dependents[dependency].append(key)
+    pending = list(affected)
+    while pending:
+        for key in dependents.get(pending.pop(), ()):
+            if key not in affected:
+                affected.add(key)
+                pending.append(key)
+    return affected
+
+
+def hash_data(data: bytes) -> str:
+    """:return: The hex digest used to identify a blob of data in the manifest."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """:return: The hex digest of the contents of a file."""
+    with open(path, "rb") as fd:
+        return hash_data(fd.read())
+
+
+def _code_fingerprint(code: types.CodeType, digest: Any):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode("utf-8"))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_fingerprint(const, digest)
+        else:
+            digest.update(repr(const).encode("utf-8"))
+
+
+@functools.lru_cache(maxsize=None)
+def fingerprint_package() -> str:
+    """
+    :return: A fingerprint of the sources of this package, so a build made with a different version of the formatter,
+             whose built-in rules and helpers may behave differently, is never reused.
+    """
+    digest = hashlib.sha256()
+    package = Path(__file__).parent
+    for path in sorted(package.rglob("*.py")):
+        digest.update(path.relative_to(package).as_posix().encode("utf-8"))
+        digest.update(hash_file(path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def fingerprint_module(function: Any) -> str:
+    """
+    :return: A fingerprint of the full source of the module a function is defined in, so edits to any helper it calls
+             are detected, or an empty string if the source isn't known. Modules loaded from a file with exec record
+             the hash of their source as SOURCE_HASH_NAME.
+    """
+    function = getattr(function, "function", function)
+    module_globals = getattr(function, "__globals__", {})
+    if SOURCE_HASH_NAME in module_globals:
+        return module_globals[SOURCE_HASH_NAME]
+    file_name = module_globals.get("__file__", None)
+    try:
+        return hash_file(Path(file_name)) if file_name else ""
+    except OSError:
+        return ""
+
+
+def fingerprint_callable(function: Any) -> str:
+    """
+    Create a fingerprint of a function from its byte code and the source of the module it's defined in, so edits to a
+    macro or rule, or to a helper in its module, are detected.
+    :param function: The function, or DocumentRule, to fingerprint.
+    :return: The fingerprint.
+    """
+    module_fingerprint = fingerprint_module(function)
+    function = getattr(function, "function", function)
+    digest = hashlib.sha256(getattr(function, "__qualname__", type(function).__qualname__).encode("utf-8"))
+    digest.update(module_fingerprint.encode("utf-8"))
+    code = getattr(function, "__code__", None)
+    if code is not None:
+        _code_fingerprint(code, digest)
+    return digest.hexdigest()
+
+
+def fingerprint_settings(settings: ProcessingSettings) -> str:
+    """
+    :return: A fingerprint of everything in the settings, except the macros, that affects every document. This covers
+             the sources of this package and of the modules which define the rules and function macros, as a change to
+             any helper they call could change the output of any document.
+    """
+    digest = hashlib.sha256(settings.version_name.encode("utf-8"))
+    digest.update(fingerprint_package().encode("utf-8"))
+    for rule in settings.rules:
+        digest.update(f"{rule.file_filter}:{rule.pass_index.name}:{fingerprint_callable(rule)}".encode("utf-8"))
+    for name, function in sorted(settings.function_macros.items()):
+        digest.update(f"{name}:{fingerprint_module(function)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def fingerprint_macros(settings: ProcessingSettings) -> Dict[str, str]:
+    """:return: A fingerprint for each of the macros, by name."""
+    result = {name: hash_data(str(value).encode("utf-8")) for name, value in settings.const_macros.items()}
+    result.update({name: fingerprint_callable(value) for name, value in settings.function_macros.items()})
+    return result
+
+
+class ManifestEntry(object):
+    def __init__(
+        self,
+        input_hash: str,
+        size: int,
+        mtime_ns: int,
+        target_path: str = "",
+        documents: Iterable[str] = (),
+        macros: Iterable[str] = (),
+    ):
+        """
+        The state of a single document as of the last build.
+        :param input_hash: The hash of the input file.
+        :param size: The size of the input file, used along with mtime_ns to skip re-hashing unchanged files.
+        :param mtime_ns: The modification time of the input file.
+        :param target_path: Where the output of the document was saved.
+        :param documents: The (root relative) documents this document depends on.
+        :param macros: The names of the macros this document uses.
+        """
+        self.input_hash = input_hash
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.target_path = target_path
+        self.documents: List[str] = sorted(documents)
+        self.macros: List[str] = sorted(macros)
+
+
+class Manifest(object):
+    def __init__(
+        self,
+        fingerprint: str = "",
+        macros: Dict[str, str] | None = None,
+        documents: Dict[str, ManifestEntry] | None = None,
+    ):
+        """
+        A record of the inputs, outputs and dependencies of every document in a build, used to work out which
+        documents need processing again in the next build.
+        :param fingerprint: The fingerprint of the settings used for the build.
+        :param macros: The fingerprint of each macro, by name.
+        :param documents: The entry for each document, keyed by its path relative to the root directory.
+        """
+        self.fingerprint = fingerprint
+        self.macros: Dict[str, str] = macros or dict()
+        self.documents: Dict[str, ManifestEntry] = documents or dict()
+
+    @classmethod
+    def load(cls, path: Path) -> Manifest:
+        """
+        Load a manifest from disk. A missing, unreadable or outdated manifest results in an empty one, which will cause
+        a full rebuild.
+        :param path: The path to the manifest file.
+        :return: The manifest.
+        """
+        # noinspection PyBroadException
+        try:
+            with open(path, "r") as fd:
+                data = json.load(fd)
+            if data.get("version") != MANIFEST_VERSION:
+                return cls()
+            documents = {key: ManifestEntry(**value) for key, value in data["documents"].items()}
+            return cls(data["fingerprint"], data["macros"], documents)
+        except FileNotFoundError:
+            return cls()
+        except Exception:
+            logger.warning(f"Unable to read the build manifest {path}, all documents will be processed.")
+            return cls()
+
+    def save(self, path: Path):
+        """
+        Save the manifest to disk, replacing any previous manifest.
+        :param path: The path to the manifest file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "macros": self.macros,
+            "documents": {key: vars(value) for key, value in sorted(self.documents.items())},
+        }
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w") as fd:
+            json.dump(data, fd, indent=1)
+        os.replace(temp_path, path)
+
+
+def _key(root_directory: Path, path: Path) -> str:
+    return path.relative_to(root_directory).as_posix()
+
+
+def _hash_input(path: Path, entry: ManifestEntry | None) -> ManifestEntry:
+    stat = path.stat()
+    if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+        return ManifestEntry(entry.input_hash, stat.st_size, stat.st_mtime_ns)
+    return ManifestEntry(hash_file(path), stat.st_size, stat.st_mtime_ns)
+
+
+def plan_build(context: ProcessingContext, previous: Manifest) -> Tuple[Manifest, Set[Path]]:
+    """
+    Work out which documents in a context need to be processed, given the manifest from the previous build. A document
+    is dirty if its input changed, a macro it uses changed or its output has gone missing. Any document which depends
+    on a dirty document is also dirty. If the settings or the set of documents changed, everything is dirty.
+    :param context: The context, with all documents added.
+    :param previous: The manifest from the previous build.
+    :return: tuple of:
+               - The manifest for this build - only the input state of each document is filled in.
+               - The input paths of the documents which need processing.
+    """
+    root = context.settings.root_directory
+    current = Manifest(fingerprint_settings(context.settings), fingerprint_macros(context.settings))
+    for path in context.documents:
+        key = _key(root, path)
+        current.documents[key] = _hash_input(path, previous.documents.get(key, None))
+
+    if current.fingerprint != previous.fingerprint or current.documents.keys() != previous.documents.keys():
+        return current, set(context.documents)
+
+    all_macros = current.macros.keys() | previous.macros.keys()
+    changed_macros = {x for x in all_macros if current.macros.get(x, None) != previous.macros.get(x, None)}
+    dirty = set()
+    for key, entry in current.documents.items():
+        old = previous.documents[key]
+        if entry.input_hash != old.input_hash or changed_macros.intersection(old.macros):
+            dirty.add(key)
+        elif not old.target_path or not Path(old.target_path).exists():
+            dirty.add(key)
+    add_dependents(dirty, {key: old.documents for key, old in previous.documents.items()})
+    return current, {root / key for key in dirty}
+
+
+class IncrementalBuild(object):
+    def __init__(self, context: ProcessingContext, manifest_path: Path):
+        """
+        Limits the processing in a context to the documents that changed since the previous build recorded in the
+        manifest, along with those that depend on them. The outputs of the previous build are reused for the rest.
+        :param context: The ProcessingContext, with all documents added.
+        :param manifest_path: The location of the manifest.
+        """
+        self.context = context
+        self.manifest_path = manifest_path
+        self.previous = Manifest.load(manifest_path)
+        self.manifest, self.dirty = plan_build(context, self.previous)
+        self.documents: List[Document] = []
+
+    def prepare(self) -> List[Document]:
+        """
+        Restore the clean documents to their state at the end of the previous build, so they can be used by the rules
+        applied to the dirty documents. Their contents are only read from the previous output if a rule uses them.
+        :return: The documents which need processing.
+        """
+        root = self.context.settings.root_directory
+        for path, document in self.context.documents.items():
+            if path not in self.dirty:
+                entry = self.previous.documents[_key(root, path)]
+                document.target_path = Path(entry.target_path)
+                document.restore(document.target_path)
+        self.documents = [x for x in self.context.documents.values() if x.input_path in self.dirty]
+        return self.documents
+
+    def finish(self):
+        """
+        Record the outputs and dependencies of each document and save the manifest - call after saving the documents.
+        """
+        root = self.context.settings.root_directory
+        for path, document in self.context.documents.items():
+            key = _key(root, path)
+            entry = self.manifest.documents[key]
+            if path in self.dirty:
+                if document.target_path == path:  # processed in place, so the input has been replaced.
+                    entry = _hash_input(path, None)
+                entry.target_path = str(document.target_path)
+                entry.documents = sorted(_key(root, x) for x in self.context.dependencies.get(path, ()))
+                entry.macros = sorted(self.context.macro_dependencies.get(path, ()))
+            else:
+                old = self.previous.documents[key]
+                entry.target_path, entry.documents, entry.macros = old.target_path, old.documents, old.macros
+            self.manifest.documents[key] = entry
+        self.manifest.save(self.manifest_path)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable
+from ._consts import FunctionMacro
+
+
+def impure_macro(function: FunctionMacro) -> FunctionMacro:
+    """
+    Decorator for function macros whose result isn't determined by their arguments alone, e.g. because they read a file
+    or the time. The results of other function macros are cached, so they only run once per set of arguments.
+    :param function: The function macro.
+    :return: The same function macro, marked as impure.
+    """
+    setattr(function, "_mddocformatter_impure", True)
+    return function
+
+
+def is_impure_macro(function: FunctionMacro) -> bool:
+    """:return: True if the function macro has been marked with the impure_macro decorator."""
+    return getattr(function, "_mddocformatter_impure", False)
+
+
+class MacroStatistics(object):
+    def __init__(self, uses: int = 0, calls: int = 0, seconds: float = 0.0):
+        """
+        How often a macro was used while processing, and what it cost.
+        :param uses: The number of times the macro was expanded.
+        :param calls: The number of times a function macro was actually run, rather than its cached result being used.
+        :param seconds: The total time spent running the function macro.
+        """
+        self.uses = uses
+        self.calls = calls
+        self.seconds = seconds
+
+    def add(self, other: MacroStatistics):
+        """
+        Add the statistics from elsewhere, e.g. a worker process, to these.
+        :param other: The statistics to add.
+        """
+        self.uses += other.uses
+        self.calls += other.calls
+        self.seconds += other.seconds
+
+
+def merge_macro_statistics(target: Dict[str, MacroStatistics], source: Dict[str, MacroStatistics]):
+    """
+    Add one table of macro statistics into another.
+    :param target: The table to update.
+    :param source: The statistics to add, by macro name.
+    """
+    for name, statistics in source.items():
+        target.setdefault(name, MacroStatistics()).add(statistics)
+
+
+def format_macro_statistics(statistics: Dict[str, MacroStatistics]) -> Iterable[str]:
+    """:return: A line describing each macro's statistics, the most expensive first."""
+    for name, x in sorted(statistics.items(), key=lambda item: (-item[1].seconds, -item[1].uses, item[0])):
+        yield f"{name}: {x.uses} uses, {x.calls} calls, {x.seconds * 1000:.2f}ms"
@@ -1,11 +1,38 @@
 from __future__ import annotations
 
+import os
+import time
 import logging
+import threading
 
-from ._consts import Passes, FunctionMacro
+from concurrent.futures import Future, ThreadPoolExecutor
+from ._consts import (
+    ExecutionBackend,
+    Passes,
+    FunctionMacro,
+    CACHE_DIRECTORY_NAME,
+    MANIFEST_FILE_NAME,
+    N_NAME_INDEX_TIERS,
+)
 from ._document import Document
-from .loading import load_document, save_document
-from typing import Dict, List, TYPE_CHECKING
+from ._discovery import discover_documents
+from ._execution import (
+    DispatchPlan,
+    RuleStatistics,
+    apply_rules,
+    format_rule_statistics,
+    merge_timings,
+    run_pass_parallel,
+)
+from ._incremental import IncrementalBuild
+from ._scheduling import RuleScheduler
+from ._macros import MacroStatistics, format_macro_statistics
+from ._tracing import trace
+from .loading import load_document
+from ._saving import SaveReport, save_documents
+from ._reading import LoadReport, read_documents
+from ._validation import diff_documents, validate_documents
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Set, Tuple, TypeVar, TYPE_CHECKING
 from pathlib import Path
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -14,6 +41,8 @@ if TYPE_CHECKING:  # pragma: no cover
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class ProcessingSettings(object):
     def __init__(
@@ -24,6 +53,9 @@ class ProcessingSettings(object):
         rule_set: List[DocumentRule] | None = None,
         const_macros: Dict[str, str] | None = None,
         function_macros: Dict[str, FunctionMacro] | None = None,
+        jobs: int = 1,
+        backend: ExecutionBackend = ExecutionBackend.PROCESS,
+        cache_directory: Path | None = None,
     ):
         """
         Settings to use when processing a document.
@@ -35,6 +67,9 @@ class ProcessingSettings(object):
         :param rule_set: The rules to run on each doc.
         :param const_macros: A table of const value macros.
         :param function_macros: A table of function macros which take 0 or more strings as args and returns a string.
+        :param jobs: The number of workers to spread each pass over. 1 processes everything on the calling thread.
+        :param backend: The type of worker pool to use when jobs is greater than 1.
+        :param cache_directory: Where to keep data which is reused between runs, e.g. the incremental build manifest.
         """
         self.root_directory = root_directory
         self.target_directory = target_directory
@@ -42,6 +77,23 @@ class ProcessingSettings(object):
         self.const_macros: Dict[str, str] = const_macros or dict()
         self.function_macros: Dict[str, FunctionMacro] = function_macros or dict()
         self.version_name = version_name
+        self.jobs = max(1, jobs)
+        self.backend = backend
+        self.cache_directory = cache_directory
+
+
+def _name_keys(path: Path) -> Tuple[str, ...]:
+    """
+    :return: The names a document can be found by, in order of precedence:
+               - fullname, case sensitive
+               - fullname, case insensitive
+               - sans extension, case sensitive
+               - sans extension, case insensitive
+               - each of the above, with the confluence style prefix dropped.
+    """
+    name, stem = path.name, path.stem
+    names = (name, name.lower(), stem, stem.lower())
+    return names + tuple(x.split(" - ")[-1] for x in names)
 
 
 class ProcessingContext(object):
@@ -53,6 +105,20 @@ class ProcessingContext(object):
         """
         self.settings = settings
         self.documents: Dict[Path, Document] = {}
+        # Documents by the names get_document_by_name accepts, one table per level of precedence, in the order added.
+        self._name_index: Tuple[Dict[str, List[Document]], ...] = tuple(dict() for _ in range(N_NAME_INDEX_TIERS))
+        self.dependencies: Dict[Path, Set[Path]] = {}
+        self.macro_dependencies: Dict[Path, Set[str]] = {}
+        self.macro_statistics: Dict[str, MacroStatistics] = {}
+        # Wall time in seconds spent in each phase of processing, e.g. "discovery" or "pass first", and in each rule.
+        self.timings: Dict[str, float] = {}
+        self.rule_timings: Dict[str, float] = {}
+        self.rule_statistics: Dict[str, RuleStatistics] = {}
+        self._resolved_paths: Dict[Path, str] = {}
+        # Documents by their lexically normalised and resolved input paths, see: get_document. Built on first use.
+        self._path_index: Dict[str, Document] | None = None
+        self._resources: Dict[Hashable, Any] = {}
+        self._resources_lock = threading.Lock()
 
     def add_document(self, document: Document | Path):
         """
@@ -62,76 +128,238 @@ class ProcessingContext(object):
         path = document if isinstance(document, Path) else document.input_path
         document = document if isinstance(document, Document) else load_document(document)
         if path.is_relative_to(self.settings.root_directory):
+            previous = self.documents.get(document.input_path, None)
             self.documents[document.input_path] = document
+            for tier, key in zip(self._name_index, _name_keys(document.input_path)):
+                documents = tier.setdefault(key, [])
+                if previous is None:
+                    documents.append(document)
+                else:  # replacing a document keeps its place in the lookup order, as it does in self.documents.
+                    documents[documents.index(previous)] = document
+            self._path_index = None
         else:
             raise ValueError(f"All documents must be under the root directory, got: {path}")
 
+    def add_documents(self, paths: Iterable[Path], load: bool = True, verify: bool = True) -> LoadReport:
+        """
+        Add a batch of documents, reading them concurrently rather than one at a time as they're used. Each document
+        starts being read as soon as its path is given, so the paths can come from a generator that is still walking
+        the file system. The documents are added in the order given. A document which isn't under the root directory,
+        or can't be read, is reported rather than stopping the rest of the batch from being added.
+        :param paths: The paths of the documents.
+        :param load: Read the documents now, otherwise they're read when first used.
+        :param verify: Check each path is an existing file before adding it. Paths just found by discovery are known to
+                       be, so their checks can be skipped.
+        :return: What was read, how fast, and what failed.
+        """
+        report = LoadReport()
+        documents = self._documents_to_add(paths, verify, report)
+        if load:
+            added, report = read_documents(documents, report=report)
+        else:
+            added = list(documents)
+        for document in added:
+            self.add_document(document)
+        return report
+
+    def _documents_to_add(self, paths: Iterable[Path], verify: bool, report: LoadReport) -> Iterator[Document]:
+        for path in paths:
+            if not path.is_relative_to(self.settings.root_directory):
+                logger.error(f"All documents must be under the root directory, got: {path}")
+                report.errors.append((path, "not under the root directory"))
+            elif not verify:
+                yield Document(path, None)
+            else:
+                try:
+                    yield load_document(path)
+                except OSError as e:
+                    logger.error(f"Unable to add {path}: {e}")
+                    report.errors.append((path, str(e)))
+
+    def remove_document(self, path: Path) -> Document | None:
+        """
+        Remove a document from the context.
+        :param path: The input path of the document to remove.
+        :return: The removed document, or None if there was no document with the given path.
+        """
+        document = self.documents.pop(path, None)
+        self._resolved_paths.pop(path, None)
+        if document is not None:
+            self._path_index = None
+            for tier, key in zip(self._name_index, _name_keys(path)):
+                tier[key].remove(document)
+                if not tier[key]:
+                    del tier[key]
+        return document
+
+    def add_dependency(self, document: Document, dependency: Document):
+        """
+        Record that the output of a document depends on another document, e.g. because it links to it.
+        :param document: The document being processed.
+        :param dependency: The document it depends on.
+        """
+        if dependency is not document:
+            self.dependencies.setdefault(document.input_path, set()).add(dependency.input_path)
+
+    def add_macro_dependency(self, document: Document, macro_name: str):
+        """
+        Record that the output of a document depends on a macro.
+        :param document: The document being processed.
+        :param macro_name: The name of the macro used, whether or not it is defined.
+        """
+        self.macro_dependencies.setdefault(document.input_path, set()).add(macro_name)
+
+    def get_resource(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """
+        Get a resource shared by all the rules run in this context, e.g. a parsed glossary, creating it the first time
+        it's requested. Include whatever the resource is created from in the key, so a new resource is created if that
+        changes.
+        :param key: The key identifying the resource.
+        :param factory: Creates the resource if it doesn't exist yet.
+        :return: The resource.
+        """
+        resource = self._resources.get(key, None)
+        if resource is None:
+            with self._resources_lock:
+                resource = self._resources.get(key, None)
+                if resource is None:
+                    resource = self._resources[key] = factory()
+        return resource
+
+    def clear_resources(self):
+        """
+        Discard all the resources created in this context.
+        """
+        with self._resources_lock:
+            self._resources.clear()
+
+    def _normalize(self, path: Path | str) -> str:
+        """:return: The path, relative to the root directory if it isn't absolute, with any . and .. parts removed."""
+        path = os.fspath(path)
+        return os.path.normpath(path if os.path.isabs(path) else os.path.join(self.settings.root_directory, path))
+
+    def _resolve(self, path: Path) -> str:
+        """:return: The resolved input path of a document, which is only resolved once."""
+        resolved_path = self._resolved_paths.get(path, None)
+        if resolved_path is None:
+            resolved_path = self._resolved_paths[path] = str(path.resolve())
+        return resolved_path
+
+    def _get_path_index(self) -> Dict[str, Document]:
+        index = self._path_index
+        if index is None:
+            index = {}
+            for path, document in self.documents.items():
+                index.setdefault(self._normalize(path), document)
+            for path, document in self.documents.items():
+                index.setdefault(self._resolve(path), document)
+            self._path_index = index
+        return index
+
     def get_document(self, path: Path) -> Document | None:
         """
-        Find a document in the documentation set being processed in this context.
+        Find a document in the documentation set being processed in this context. A relative path is relative to the
+        root directory. The path doesn't need to be resolved: . and .. parts are removed without touching the disk,
+        and a path through a symlink is matched by the resolved path of the document, which is worked out once.
         :return: The document or None if the document can't be found.
         """
         doc = self.documents.get(path, None)
         if doc is None:
-            doc = self.documents.get(self.settings.root_directory / path, None)
+            doc = self._get_path_index().get(self._normalize(path), None)
         return doc
 
-    # noinspection DuplicatedCode
     def get_document_by_name(self, name: str) -> Document | None:
         """
         Find a document by name. Finds the first one, which isn't guaranteed to be unique.
         :param name: The name of the document.
         :return: The document or None if no document with the given name could be found.
         """
-        # fullname, case sensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.name:
-                return doc
-        # fullname, case insensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.name.lower():
-                return doc
-        # sans extension, case sensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.stem:
-                return doc
-        # sans extension, case insensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.stem.lower():
-                return doc
-        # drop the confluence style prefix, fullname, case sensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.name.split(" - ")[-1]:
-                return doc
-        # drop the confluence style prefix, fullname, case insensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.name.lower().split(" - ")[-1]:
-                return doc
-        # drop the confluence style prefix, sans extension, case sensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.stem.split(" - ")[-1]:
-                return doc
-        # drop the confluence style prefix, sans extension, case insensitive
-        for doc in self.documents.values():
-            if name == doc.input_path.stem.lower().split(" - ")[-1]:
-                return doc
+        for tier in self._name_index:
+            documents = tier.get(name, None)
+            if documents:
+                return documents[0]
         return None
 
-    def run(self):
+    def run(self, documents: Iterable[Document] | None = None):
         """
-        Run the documentation processing.
+        Run the documentation processing. Each rule which needs preparing is prepared first, see: DocumentRule.
+        :param documents: The documents to process, defaults to all documents in the context.
         """
+        documents = list(self.documents.values() if documents is None else documents)
+        for rule in self.settings.rules:
+            if rule.prepare is not None:
+                rule.prepare(self)
+        plan = DispatchPlan(self.settings.rules, documents, self._resolved_paths)
+        if self.settings.backend == ExecutionBackend.SCHEDULED:
+            RuleScheduler(self, plan, documents).run()
+            return
         for index in Passes:
-            for document in self.documents.values():
-                for rules in filter(lambda x: x.pass_index == index, self.settings.rules):
-                    rules(self, document)
+            phase = f"pass {index.name.lower()}"
+            start = time.perf_counter()
+            with trace(phase, "phase", documents=len(documents)):
+                if self.settings.jobs > 1 and plan.passes[index] and len(documents) > 1:
+                    run_pass_parallel(self, plan, index, documents)
+                else:
+                    for document in documents:
+                        rules = plan.rules_for(index, document)
+                        apply_rules(self, document, rules, self.rule_timings, plan.features, self.rule_statistics)
+            self.add_timing(phase, time.perf_counter() - start)
+
+    def load(self, documents: Iterable[Document] | None = None) -> LoadReport:
+        """
+        Read the contents of documents up front, and concurrently, rather than when a rule first needs them.
+        :param documents: The documents to load, defaults to all documents in the context.
+        :return: What was read, how fast, and what failed.
+        """
+        start = time.perf_counter()
+        with trace("load", "phase"):
+            _, report = read_documents(self.documents.values() if documents is None else documents)
+        self.add_timing("load", time.perf_counter() - start)
+        return report
+
+    def prefetch(self, documents: Iterable[Document] | None = None) -> Future[LoadReport]:
+        """
+        Start reading the contents of documents in the background, concurrently, see: load. A rule which needs a
+        document before it has been read only waits for that document. Don't fork worker processes while reading, as
+        they could inherit a document part way through being read.
+        :param documents: The documents to read, defaults to all documents in the context.
+        :return: The report of what was read, once reading has finished.
+        """
+        documents = list(self.documents.values() if documents is None else documents)
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mddocformatter-prefetch")
+        future = pool.submit(self.load, documents)
+        pool.shutdown(wait=False)
+        return future
 
-    def save(self):
+    def add_timing(self, phase: str, seconds: float):
         """
-        Save the current state of the documentation to the target locations - usually called after "run".
+        Record time spent in a phase of the processing.
+        :param phase: The name of the phase.
+        :param seconds: The wall time spent.
         """
-        for document in self.documents.values():
-            save_document(document)
+        merge_timings(self.timings, {phase: seconds})
+
+    def save(self, documents: Iterable[Document] | None = None) -> SaveReport:
+        """
+        Save the current state of the documentation to the target locations - usually called after "run". Targets which
+        already hold the right contents aren't touched, and the contents of each document are released once it's
+        saved.
+        :param documents: The documents to save, defaults to all documents in the context.
+        :return: What was written, skipped and failed.
+        """
+        start = time.perf_counter()
+        with trace("save", "phase"):
+            report = save_documents(self.documents.values() if documents is None else documents)
+        self.add_timing("save", time.perf_counter() - start)
+        return report
+
+
+def _discover_documents(input_dir: Path, output_dir: Path | None = None) -> Iterator[Path]:
+    """
+    :return: A generator of the paths of all the documents under the input directory, excluding the output directory
+             when it's inside the input directory, see: discover_documents.
+    """
+    return discover_documents(input_dir, [] if output_dir is None else [output_dir])
 
 
 def _process_docs(
@@ -141,19 +369,58 @@ def _process_docs(
     const_macros: Dict[str, str] | None = None,
     function_macros: Dict[str, FunctionMacro] | None = None,
     version_name: str = "",
-):
-    """Create a context, find and process the docs, and :return: the context."""
-    settings = ProcessingSettings(input_dir, output_dir, version_name, rule_set, const_macros, function_macros)
+    jobs: int = 1,
+    incremental: bool = False,
+    preload: bool = False,
+) -> Tuple[ProcessingContext, IncrementalBuild | None]:
+    """
+    Create a context, find and process the docs, and :return: tuple of the context and, when incremental, the build
+    that limited the processing to the documents which changed since the last build recorded in the output directory.
+    The documents are read in the background while they're processed, or before processing starts when preload is
+    set, or the processing is spread over worker processes.
+    """
+    cache_directory = output_dir / CACHE_DIRECTORY_NAME if incremental else None
+    settings = ProcessingSettings(
+        input_dir,
+        output_dir,
+        version_name,
+        rule_set,
+        const_macros,
+        function_macros,
+        jobs,
+        cache_directory=cache_directory,
+    )
     logging.info("Configuring...")
     context = ProcessingContext(settings)
     logging.info(f"Discovering documentation in {input_dir}...")
-    for file_path in input_dir.glob("**/*.*"):
-        context.add_document(file_path)
+    start = time.perf_counter()
+    with trace("discovery", "phase"):
+        context.add_documents(_discover_documents(input_dir, output_dir), load=False, verify=False)
+    context.add_timing("discovery", time.perf_counter() - start)
     docs_list = "\n    - ".join([str(x) for x in context.documents.keys()])
     logging.info(f"Files found: \n    - {docs_list}")
+    build = None
+    documents = None
+    if cache_directory is not None:
+        build = IncrementalBuild(context, cache_directory / MANIFEST_FILE_NAME)
+        documents = build.prepare()
+        logging.info(f"Incremental build: {len(documents)} of {len(context.documents)} documents need processing.")
+    prefetch = None
+    if preload or (jobs > 1 and settings.backend == ExecutionBackend.PROCESS):
+        logging.info(f"Loaded: {context.load(documents)}.")
+    else:
+        prefetch = context.prefetch(documents)
     logging.info("Processing...")
-    context.run()
-    return context
+    context.run(documents)
+    if prefetch is not None:
+        logging.info(f"Loaded: {prefetch.result()}.")
+    if context.macro_statistics:
+        macros_list = "\n    - ".join(format_macro_statistics(context.macro_statistics))
+        logging.info(f"Macros used: \n    - {macros_list}")
+    if context.rule_statistics:
+        rules_list = "\n    - ".join(format_rule_statistics(context.rule_statistics))
+        logging.info(f"Rules run: \n    - {rules_list}")
+    return context, build
 
 
 def process_docs(
@@ -163,6 +430,8 @@ def process_docs(
     const_macros: Dict[str, str] | None = None,
     function_macros: Dict[str, FunctionMacro] | None = None,
     version_name: str = "",
+    jobs: int = 1,
+    incremental: bool = False,
 ) -> bool:
     """
     Process all the documentation in the input_dir and save the results to the output_dir. Make the input & output dirs
@@ -175,13 +444,25 @@ def process_docs(
     :param rule_set: The rules to run on each doc.
     :param const_macros: A table of const value macros.
     :param function_macros: A table of function macros which take 0 or more strings as args and returns a string.
-    :return: True if successful.
+    :param jobs: The number of workers to spread the processing over.
+    :param incremental: Only process the documents which changed since the last incremental build to the same
+                        output_dir, and the documents which depend on them.
+    :return: True if successful, False if any document couldn't be saved.
     """
-    context = _process_docs(input_dir, output_dir, rule_set, const_macros, function_macros, version_name)
+    context, build = _process_docs(
+        input_dir, output_dir, rule_set, const_macros, function_macros, version_name, jobs, incremental
+    )
+    documents = list(context.documents.values()) if build is None else build.documents
     logging.info("Saving...")
-    docs_list = "\n    - ".join([str(x.target_path) for x in context.documents.values()])
+    docs_list = "\n    - ".join([str(x.target_path) for x in documents])
     logging.info(f"Saving documents: \n    - {docs_list}")
-    context.save()
+    report = context.save(documents)
+    logging.info(f"Saved: {report}.")
+    if report.failed:
+        logging.error("Complete, but some documents couldn't be saved.")
+        return False
+    if build is not None:
+        build.finish()
     logging.info("Complete.")
     return True
 
@@ -192,27 +473,36 @@ def validate_docs(
     const_macros: Dict[str, str] | None = None,
     function_macros: Dict[str, FunctionMacro] | None = None,
     version_name: str = "",
+    jobs: int = 1,
+    fail_fast: bool = False,
+    show_changes: bool = True,
 ) -> bool:
     """
-    Process all the documentation in the input_dir and save the results to the output_dir. Make the input & output dirs
-    the same to overwrite the documentation in place.
+    Process all the documentation in the input_dir and check whether the rules would change any of it, without saving
+    anything.
     :param input_dir: The root of the documentation tree.
     :param version_name: The name of the version of the documentation, mostly used for confluence naming. Usually
                          develop or main.
     :param rule_set: The rules to run on each doc.
     :param const_macros: A table of const value macros.
     :param function_macros: A table of function macros which take 0 or more strings as args and returns a string.
-    :return: True if successful.
+    :param jobs: The number of workers to spread the processing, and the diffs of invalid documents, over.
+    :param fail_fast: Stop checking at the first invalid document, so only it is reported and diffed. Every document
+                      is still processed first, as the rules for each can depend on every other.
+    :param show_changes: Log the changes each invalid document would need. When not set, no diffs are computed.
+    :return: True if the documentation is valid.
     """
-    context = _process_docs(input_dir, input_dir, rule_set, const_macros, function_macros, version_name)
+    context, _ = _process_docs(input_dir, input_dir, rule_set, const_macros, function_macros, version_name, jobs)
     logging.info("Validating...")
-    valid = True
-    for doc in context.documents.values():
-        if not doc.unchanged:
-            valid = False
+    report = validate_documents(context.documents.values(), fail_fast)
+    if show_changes and logging.getLogger().isEnabledFor(logging.WARNING):
+        for doc, lines in diff_documents(report.invalid, jobs=jobs):
             s = f"Document {doc.input_path} would require changes to fit the style.\n"
-            s += "    " + "\n    ".join(doc.changes().split("\n"))
+            s += "".join("    " + x for x in lines)
             logging.warning(s)
-    status = "valid" if valid else "invalid"
-    logging.info(f"Complete. Documentation is {status}.")
-    return valid
+    else:
+        for doc in report.invalid:
+            logging.warning(f"Document {doc.input_path} would require changes to fit the style.")
+    status = "valid" if report.valid else "invalid"
+    logging.info(f"Complete. Documentation is {status}: {report}.")
+    return report.valid
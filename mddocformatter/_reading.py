@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+import logging
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Tuple
+from ._consts import LOAD_JOBS
+from ._document import Document
+
+
+logger = logging.getLogger(__name__)
+
+
+class LoadReport(object):
+    def __init__(self) -> None:
+        """
+        The outcome of reading a set of documents.
+        """
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.unread: List[Path] = []
+        self.errors: List[Tuple[Path, str]] = []
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files, {self.bytes / 1e6:.2f}MB in {self.seconds * 1000:.1f}ms "
+            f"({self.files_per_second:.0f} files/s, {self.bytes_per_second / 1e6:.2f}MB/s), "
+            f"{len(self.unread)} left unread, {len(self.errors)} errors"
+        )
+
+
+def _load(document: Document) -> int | None:
+    try:
+        return document.load()
+    except ValueError:  # not text, e.g. an image, so it's left to be copied as it is.
+        return None
+
+
+def read_documents(
+    documents: Iterable[Document], jobs: int = LOAD_JOBS, report: LoadReport | None = None
+) -> Tuple[List[Document], LoadReport]:
+    """
+    Read the contents of documents on a pool of threads, so slow storage, e.g. a network drive, is read from in
+    parallel. Reading starts as soon as each document is given, so the documents can come from a generator that is
+    still walking the file system. Files which aren't text are left unread, as they're copied rather than processed.
+    :param documents: The documents to read.
+    :param jobs: The number of threads reading documents.
+    :param report: A report to add to, e.g. with errors found before reading.
+    :return: The documents which didn't fail to read, in the order given, and the report of what was read.
+    """
+    report = report if report is not None else LoadReport()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="mddocformatter-load") as pool:
+        futures: List[Tuple[Document, Future[int | None]]] = [(x, pool.submit(_load, x)) for x in documents]
+        result = []
+        for document, future in futures:
+            try:
+                size = future.result()
+            except OSError as e:
+                logger.error(f"Unable to read {document.input_path}: {e}")
+                report.errors.append((document.input_path, str(e)))
+                continue
+            if size is None:
+                report.unread.append(document.input_path)
+            else:
+                report.files += 1
+                report.bytes += size
+            result.append(document)
+    report.seconds += time.perf_counter() - start
+    return result, report
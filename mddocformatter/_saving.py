@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Set, Tuple
+from ._consts import SAVE_JOBS
+from ._document import Document
+from ._tracing import trace
+from .loading import save_document
+
+
+logger = logging.getLogger(__name__)
+
+
+class SaveReport(object):
+    def __init__(self) -> None:
+        """
+        The outcome of saving a set of documents.
+        """
+        self.written: List[Path] = []
+        self.skipped: List[Path] = []
+        self.failed: List[Tuple[Path, str]] = []
+
+    def __str__(self) -> str:
+        return f"{len(self.written)} written, {len(self.skipped)} already up to date, {len(self.failed)} failed"
+
+
+def save_documents(documents: Iterable[Document], jobs: int = SAVE_JOBS) -> SaveReport:
+    """
+    Save documents on a pool of threads, see: save_document. The contents of each document are released once it's
+    saved. A document which fails to save is reported and keeps its contents, the rest are still saved.
+    :param documents: The documents to save.
+    :param jobs: The number of threads writing documents.
+    :return: What was written, skipped and failed.
+    """
+    created_directories: Set[Path] = set()
+
+    def _save(document: Document) -> bool:
+        with trace("save_document", "save", path=str(document.target_path)):
+            return save_document(document, created_directories)
+
+    report = SaveReport()
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="mddocformatter-save") as pool:
+        futures = [(x, pool.submit(_save, x)) for x in documents]
+        for document, future in futures:
+            try:
+                written = future.result()
+            except OSError as e:
+                logger.error(f"Unable to save {document.input_path} to {document.target_path}: {e}")
+                report.failed.append((document.target_path, str(e)))
+                continue
+            (report.written if written else report.skipped).append(document.target_path)
+            document.release()
+    return report
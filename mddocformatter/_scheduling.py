@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import time
+import heapq
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
+from ._consts import GLOSSARY_DOCUMENT_NAME, Passes, RuleData
+from ._execution import DispatchPlan, RuleStatistics, apply_rules, merge_rule_statistics, merge_timings
+from ._tracing import active_tracer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ._document import Document
+    from ._processing import ProcessingContext
+    from .rules import DocumentRule
+
+
+# The data of other documents a rule can read, and the data which rules write to change it.
+_LINKED_DATA = ((RuleData.LINKED_CONTENTS, RuleData.CONTENTS), (RuleData.LINKED_TARGET_PATHS, RuleData.TARGET_PATH))
+
+# A rule to run on a document: the pass it's in, the index of the document and the index of the rule in its rules.
+Step = Tuple[int, int, int]
+
+StepResult = Tuple[float, float, Dict[str, float], Dict[str, RuleStatistics]]
+
+
+class RuleScheduler(object):
+    def __init__(self, context: ProcessingContext, plan: DispatchPlan, documents: Sequence[Document]):
+        """
+        Runs the rules on a set of documents without waiting for every document to finish one pass before any starts
+        the next. Instead, each rule runs on a document as soon as the data it reads is ready, so long as nothing it
+        reads from an earlier pass is still to be written and nothing it writes is still to be read in an earlier pass:
+          - The rules for each document run one at a time, in the order of their passes and then of the rule set.
+          - A rule which reads the contents or target paths of linked documents waits for the rules in earlier passes
+            which write them, on every other document, e.g. santize_internal_links waits for the documents to be
+            renamed. Likewise, a rule which writes them waits for the rules in earlier passes which read them.
+          - A rule which reads the glossary only waits for the rules in earlier passes which write its target path.
+          - A rule which is skipped for a document, because the document contains none of its triggers, reads and
+            writes nothing, so it doesn't wait.
+        Rules which don't declare what they read and write are assumed to read and write everything, so they wait just
+        as they would for the passes to finish. Ready rules run earliest pass first, then in the order of the documents.
+        :param context: The ProcessingContext.
+        :param plan: The rules to apply to each document.
+        :param documents: The documents to process.
+        """
+        self.context = context
+        self.plan = plan
+        self.documents = list(documents)
+        self._rules: List[List[DocumentRule]] = [
+            [rule for x in Passes for rule in plan.rules_for(x, document)] for document in self.documents
+        ]
+        glossary = context.get_document_by_name(GLOSSARY_DOCUMENT_NAME)
+        self._glossary = next((i for i, x in enumerate(self.documents) if x is glossary), None)
+        # The number of steps, by pass, still to write (or read) each type of data.
+        self._writes: Dict[Tuple[int, RuleData], int] = {(x.value, y): 0 for x in Passes for y in RuleData}
+        self._reads: Dict[Tuple[int, RuleData], int] = {(x.value, y): 0 for x in Passes for y in RuleData}
+        self._glossary_writes: Dict[int, int] = {x.value: 0 for x in Passes}
+        for i, rules in enumerate(self._rules):
+            for rule in rules:
+                self._count(i, rule, 1)
+        self._ready: List[Step] = []
+        self._waiting: List[Step] = []
+        # The start of the first step and the end of the last step in each pass.
+        self._pass_times: Dict[int, Tuple[float, float]] = {}
+        # Guards all the above, which the workers update as they take and finish steps.
+        self._condition = threading.Condition()
+        self._running = 0
+        self._failed = False
+
+    def _count(self, document_index: int, rule: DocumentRule, n: int) -> bool:
+        """:return: True if any count of the steps still to read or write something dropped to 0."""
+        pass_index, cleared = rule.pass_index.value, False
+        for counts, data in ((self._writes, rule.writes), (self._reads, rule.reads)):
+            for x in data:
+                counts[(pass_index, x)] += n
+                cleared = cleared or not counts[(pass_index, x)]
+        if document_index == self._glossary and RuleData.TARGET_PATH in rule.writes:
+            self._glossary_writes[pass_index] += n
+            cleared = cleared or not self._glossary_writes[pass_index]
+        return cleared
+
+    def _is_ready(self, step: Step) -> bool:
+        """:return: True if nothing a step reads, or writes, is still to be written, or read, in an earlier pass."""
+        pass_index, document_index, rule_index = step
+        rule = self._rules[document_index][rule_index]
+        earlier = range(pass_index)
+        for linked, data in _LINKED_DATA:
+            if linked in rule.reads and any(self._writes[(x, data)] for x in earlier):
+                return False
+            if data in rule.writes and any(self._reads[(x, linked)] for x in earlier):
+                return False
+        if RuleData.GLOSSARY in rule.reads and any(self._glossary_writes[x] for x in earlier):
+            return False
+        if document_index == self._glossary and RuleData.TARGET_PATH in rule.writes:
+            return not any(self._reads[(x, RuleData.GLOSSARY)] for x in earlier)
+        return True
+
+    def _is_skipped(self, document_index: int, rule_index: int) -> bool:
+        """
+        :return: True if a rule is going to be skipped for a document, as it contains none of the rule's triggers.
+                 This can read the document from disk, so mustn't be called with the condition held, and is only
+                 correct once the rules before it on the document are done.
+        """
+        if rule_index >= len(self._rules[document_index]):
+            return False
+        rule = self._rules[document_index][rule_index]
+        return bool(rule.triggers) and not self.plan.features.triggered(rule, self.documents[document_index])
+
+    def _reach(self, document_index: int, rule_index: int, skipped: bool):
+        """Queue the next rule for a document, once the rules before it are done."""
+        if rule_index < len(self._rules[document_index]):
+            step = (self._rules[document_index][rule_index].pass_index.value, document_index, rule_index)
+            if skipped or self._is_ready(step):
+                heapq.heappush(self._ready, step)
+            else:
+                self._waiting.append(step)
+
+    def _finish(self, step: Step, result: StepResult, next_skipped: bool):
+        pass_index, document_index, rule_index = step
+        start, end, rule_timings, rule_statistics = result
+        merge_timings(self.context.rule_timings, rule_timings)
+        merge_rule_statistics(self.context.rule_statistics, rule_statistics)
+        first, last = self._pass_times.get(pass_index, (start, end))
+        self._pass_times[pass_index] = (min(first, start), max(last, end))
+        if self._count(document_index, self._rules[document_index][rule_index], -1) and self._waiting:
+            waiting, self._waiting = self._waiting, []
+            for x in waiting:
+                if self._is_ready(x):
+                    heapq.heappush(self._ready, x)
+                else:
+                    self._waiting.append(x)
+        self._reach(document_index, rule_index + 1, next_skipped)
+
+    def _apply(self, step: Step) -> StepResult:
+        _, document_index, rule_index = step
+        rule_timings: Dict[str, float] = {}
+        rule_statistics: Dict[str, RuleStatistics] = {}
+        rules = self._rules[document_index][rule_index : rule_index + 1]
+        start = time.perf_counter()
+        apply_rules(
+            self.context, self.documents[document_index], rules, rule_timings, self.plan.features, rule_statistics
+        )
+        return start, time.perf_counter(), rule_timings, rule_statistics
+
+    def _work(self):
+        """
+        Worker loop: take the next ready step and run it, until there are none left and none running which could make
+        more ready. A rule raising an exception stops every worker. Whether the next rule for the document will be
+        skipped is worked out before taking the condition, as it can read the document.
+        """
+        while True:
+            with self._condition:
+                while not self._ready and self._running and not self._failed:
+                    self._condition.wait()
+                if self._failed or not self._ready:
+                    return
+                step = heapq.heappop(self._ready)
+                self._running += 1
+            try:
+                result = self._apply(step)
+                next_skipped = self._is_skipped(step[1], step[2] + 1)
+            except BaseException:
+                with self._condition:
+                    self._running -= 1
+                    self._failed = True
+                    self._condition.notify_all()
+                raise
+            with self._condition:
+                self._running -= 1
+                self._finish(step, result, next_skipped)
+                self._condition.notify_all()
+
+    def run(self) -> None:
+        """
+        Run the rules on the documents, on a pool of threads when the context's settings have more than one job. The
+        time from the first rule starting to the last rule finishing in each pass is recorded as the time of the pass.
+        """
+        for i, rules in enumerate(self._rules):
+            # Only read a document to check whether its first rule is skipped when the rule would otherwise wait, as
+            # the workers aren't started yet. The first rules in the first pass never wait.
+            waits = bool(rules) and not self._is_ready((rules[0].pass_index.value, i, 0))
+            self._reach(i, 0, waits and self._is_skipped(i, 0))
+        jobs = self.context.settings.jobs
+        if jobs == 1:
+            self._work()
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                workers = [pool.submit(self._work) for _ in range(jobs)]
+                for worker in workers:
+                    worker.result()
+        assert not self._waiting, "Rules were left waiting for data which is never going to be ready."
+        tracer = active_tracer()
+        for x in Passes:
+            phase = f"pass {x.name.lower()}"
+            start, end = self._pass_times.get(x.value, (0.0, 0.0))
+            self.context.add_timing(phase, end - start)
+            if tracer is not None and x.value in self._pass_times:
+                tracer.add_span(phase, "phase", start, end, {"documents": len(self.documents)})
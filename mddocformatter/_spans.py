@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import re
+import sys
+import bisect
+
+from typing import Dict, Iterable, List, Tuple
+from ._consts import SpanType, regex_markdown_link
+
+Span = Tuple[int, int]
+
+regex_code_fence = re.compile(r"^ {0,3}(`{3,}|~{3,})", re.MULTILINE)
+regex_backticks = re.compile(r"`+")
+regex_heading = re.compile(r"^[ \t]*#.*$", re.MULTILINE)
+regex_heading_text = re.compile(r"[ \t]*#+\s*(.*?)(?:\s+#+)?\s*")
+
+
+def _find_code_fences(text: str) -> List[Span]:
+    spans = []
+    pointer = 0
+    while True:
+        opening = regex_code_fence.search(text, pointer)
+        if opening is None:
+            break
+        fence = opening.group(1)
+        closing = re.compile(rf"^ {{0,3}}{fence[0]}{{{len(fence)},}}[ \t]*$", re.MULTILINE)
+        line_end = text.find("\n", opening.end())
+        match = closing.search(text, line_end) if line_end >= 0 else None
+        end = match.end() if match else len(text)
+        spans.append((opening.start(), end))
+        pointer = end
+    return spans
+
+
+def _find_inline_code(text: str, start: int, end: int) -> List[Span]:
+    spans = []
+    pointer = start
+    while True:
+        opening = regex_backticks.search(text, pointer, end)
+        if opening is None:
+            break
+        length = len(opening.group(0))
+        closing = regex_backticks.search(text, opening.end(), end)
+        while closing is not None and len(closing.group(0)) != length:
+            closing = regex_backticks.search(text, closing.end(), end)
+        if closing is None:  # an unmatched run of backticks is just text.
+            pointer = opening.end()
+        else:
+            spans.append((opening.start(), closing.end()))
+            pointer = closing.end()
+    return spans
+
+
+def _find_links(text: str, start: int, end: int, inline_code: List[Span]) -> List[Span]:
+    spans = []
+    pointer = start
+    while True:
+        match = regex_markdown_link.search(text, pointer, end)
+        if match is None:
+            break
+        code = find_span(inline_code, match.start())
+        if code is not None:  # the link starts inside code, so it's just text.
+            pointer = code[1]
+            continue
+        code = find_span(inline_code, match.end() - 1)
+        if code is not None and code[1] > match.end():  # the link ends inside code, look for a shorter one.
+            pointer = match.start() + 1
+            continue
+        spans.append(match.span(0))
+        pointer = match.end()
+    return spans
+
+
+def _gaps(spans: List[Span], length: int) -> Iterable[Span]:
+    pointer = 0
+    for start, end in spans:
+        if start > pointer:
+            yield pointer, start
+        pointer = end
+    if pointer < length:
+        yield pointer, length
+
+
+def merge_spans(*span_lists: Iterable[Span]) -> List[Span]:
+    """:return: The spans from all the lists given, sorted, with any overlapping spans merged."""
+    merged: List[Span] = []
+    for start, end in sorted(x for spans in span_lists for x in spans):
+        if merged and start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_span(spans: List[Span], offset: int) -> Span | None:
+    """:return: The span, from a sorted list of non-overlapping spans, which contains the offset or None."""
+    i = bisect.bisect_right(spans, (offset, sys.maxsize))
+    if i > 0 and spans[i - 1][0] <= offset < spans[i - 1][1]:
+        return spans[i - 1]
+    return None
+
+
+def anchor_key(text: str) -> str:
+    """:return: The form of a heading, or a section reference to one, used to match them: lowercase, with - as space."""
+    return text.lower().replace("-", " ")
+
+
+class AnchorIndex(object):
+    def __init__(self, text: str, headings: Iterable[Span]):
+        """
+        An index of the headings in a document, to find the heading a section reference, e.g. the "sub-section" in
+        "file.md#sub-section", refers to. Matching ignores case and treats - and space as the same.
+        :param text: The document contents.
+        :param headings: The spans of the headings in the contents.
+        """
+        self._exact: Dict[str, str] = {}
+        self._sorted: List[Tuple[str, int, str]] = []
+        for i, (start, end) in enumerate(headings):
+            match = regex_heading_text.fullmatch(text, start, end)
+            if match is None or not match.group(1):
+                continue
+            heading = match.group(1)
+            key = anchor_key(heading)
+            self._exact.setdefault(key, heading)
+            self._sorted.append((key, i, heading))
+        self._sorted.sort()
+
+    def find(self, section: str) -> str | None:
+        """
+        :param section: A section reference, without the #.
+        :return: The text of the first heading matching the section, or, if there isn't one, the start of the first
+                 heading which begins with it, as long as the section. None if no heading matches.
+        """
+        key = anchor_key(section)
+        heading = self._exact.get(key, None)
+        if heading is not None:
+            return heading
+        best = None
+        for i in range(bisect.bisect_left(self._sorted, (key,)), len(self._sorted)):
+            candidate, order, heading = self._sorted[i]
+            if not candidate.startswith(key):
+                break
+            if best is None or order < best[0]:
+                best = (order, heading[: len(section)])
+        return None if best is None else best[1]
+
+
+class SpanIndex(object):
+    def __init__(self, text: str):
+        """
+        An index of the regions of a markdown document that rules need to know about: links, code fences, inline code
+        and headings. Each type of span is kept as a sorted list of non-overlapping (start, end) tuples. Links and
+        headings inside code are not counted as either, but the text of a link may contain inline code.
+        :param text: The document contents to index.
+        """
+        fences = _find_code_fences(text)
+        inline_code: List[Span] = []
+        links: List[Span] = []
+        for start, end in _gaps(fences, len(text)):
+            inline_code.extend(_find_inline_code(text, start, end))
+        for start, end in _gaps(fences, len(text)):
+            links.extend(_find_links(text, start, end, inline_code))
+        headings = [x.span(0) for x in regex_heading.finditer(text) if find_span(fences, x.start()) is None]
+        self._spans: Dict[SpanType, List[Span]] = {
+            SpanType.LINK: links,
+            SpanType.CODE_FENCE: fences,
+            SpanType.INLINE_CODE: inline_code,
+            SpanType.HEADING: headings,
+        }
+        self._merged: Dict[Tuple[SpanType, ...], List[Span]] = {}
+        self._text = text
+        self._anchors: AnchorIndex | None = None
+
+    @property
+    def text(self) -> str:
+        """
+        :return: The text the index was built from.
+        """
+        return self._text
+
+    @property
+    def anchors(self) -> AnchorIndex:
+        """
+        :return: The index of the headings, by the section references which match them, built on first use.
+        """
+        if self._anchors is None:
+            self._anchors = AnchorIndex(self._text, self._spans[SpanType.HEADING])
+        return self._anchors
+
+    def spans(self, *span_types: SpanType) -> List[Span]:
+        """
+        :param span_types: The types of span to get.
+        :return: The sorted spans of the given types, with overlapping spans merged. Do not modify the result.
+        """
+        key = tuple(sorted(span_types, key=lambda x: x.value))
+        if len(key) == 1:
+            return self._spans[key[0]]
+        if key not in self._merged:
+            self._merged[key] = merge_spans(*(self._spans[x] for x in key))
+        return self._merged[key]
+
+    def find(self, offset: int, *span_types: SpanType) -> Span | None:
+        """
+        :param offset: An index in the document contents.
+        :param span_types: The types of span to look in.
+        :return: The span, of the given types, which contains the offset, or None if it's not inside one.
+        """
+        return find_span(self.spans(*span_types), offset)
+
+    def is_protected(self, offset: int, *span_types: SpanType) -> bool:
+        """
+        :param offset: An index in the document contents.
+        :param span_types: The types of span that are protected, defaults to links and code.
+        :return: True if the offset is inside a span of one of the given types.
+        """
+        return self.find(offset, *(span_types or PROTECTED_SPAN_TYPES)) is not None
+
+
+CODE_SPAN_TYPES = (SpanType.CODE_FENCE, SpanType.INLINE_CODE)
+PROTECTED_SPAN_TYPES = (SpanType.LINK, SpanType.CODE_FENCE, SpanType.INLINE_CODE)
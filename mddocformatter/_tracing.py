@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import threading
+import contextlib
+
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List
+
+# The tracer recording the current run, if any. Forked worker processes inherit it along with the rest of the module.
+_tracer: Tracer | None = None
+_untraced: ContextManager[None] = contextlib.nullcontext()
+
+
+class Tracer(object):
+    def __init__(self) -> None:
+        """
+        Records spans of time spent in each part of a run, in the Chrome Trace Event Format, so a run can be viewed as
+        a timeline in chrome://tracing or https://ui.perfetto.dev. Each process and thread gets its own track.
+        """
+        self.events: List[Dict[str, Any]] = []
+        self.pid = os.getpid()
+
+    def add_span(self, name: str, category: str, start: float, end: float, args: Dict[str, Any] | None = None):
+        """
+        Record a span of time on the calling thread's track.
+        :param name: The name of the span, e.g. the name of a rule.
+        :param category: The kind of span, e.g. "rule" or "save".
+        :param start: When the span started, from time.perf_counter.
+        :param end: When the span ended, from time.perf_counter.
+        :param args: Details to show with the span, e.g. the document being processed.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args) -> Iterator[None]:
+        """
+        Record the time spent in a block of code as a span.
+        :param name: The name of the span.
+        :param category: The kind of span.
+        :param args: Details to show with the span.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, start, time.perf_counter(), args)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """:return: The events recorded so far, which are then forgotten, e.g. to send them from a worker process."""
+        events, self.events = self.events, []
+        return events
+
+    def to_json(self) -> Dict[str, Any]:
+        """:return: The trace, with the processes named so the workers can be told apart."""
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "mddocformatter" if pid == self.pid else f"worker {pid}"},
+            }
+            for pid in sorted({x["pid"] for x in self.events} | {self.pid})
+        ]
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Path):
+        """
+        Write the trace to a JSON file.
+        :param path: The file to write.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as fd:
+            json.dump(self.to_json(), fd)
+
+
+def active_tracer() -> Tracer | None:
+    """:return: The tracer recording the current run, or None when tracing is off."""
+    return _tracer
+
+
+def trace(name: str, category: str, **args) -> ContextManager[None]:
+    """
+    Record the time spent in a block of code as a span, if tracing is on. When it's off this costs a single check.
+    :param name: The name of the span.
+    :param category: The kind of span.
+    :param args: Details to show with the span.
+    :return: A context manager around the block of code.
+    """
+    tracer = _tracer
+    return _untraced if tracer is None else tracer.span(name, category, **args)
+
+
+@contextlib.contextmanager
+def trace_to(path: Path | None) -> Iterator[Tracer | None]:
+    """
+    Trace everything run in the block and write the trace to a file at the end of it.
+    :param path: The file to write the trace to, or None to leave tracing off.
+    :return: A context manager giving the tracer.
+    """
+    global _tracer
+
+    if path is None:
+        yield None
+        return
+    previous, _tracer = _tracer, Tracer()
+    tracer = _tracer
+    try:
+        yield tracer
+    finally:
+        _tracer = previous
+        tracer.save(path)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+from ._consts import N_CONTEXT_LINES_IN_DIFF
+from ._document import Document
+from ._tracing import trace
+
+
+class ValidationReport(object):
+    def __init__(self) -> None:
+        """
+        The outcome of validating a set of documents: which of them the rules would change.
+        """
+        self.checked: int = 0
+        self.invalid: List[Document] = []
+        self.stopped: bool = False
+
+    @property
+    def valid(self) -> bool:
+        """:return: True if none of the documents would be changed."""
+        return not self.invalid
+
+    def __str__(self) -> str:
+        s = f"{self.checked} checked, {len(self.invalid)} invalid"
+        return s + ", stopped at the first invalid document" if self.stopped else s
+
+
+def is_unchanged(document: Document) -> bool:
+    """
+    Check whether the rules left a document as it was, without diffing it. A document whose contents were never set is
+    unchanged, one whose length changed is not, and otherwise its original and current contents are compared.
+    :param document: The processed document.
+    :return: True if the current contents are the same as the original contents.
+    """
+    if not document.modified:
+        return True
+    contents, original = document.contents, document.original_contents
+    if len(contents) != len(original):
+        return False
+    return contents == original
+
+
+def validate_documents(documents: Iterable[Document], fail_fast: bool = False) -> ValidationReport:
+    """
+    Find the processed documents which the rules changed. No diffs are computed, see: diff_documents.
+    :param documents: The processed documents, in the order to check them.
+    :param fail_fast: Stop checking at the first invalid document. The documents have all been processed by now, so
+                      this only saves checking, and diffing, the rest.
+    :return: The documents checked and those found to be invalid.
+    """
+    report = ValidationReport()
+    with trace("validate", "phase"):
+        for document in documents:
+            report.checked += 1
+            if not is_unchanged(document):
+                report.invalid.append(document)
+                if fail_fast:
+                    report.stopped = True
+                    break
+    return report
+
+
+def _diff(original: str, contents: str, n_context_lines: int) -> List[str]:
+    document = Document(Path(), original)
+    document.contents = contents
+    return list(document.iter_changes(n_context_lines))
+
+
+def diff_documents(
+    documents: Iterable[Document], n_context_lines: int = N_CONTEXT_LINES_IN_DIFF, jobs: int = 1
+) -> Iterator[Tuple[Document, Iterable[str]]]:
+    """
+    Describe the changes the rules made to documents, only computing each diff when it's reached.
+    :param documents: The changed documents.
+    :param n_context_lines: The number of "context" lines to show above+below a change.
+    :param jobs: The number of worker processes to compute the diffs on. With 1 each diff is streamed a line at a time
+                 as it's consumed, otherwise they're computed ahead on the workers, and yielded in order.
+    :return: A generator of tuples of each document and the lines of its diff.
+    """
+    documents = list(documents)
+    if jobs <= 1 or len(documents) <= 1:
+        for document in documents:
+            yield document, document.iter_changes(n_context_lines)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(documents))) as pool:
+        futures = [pool.submit(_diff, x.original_contents, x.contents, n_context_lines) for x in documents]
+        for document, future in zip(documents, futures):
+            yield document, future.result()
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import time
+import logging
+
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple, TYPE_CHECKING
+from ._consts import CACHE_DIRECTORY_NAME, WATCH_INTERVAL, WATCH_DEBOUNCE, FunctionMacro
+from ._document import Document
+from ._incremental import add_dependents, fingerprint_macros
+from ._processing import ProcessingContext, ProcessingSettings, _discover_documents
+from . import loading
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .rules import DocumentRule
+
+
+logger = logging.getLogger(__name__)
+
+FileState = Tuple[int, int]
+
+
+def _stat(path: Path) -> FileState | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class WatchChanges(object):
+    def __init__(
+        self, created: Set[Path] | None = None, modified: Set[Path] | None = None, deleted: Set[Path] | None = None
+    ):
+        """
+        The files which changed between two polls of a Watcher.
+        :param created: The files which were created.
+        :param modified: The files which were modified.
+        :param deleted: The files which were deleted.
+        """
+        self.created: Set[Path] = created or set()
+        self.modified: Set[Path] = modified or set()
+        self.deleted: Set[Path] = deleted or set()
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.modified or self.deleted)
+
+    def __contains__(self, path: Path) -> bool:
+        return path in self.created or path in self.modified or path in self.deleted
+
+    def update(self, later: WatchChanges):
+        """
+        Combine these changes with ones that happened after them, e.g. a file created and then deleted is dropped.
+        :param later: The later changes.
+        """
+        for path in later.created:
+            if path in self.deleted:
+                self.deleted.discard(path)
+                self.modified.add(path)
+            else:
+                self.created.add(path)
+        for path in later.modified:
+            if path not in self.created:
+                self.modified.add(path)
+        for path in later.deleted:
+            self.modified.discard(path)
+            if path in self.created:
+                self.created.discard(path)
+            else:
+                self.deleted.add(path)
+
+
+class Watcher(object):
+    def __init__(
+        self,
+        settings: ProcessingSettings,
+        base_rules: List[DocumentRule] | None = None,
+        macros_path: Path | None = None,
+        rules_path: Path | None = None,
+        interval: float = WATCH_INTERVAL,
+        debounce: float = WATCH_DEBOUNCE,
+    ):
+        """
+        Keeps a ProcessingContext warm and reprocesses only the documents affected by each change to the files under
+        the root directory. The files are polled, as there's no portable way to be notified of changes.
+        :param settings: The settings to process with.
+        :param base_rules: The rules used besides those from the rules module, defaults to the rules in the settings.
+        :param macros_path: The macros module, which is reloaded when it changes.
+        :param rules_path: The custom rules module, which is reloaded when it changes.
+        :param interval: The number of seconds between polls.
+        :param debounce: How long, in seconds, the files must stay unchanged before a burst of changes is processed.
+        """
+        self.settings = settings
+        self.base_rules = list(settings.rules if base_rules is None else base_rules)
+        self.macros_path = macros_path
+        self.rules_path = rules_path
+        self.interval = interval
+        self.debounce = debounce
+        self.context = ProcessingContext(settings)
+        self._snapshot: Dict[Path, FileState] = {}
+
+    def _ignored(self, path: Path) -> bool:
+        root, target = self.settings.root_directory, self.settings.target_directory
+        if CACHE_DIRECTORY_NAME in path.relative_to(root).parts:
+            return True
+        return target != root and path.is_relative_to(target)
+
+    def _scan(self) -> Dict[Path, FileState]:
+        result: Dict[Path, FileState] = {}
+        for path in _discover_documents(self.settings.root_directory, self.settings.target_directory):
+            state = _stat(path)
+            if state is not None:
+                result[path] = state
+        for module_path in (self.macros_path, self.rules_path):
+            state = _stat(module_path) if module_path is not None else None
+            if module_path is not None and state is not None:
+                result[module_path] = state
+        return result
+
+    def poll(self) -> WatchChanges:
+        """
+        Check the files for changes since the last poll.
+        :return: The changes.
+        """
+        current = self._scan()
+        previous, self._snapshot = self._snapshot, current
+        return WatchChanges(
+            created={x for x in current if x not in previous},
+            modified={x for x, state in current.items() if x in previous and previous[x] != state},
+            deleted={x for x in previous if x not in current},
+        )
+
+    def build(self) -> List[Document]:
+        """
+        Discover and process all the documents.
+        :return: The documents processed.
+        """
+        self._snapshot = self._scan()
+        self.context.add_documents(
+            _discover_documents(self.settings.root_directory, self.settings.target_directory), load=False, verify=False
+        )
+        documents = list(self.context.documents.values())
+        self._process(documents)
+        return documents
+
+    def _reload_macros(self) -> Set[str]:
+        """Reload the macros module and :return: the names of the macros which changed."""
+        assert self.macros_path is not None
+        previous = fingerprint_macros(self.settings)
+        try:
+            self.settings.const_macros, self.settings.function_macros = loading.load_macros_from_py_file(
+                self.macros_path
+            )
+        except Exception:
+            logger.exception(f"Unable to reload the macros from {self.macros_path}, keeping the previous macros.")
+            return set()
+        current = fingerprint_macros(self.settings)
+        self.context.clear_resources()
+        return {x for x in previous.keys() | current.keys() if previous.get(x, None) != current.get(x, None)}
+
+    def _reload_rules(self) -> bool:
+        """Reload the rules module and :return: True if successful."""
+        assert self.rules_path is not None
+        try:
+            self.settings.rules = self.base_rules + loading.load_custom_rules_from_py_file(self.rules_path)
+        except Exception:
+            logger.exception(f"Unable to reload the rules from {self.rules_path}, keeping the previous rules.")
+            return False
+        return True
+
+    def process(self, changes: WatchChanges) -> List[Document]:
+        """
+        Reprocess the documents affected by a set of changes: the changed documents and those that depend on them, e.g.
+        through links or glossary terms. Creating a document, or changing the rules, reprocesses everything.
+        :param changes: The changes, see: poll.
+        :return: The documents processed.
+        """
+        context = self.context
+        everything = self.rules_path is not None and self.rules_path in changes and self._reload_rules()
+        changed_macros = (
+            self._reload_macros() if self.macros_path is not None and self.macros_path in changes else set()
+        )
+
+        modules = {self.macros_path, self.rules_path}
+        changed = {x for x in changes.modified if x not in modules and x in context.documents}
+        for path in changes.deleted - modules:
+            document = context.remove_document(path)
+            if document is not None:
+                context.dependencies.pop(path, None)
+                context.macro_dependencies.pop(path, None)
+                if document.target_path != path and document.target_path.exists():
+                    document.target_path.unlink()
+                changed.add(path)
+        for path in changes.created - modules:
+            if path.is_file() and not self._ignored(path):
+                context.add_document(path)
+                everything = True
+
+        if everything:
+            affected = set(context.documents)
+        else:
+            affected = changed | {x for x, names in context.macro_dependencies.items() if names & changed_macros}
+            affected = add_dependents(affected, context.dependencies) & context.documents.keys()
+        for path in affected:  # start again from the input, replacing the processed document.
+            context.add_document(path)
+            context.dependencies.pop(path, None)
+            context.macro_dependencies.pop(path, None)
+        documents = [x for path, x in context.documents.items() if path in affected]
+        self._process(documents)
+        return documents
+
+    def _process(self, documents: List[Document]):
+        start = time.perf_counter()
+        self.context.run(documents)
+        report = self.context.save(documents)
+        for document in documents:  # don't pick up documents saved in place as changes.
+            state = _stat(document.target_path)
+            if state is not None and document.target_path in self._snapshot:
+                self._snapshot[document.target_path] = state
+        logger.info(f"Processed {len(documents)} documents in {(time.perf_counter() - start) * 1000:.1f}ms: {report}.")
+        if report.failed:
+            failed = "\n    - ".join(str(path) for path, _ in report.failed)
+            logger.error(f"Some documents couldn't be saved: \n    - {failed}")
+
+    def run(self, stop: Callable[[], bool] = lambda: False):
+        """
+        Process everything, then keep reprocessing the affected documents as files change.
+        :param stop: Called between polls, return True to stop watching.
+        """
+        self.build()
+        logger.info(f"Watching {self.settings.root_directory} for changes...")
+        while not stop():
+            time.sleep(self.interval)
+            changes = self.poll()
+            while changes and not stop():  # wait for a burst of changes to finish before processing them.
+                time.sleep(self.debounce)
+                later = self.poll()
+                if not later:
+                    break
+                changes.update(later)
+            if changes:
+                self.process(changes)
+
+
+def watch_docs(
+    input_dir: Path,
+    output_dir: Path,
+    rule_set: list,
+    const_macros: Dict[str, str] | None = None,
+    function_macros: Dict[str, FunctionMacro] | None = None,
+    version_name: str = "",
+    jobs: int = 1,
+    macros_path: Path | None = None,
+    rules_path: Path | None = None,
+    base_rules: List[DocumentRule] | None = None,
+) -> bool:
+    """
+    Process all the documentation in the input_dir, then keep watching it and reprocess the documents affected by each
+    change, until interrupted.
+    :param input_dir: The root of the documentation tree.
+    :param output_dir: The target_path directory under which to put the newly processed documents - can be
+                             the same as the root directory for in-place processing.
+    :param rule_set: The rules to run on each doc.
+    :param const_macros: A table of const value macros.
+    :param function_macros: A table of function macros which take 0 or more strings as args and returns a string.
+    :param version_name: The name of the version of the documentation, mostly used for confluence naming. Usually
+                         develop or main.
+    :param jobs: The number of workers to spread the processing over.
+    :param macros_path: The macros module, which is reloaded when it changes.
+    :param rules_path: The custom rules module, which is reloaded when it changes.
+    :param base_rules: The rules used besides those from the rules module, defaults to rule_set.
+    :return: True once stopped.
+    """
+    settings = ProcessingSettings(input_dir, output_dir, version_name, rule_set, const_macros, function_macros, jobs)
+    watcher = Watcher(settings, base_rules, macros_path, rules_path)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
+    return True
@@ -8,11 +8,15 @@ from mddocformatter import (
     DeploymentStyle,
     process_docs,
     validate_docs,
+    watch_docs,
+    bench_docs,
+    trace_to,
     loading,
     rules,
     DocumentRule,
     FunctionMacro,
 )
+from mddocformatter._consts import BENCH_THRESHOLD
 
 
 def _process_path_arg(path, arg_name, expect_exists=True, expect_dir=False):
@@ -37,15 +41,43 @@ def _deploymentStyle(value):
     raise argparse.ArgumentTypeError("Deployment type invalid: {}".format(value))
 
 
-def parse_args(
-    argv: list | None = None,
-) -> Tuple[pathlib.Path, pathlib.Path, List[DocumentRule], Dict[str, str], Dict[str, FunctionMacro], str, bool, bool]:
+def _jobs(value):
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("jobs: expected a whole number, got: {}".format(value))
+    if jobs < 1:
+        raise argparse.ArgumentTypeError("jobs: must be at least 1, got: {}".format(value))
+    return jobs
+
+
+def _runs(value):
+    try:
+        runs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("bench: expected a whole number, got: {}".format(value))
+    if runs < 1:
+        raise argparse.ArgumentTypeError("bench: must be at least 1, got: {}".format(value))
+    return runs
+
+
+def _threshold(value):
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("bench-threshold: expected a number, got: {}".format(value))
+    if threshold < 0:
+        raise argparse.ArgumentTypeError("bench-threshold: can't be negative, got: {}".format(value))
+    return threshold
+
+
+def parse_options(argv: list | None = None) -> argparse.Namespace:
     """
-    Parse the command line args.
+    Parse the command line args into a namespace. The rule set and macros are loaded and stored in the namespace as
+    rule_set, const_macros and function_macros, and output is defaulted to the input directory. The rules for the
+    style alone are stored as base_rules.
     :param argv: argument list from the command line.
-    :return: tuple of the parsed args:
-               - input file relative_path
-               - output relative_path
+    :return: The parsed options.
     """
     parser = argparse.ArgumentParser(description="Convert basic obj/collada/fbx/usd meshes to Gr2")
     group = parser.add_mutually_exclusive_group()
@@ -96,14 +128,107 @@ def parse_args(
         "the requirements for the given style or not.",
         action="store_true",
     )
+    parser.add_argument(
+        "--fail-fast",
+        default=False,
+        help="Stop reporting at the first document which doesn't meet the requirements, so only it is diffed. All "
+        "the documentation is still processed first.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-diff",
+        dest="show_changes",
+        default=True,
+        help="Only report which documents don't meet the requirements when validating, without the changes they need.",
+        action="store_false",
+    )
+    parser.add_argument(
+        "--fused",
+        default=False,
+        help="Run the built-in rules which scan for the same things as one rule, for fewer scans of each document.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        default=1,
+        help="The number of worker processes to spread the processing over.",
+        type=_jobs,
+    )
+    parser.add_argument(
+        "--incremental",
+        default=False,
+        help="Only process the documents which changed since the last incremental run to the same output, along with "
+        "the documents which depend on them. The build state is kept in a .mddocformatter directory in the output.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--watch",
+        default=False,
+        help="Process the documentation, then keep watching the input for changes and reprocess the documents they "
+        "affect. Changes to the macros and rules modules are picked up too. Stop with Ctrl+C.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--bench",
+        default=None,
+        metavar="RUNS",
+        help="Process the documentation the given number of times, without saving it, and report the time spent in "
+        "each phase and rule.",
+        type=_runs,
+    )
+    parser.add_argument(
+        "--bench-output",
+        default=None,
+        help="Where to write the bench result as JSON, for use as a later --bench-baseline.",
+        type=lambda x: _process_path_arg(x, "bench-output", False, False),
+    )
+    parser.add_argument(
+        "--bench-baseline",
+        default=None,
+        help="A bench result to compare against. The run fails if anything is significantly slower.",
+        type=lambda x: _process_path_arg(x, "bench-baseline", True, False),
+    )
+    parser.add_argument(
+        "--bench-threshold",
+        default=BENCH_THRESHOLD,
+        help="The smallest slowdown compared to the baseline to fail on, as a fraction, e.g. 0.05 for 5%%.",
+        type=_threshold,
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="FILE",
+        help="Write a timeline of the run to the given file, in the Chrome Trace Event Format, for viewing in "
+        "chrome://tracing or https://ui.perfetto.dev.",
+        type=lambda x: _process_path_arg(x, "trace", False, False),
+    )
     parser.add_argument("--verbose", "-v", default=False, help="Use verbose logging", action="store_true")
     args = parser.parse_args(argv)
 
     rule_set = rules.GetRulesForStyle(args.style)
+    if args.fused:
+        rule_set = rules.fuse_rules(rule_set)
 
     if args.style == DeploymentStyle.CUSTOM and args.rules is None:
         parser.error("You must provide a module with custom rules to use the custom deployment style.")
 
+    if args.watch and args.validate:
+        parser.error("--watch can't be used with --validate.")
+
+    if args.incremental and (args.validate or args.watch):
+        parser.error("--incremental can't be used with --validate or --watch.")
+
+    if args.bench is not None and (args.watch or args.validate or args.incremental):
+        parser.error("--bench can't be used with --watch, --validate or --incremental.")
+
+    if not args.validate and (args.fail_fast or not args.show_changes):
+        parser.error("--fail-fast and --no-diff require --validate.")
+
+    if args.bench is None and (args.bench_output is not None or args.bench_baseline is not None):
+        parser.error("--bench-output and --bench-baseline require --bench.")
+
+    args.base_rules = list(rule_set)
     if args.rules is not None:
         rule_set.extend(loading.load_custom_rules_from_py_file(args.rules))
 
@@ -112,22 +237,96 @@ def parse_args(
     if args.macros is not None:
         const_macros, function_macros = loading.load_macros_from_py_file(args.macros)
 
-    output = args.output
+    args.rule_set = rule_set
+    args.const_macros = const_macros
+    args.function_macros = function_macros
     if args.output is None:
-        output = args.input
+        args.output = args.input
+    return args
 
-    return args.input, output, rule_set, const_macros, function_macros, args.version, args.validate, args.verbose
+
+def parse_args(
+    argv: list | None = None,
+) -> Tuple[pathlib.Path, pathlib.Path, List[DocumentRule], Dict[str, str], Dict[str, FunctionMacro], str, bool, bool]:
+    """
+    Parse the command line args.
+    :param argv: argument list from the command line.
+    :return: tuple of the parsed args:
+               - input file relative_path
+               - output relative_path
+    """
+    args = parse_options(argv)
+    return (
+        args.input,
+        args.output,
+        args.rule_set,
+        args.const_macros,
+        args.function_macros,
+        args.version,
+        args.validate,
+        args.verbose,
+    )
 
 
 def run(argv: list | None = None) -> bool:
     """
     Takes a folder of documentation and prepares it for deployment in various ways.
     """
-    input_dir, output_dir, rule_set, const_macros, function_macros, version_name, validate, verbose = parse_args(argv)
+    args = parse_options(argv)
     logging.basicConfig(
-        format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s", level=logging.DEBUG if verbose else logging.INFO
+        format="%(asctime)s %(name)-12s %(levelname)-8s %(message)s",
+        level=logging.DEBUG if args.verbose else logging.INFO,
     )
-    if not validate:
-        return process_docs(input_dir, output_dir, rule_set, const_macros, function_macros, version_name)
+    with trace_to(args.trace):
+        return _run(args)
+
+
+def _run(args: argparse.Namespace) -> bool:
+    if args.bench is not None:
+        return bench_docs(
+            args.input,
+            args.rule_set,
+            args.const_macros,
+            args.function_macros,
+            args.version,
+            jobs=args.jobs,
+            runs=args.bench,
+            output_path=args.bench_output,
+            baseline_path=args.bench_baseline,
+            threshold=args.bench_threshold,
+        )
+    elif args.watch:
+        return watch_docs(
+            args.input,
+            args.output,
+            args.rule_set,
+            args.const_macros,
+            args.function_macros,
+            args.version,
+            jobs=args.jobs,
+            macros_path=args.macros,
+            rules_path=args.rules,
+            base_rules=args.base_rules,
+        )
+    elif not args.validate:
+        return process_docs(
+            args.input,
+            args.output,
+            args.rule_set,
+            args.const_macros,
+            args.function_macros,
+            args.version,
+            jobs=args.jobs,
+            incremental=args.incremental,
+        )
     else:
-        return validate_docs(input_dir, rule_set, const_macros, function_macros, version_name)
+        return validate_docs(
+            args.input,
+            args.rule_set,
+            args.const_macros,
+            args.function_macros,
+            args.version,
+            jobs=args.jobs,
+            fail_fast=args.fail_fast,
+            show_changes=args.show_changes,
+        )
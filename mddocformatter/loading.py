@@ -1,38 +1,106 @@
+import io
+import os
 import re
+import json
+import logging
+import threading
 
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
 from types import ModuleType
 from .rules import DocumentRule
 from ._document import Document
-from ._consts import FunctionMacro, regex_glossary_synonyms
+from ._consts import FunctionMacro, regex_glossary_synonyms, GLOSSARY_CACHE_DIRECTORY_NAME, SOURCE_HASH_NAME
+from ._incremental import hash_data
+from ._macros import impure_macro
+
+
+logger = logging.getLogger(__name__)
 
 
 def load_document(path: Path):
     """
-    Load a document from a given path.
+    Load a document from a given path. The contents are only read when they're first used.
     :param path: The path to the file to load.
     """
     if not path.exists():
         raise FileNotFoundError(f"{path} not found.")
     if path.is_dir():
         raise IsADirectoryError(f"{path} is a directory, expected a file relative_path.")
-    with open(path, "r") as fd:
-        return Document(path, fd.read())
-
-
-def save_document(document: Document):  # pragma: no cover
-    """
-    Save the contents of a Document to the set target_path.
+    return Document(path, None)
+
+
+def _encode(text: str) -> bytes:
+    """:return: The bytes a file opened for writing in text mode, with the default encoding, would hold."""
+    buffer = io.BytesIO()
+    wrapper = io.TextIOWrapper(buffer)
+    wrapper.write(text)
+    wrapper.flush()
+    data = buffer.getvalue()
+    wrapper.detach()
+    return data
+
+
+def _same_contents(path: Path, data: bytes) -> bool:
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as fd:
+            return fd.read() == data
+    except OSError:
+        return False
+
+
+def _write_atomic(path: Path, data: bytes):
+    """
+    Write a file by writing a temporary file next to it and renaming it over the target, so the target is never left
+    partially written. The target keeps its permissions if it already exists.
+    """
+    try:
+        mode: int | None = os.stat(path).st_mode
+    except OSError:
+        mode = None
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def save_document(document: Document, created_directories: Set[Path] | None = None) -> bool:
+    """
+    Save the contents of a Document to the set target_path. A document whose contents were never read is copied, as it
+    can't have changed. Nothing is written if the target already holds the same contents, so its modification time is
+    left alone, otherwise the target is replaced atomically.
     :param document: The document to save.
-    """
-    document.target_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(document.target_path, "w+") as fd:
-        fd.write(document.contents)
+    :param created_directories: Directories known to exist, which are added to as directories are created, so they
+                                aren't created again for each document saved in them.
+    :return: True if the target was written, False if it was already up to date.
+    """
+    target_path = document.target_path
+    if not document.loaded and target_path == document.source_path:
+        return False
+    directory = target_path.parent
+    if created_directories is None or directory not in created_directories:
+        directory.mkdir(parents=True, exist_ok=True)
+        if created_directories is not None:
+            created_directories.add(directory)
+    data = _encode(document.contents) if document.loaded else document.source_path.read_bytes()
+    if _same_contents(target_path, data):
+        return False
+    _write_atomic(target_path, data)
+    return True
 
 
 def _import_module(module_name: str, module_contents) -> ModuleType:
     module = ModuleType(module_name)
+    setattr(module, SOURCE_HASH_NAME, hash_data(str(module_contents).encode("utf-8")))
     exec(module_contents, module.__dict__)
     return module
 
@@ -43,6 +111,8 @@ def _process_consts_module(module: ModuleType) -> Tuple[Dict[str, str], Dict[str
     for each in dir(module):
         if not each.startswith("_"):
             value = getattr(module, each)
+            if value is impure_macro:  # imported for use as a decorator, it isn't a macro itself.
+                continue
             if callable(value):
                 function_macros[each] = value
             else:
@@ -114,10 +184,12 @@ def process_glossary(glossary: str) -> List[Tuple[str, str]]:
     """
 
     def extend_glossary_data(_glossary_data, _term, _section):
-        if _term.lower() not in [x[0] for x in _glossary_data]:
+        if _term.lower() not in known_terms:
+            known_terms.add(_term.lower())
             _glossary_data.append((_term.lower(), _section))
 
     glossary_data: List[Tuple[str, str]] = []
+    known_terms: Set[str] = set()
     lines = glossary.split("\n")
     for i in range(len(lines)):
         line = lines[i].strip()
@@ -137,6 +209,37 @@ def process_glossary(glossary: str) -> List[Tuple[str, str]]:
     return glossary_data
 
 
+def process_glossary_with_cache(glossary: str, cache_directory: Path | None = None) -> List[Tuple[str, str]]:
+    """
+    Processes glossary data, as process_glossary does, but keeps the resulting table of terms in the cache directory,
+    keyed by a hash of the glossary, so it only needs processing again when the glossary changes.
+    :param glossary: The glossary data, loaded from a file.
+    :param cache_directory: Where to store the table of terms. If None, no cache is used.
+    :return: The table of terms, see: process_glossary.
+    """
+    if cache_directory is None:
+        return process_glossary(glossary)
+    cache_path = cache_directory / GLOSSARY_CACHE_DIRECTORY_NAME / f"{hash_data(glossary.encode('utf-8'))}.json"
+    # noinspection PyBroadException
+    try:
+        with open(cache_path, "r") as fd:
+            return [(term, section) for term, section in json.load(fd)]
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning(f"Unable to read the cached glossary {cache_path}, processing the glossary again.")
+    glossary_data = process_glossary(glossary)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as fd:
+            json.dump(glossary_data, fd)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        logger.warning(f"Unable to cache the glossary to {cache_path}.")
+    return glossary_data
+
+
 def load_glossary(glossary_file_path: Path) -> List[Tuple[str, str]]:
     """
     Loads the glossary markdown file and creates a table of terms for later use. The list is sorted from longest to
@@ -4,7 +4,13 @@ from ._addglossarylinks import add_glossary_links
 from ._applymacros import apply_macros
 from ._createtableofcontents import create_table_of_contents
 from ._movetotargetdirrelative import move_to_target_dir_relative
-from ._renameuniquelyforconfluence import rename_uniquely_for_confluence, path_is_confluence_style
+from ._renameuniquelyforconfluence import (
+    rename_uniquely_for_confluence,
+    path_is_confluence_style,
+    ConfluenceNamingPlan,
+    get_confluence_naming_plan,
+)
 from ._sanitizeinternallinks import santize_internal_links
+from ._fused import fuse_rules, fused_links_and_glossary, fused_toc_and_macros
 
 from ._rulesets import GetRulesForStyle
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-import re
+import bisect
 import logging
 
-from .._consts import regex_markdown_link, Passes
+from .._ahocorasick import AhoCorasick
+from .._consts import GLOSSARY_DOCUMENT_NAME, Passes, RuleData
+from .._spans import PROTECTED_SPAN_TYPES
 from ._base import document_rule
-from ._utils import form_relative_link, replace_span, format_markdown_link
+from ._utils import form_relative_link, format_markdown_link
 
-from typing import TYPE_CHECKING
+from typing import List, Sequence, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # pragma: no cover
     from .._processing import ProcessingContext
@@ -17,60 +19,132 @@ if TYPE_CHECKING:  # pragma: no cover
 logger = logging.getLogger(__name__)
 
 
-def _is_inside_markdown_link(index: int, pointer: int, document: Document) -> int:
+def _lower(text: str) -> str:
+    """:return: The text in lower case, keeping each character at the same index as in the original."""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = "".join(x if len(x.lower()) != 1 else x.lower() for x in text)
+    return lowered
+
+
+def _overlaps(spans: List[Tuple[int, int]], start: int, end: int) -> bool:
+    """:return: True if the span start:end overlaps any of the sorted, non-overlapping spans given."""
+    i = bisect.bisect_right(spans, (start, end))
+    return (i > 0 and spans[i - 1][1] > start) or (i < len(spans) and spans[i][0] < end)
+
+
+class GlossaryMatcher(object):
+    def __init__(self, glossary_data: Sequence[Tuple[str, str]]):
+        """
+        Finds where to link glossary terms in a document. The automaton for the terms is built once and then finds
+        every term in a single pass over a document.
+        :param glossary_data: The terms and the section that defines them, longest first, see: process_glossary.
+        """
+        self.terms = [x for x in glossary_data if x[0]]
+        self._automaton = AhoCorasick([term for term, _ in self.terms])
+
+    @staticmethod
+    def _has_link(lowered: str, link_starts: List[int], needle_length: int, term: str, section: str) -> bool:
+        """:return: True if the document already has a link for a given glossary term (case-insensitive)."""
+        prefix, suffix = f"[{term}", f"{section.lower()}>)"
+        for i in link_starts:
+            if i >= len(prefix) and lowered.startswith(prefix, i - len(prefix)):
+                if lowered.startswith(suffix, i + needle_length):
+                    return True
+        return False
+
+    def find_links(
+        self, contents: str, link: str, protected: Sequence[Tuple[int, int]] = ()
+    ) -> List[Tuple[int, int, str]]:
+        """
+        Find the first occurrence of each term, which isn't inside a protected span, such as a markdown link or code.
+        Longer terms take priority, so shorter terms that overlap them are skipped in favour of their next occurrence.
+        Terms which already have a link to the glossary in the document are skipped.
+        :param contents: The document contents to search.
+        :param link: The relative link from the document to the glossary.
+        :param protected: The sorted, non-overlapping spans of the contents where terms shouldn't be linked.
+        :return: A list of (start, end, section) tuples, sorted by start.
+        """
+        lowered = _lower(contents)
+        needle = f"](<{link}#".lower()
+        link_starts = []
+        i = lowered.find(needle)
+        while i >= 0:
+            link_starts.append(i)
+            i = lowered.find(needle, i + 1)
+
+        occurrences: List[List[int]] = [[] for _ in self.terms]
+        for start, index in self._automaton.iter_matches(lowered):
+            occurrences[index].append(start)
+
+        spans = list(protected)
+        results = []
+        for (term, section), starts in zip(self.terms, occurrences):
+            if starts and not self._has_link(lowered, link_starts, len(needle), term, section):
+                for start in starts:
+                    end = start + len(term)
+                    if not _overlaps(spans, start, end):
+                        bisect.insort(spans, (start, end))
+                        results.append((start, end, section))
+                        break
+        return sorted(results)
+
+
+def get_glossary_matcher(context: ProcessingContext, glossary: Document) -> GlossaryMatcher:
     """
-    Work out if a given char index is inside of a markdown link.
-    :param index: The index of the string you're looking at.
-    :param pointer: The current index of the document we're searching from.
-    :param document: The document to find markdown links within.
-    :return: The index of the end of the markdown link you're within, if you're within one. -1 otherwise.
+    Get the matcher for a glossary, which is created once per context. The parsed glossary is also cached on disk, when
+    the context has a cache directory.
+    :param context: The ProcessingContext.
+    :param glossary: The glossary document.
+    :return: The glossary matcher.
     """
-    for match in re.finditer(regex_markdown_link, document.contents[pointer:]):
-        start, end = match.span(0)[0] + pointer, match.span(0)[1] + pointer
-        if start < index < end:
-            return end
-        elif index < start:
-            break
-    return -1
+    from .. import loading
 
+    def _create() -> GlossaryMatcher:
+        glossary_data = loading.process_glossary_with_cache(
+            glossary.original_contents, context.settings.cache_directory
+        )
+        return GlossaryMatcher(glossary_data)
 
-def has_glossary_link(term: str, section: str, link: str, document: Document) -> bool:
-    """:return: True if the document already has a link for a given glossary term (case-insensitive)."""
-    markdown_link = format_markdown_link(term, link, section)
-    return markdown_link.lower() in document.contents.lower()
+    return context.get_resource(("glossary", glossary.input_path, glossary.original_contents), _create)
 
 
-@document_rule("*.md", Passes.LINK_UPDATING)
+def get_glossary_link(context: ProcessingContext, document: Document) -> Tuple[GlossaryMatcher, str] | None:
+    """
+    Get what's needed to link the glossary terms in a document, recording that the document depends on the glossary.
+    :param context: The ProcessingContext.
+    :param document: The document being processed.
+    :return: tuple of the glossary matcher and the relative link from the document to the glossary, or None if there's
+             no glossary or the document is the glossary - which we don't want to link to itself.
+    """
+    glossary = context.get_document_by_name(GLOSSARY_DOCUMENT_NAME)
+    if not glossary:
+        logger.warning("Cannot find a glossary.md file, therefore skipping add_glossary_links.")
+        return None
+    if glossary is document:
+        return None
+    context.add_dependency(document, glossary)
+    return get_glossary_matcher(context, glossary), form_relative_link(document, glossary)
+
+
+@document_rule(
+    "*.md",
+    Passes.LINK_UPDATING,
+    reads=[RuleData.CONTENTS, RuleData.TARGET_PATH, RuleData.GLOSSARY],
+    writes=[RuleData.CONTENTS],
+)
 def add_glossary_links(context: ProcessingContext, document: Document):
     """
     Looks through a document for the first use of a word or phrase that is defined in the glossary. This can be either
     a top level entry or one of it's synonyms. This word / phrase in the document is then made into a link that
-    references the glossary section where teh word / phrase is defined.
+    references the glossary section where teh word / phrase is defined. Uses inside links or code are ignored.
     :param context: The ProcessingContext.
     :param document: The document being processed.
     """
-    from .. import loading
-
-    glossary = context.get_document_by_name("glossary.md")
-    if not glossary:
-        logger.warning("Cannot find a glossary.md file, therefore skipping add_glossary_links.")
-    elif glossary is not document:  # we don't want to modify the glossary to link to itself.
-        glossary_data = loading.process_glossary(glossary.original_contents)
-        link = form_relative_link(document, glossary)
-        for term, section in glossary_data:
-            if not has_glossary_link(term, section, link, document):
-                pointer = 0
-                while pointer < len(document.contents):
-                    match_index = document.contents[pointer:].lower().find(term)
-                    if match_index >= 0:
-                        match_index += pointer
-                        link_index = _is_inside_markdown_link(match_index, pointer, document)
-                        if link_index >= 0:
-                            pointer = link_index
-                        else:
-                            start, end = match_index, match_index + len(term)
-                            markdown_link = format_markdown_link(document.contents[start:end], link, section)
-                            document.contents, pointer = replace_span(document, start, end, markdown_link)
-                            break
-                    else:
-                        break
+    glossary_link = get_glossary_link(context, document)
+    if glossary_link is not None:
+        matcher, link = glossary_link
+        protected = document.spans.spans(*PROTECTED_SPAN_TYPES)
+        with document.edit() as edit:
+            for start, end, section in matcher.find_links(edit.text, link, protected):
+                edit.replace(start, end, format_markdown_link(edit.text[start:end], link, section))
@@ -1,57 +1,35 @@
 from __future__ import annotations
 
+import time
 import logging
 import inspect
+import threading
 
 from ._base import document_rule
-from ._utils import get_next_match, replace_span
-from .._consts import regex_const_macro, regex_function_macro
+from .._consts import FunctionMacro, regex_macro_start, regex_macro_name, regex_macro_args, RuleData
+from .._macros import MacroStatistics, is_impure_macro
+from .._spans import CODE_SPAN_TYPES
 
-from typing import Tuple, TYPE_CHECKING
+from typing import Dict, List, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # pragma: no cover
     from .._processing import ProcessingContext
-    from .._document import Document
+    from .._document import Document, DocumentEdit
 
 
 logger = logging.getLogger(__name__)
 
 
-def _replace_const_macros(context: ProcessingContext, document: Document):
-    pointer = 0
-    while pointer < len(document.contents):
-        match, start, end = get_next_match(document, pointer, regex_const_macro)
-        if not match:
-            break
-        macroName = match.group(1)
-        macro = context.settings.const_macros.get(macroName, None)
-        if macro is not None:
-            document.contents, _ = replace_span(document, start, end, context.settings.const_macros[macroName])
-            pointer = start
-        elif macro is None and context.settings.function_macros.get(macroName, None) is not None:
-            logger.exception(
-                f"Exception encountered trying to resolve {match.group(0)} as {macroName} is a function, not a const."
-            )
-            pointer = end
-        else:
-            logger.warning(
-                f"Invalid macro: found {match.group(0)} in {document.input_path}, but no matching macro is defined."
-            )
-            pointer = end
-
-
 def _extract_args(value: str) -> Tuple[str, ...]:
     return tuple(map(lambda x: x.strip(), value.split(","))) if value else ()
 
 
-def _run_function_macro(
-    context: ProcessingContext, functionName: str, args: Tuple[str, ...], origin_match: str
-) -> str | None:
+def _run_function_macro(function: FunctionMacro, args: Tuple[str, ...], origin_match: str) -> str | None:
     # noinspection PyBroadException
     try:
-        return context.settings.function_macros[functionName](*args)
+        return function(*args)
     except Exception:
-        signature = inspect.signature(context.settings.function_macros[functionName])
+        signature = inspect.signature(function)
         if len(args) != len(signature.parameters):
             logger.exception(
                 f"Exception encountered trying to resolve {origin_match} using {signature}. "
@@ -62,40 +40,166 @@ def _run_function_macro(
     return None
 
 
-def _replace_function_macros(context: ProcessingContext, document: Document):
-    pointer = 0
-    while pointer < len(document.contents):
-        match, start, end = get_next_match(document, pointer, regex_function_macro)
-        if not match:
-            break
-        macroName = match.group(1)
-        success = False
-        if macroName in context.settings.function_macros:
-            args = _extract_args(match.group(2))
-            value = _run_function_macro(context, macroName, args, match.group(0))
+class MacroExpander(object):
+    def __init__(self, context: ProcessingContext):
+        """
+        Expands the const and function macros in a document in a single scan. Macros may be nested, e.g.
+        ${function(${const})}, and any macros in the value of a macro are expanded too. Function macros only run once
+        for each set of arguments, unless they are marked with impure_macro. Usage is recorded in the context's
+        macro_statistics.
+        :param context: The ProcessingContext.
+        """
+        self.context = context
+        self._cache: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, document: Document):
+        """
+        Expand the macros in a document, except for those inside code blocks or inline code.
+        :param document: The document to expand the macros in.
+        """
+        with document.edit() as edit:
+            for match in edit.matches(regex_macro_start):
+                if not document.spans.is_protected(match.start(), *CODE_SPAN_TYPES):
+                    self.expand_at(document, edit, match.start())
+
+    def expand_at(self, document: Document, edit: DocumentEdit, start: int):
+        """
+        Expand the macro starting at an index in the text of an edit, if there is one, and move the edit's cursor past
+        the text it consumed.
+        :param document: The document being edited.
+        :param edit: The edit of the document.
+        :param start: The index of the "${" in the edit's text.
+        """
+        end, value = self._parse(document, edit.text, start, ())
+        if value is not None:
+            edit.replace(start, end, value)
+        edit.pointer = max(edit.pointer, end)
+
+    def expand(self, document: Document, text: str) -> str:
+        """
+        Expand all the macros in a text, e.g. one being inserted into a document, with no regard for code.
+        :param document: The document the text is for.
+        :param text: The text to expand the macros in.
+        :return: The text with the macros expanded.
+        """
+        return self._expand(document, text, ())
+
+    def _expand(self, document: Document, text: str, active: Tuple[str, ...]) -> str:
+        pieces: List[str] = []
+        pointer = 0
+        start = text.find("${")
+        while start >= 0:
+            end, value = self._parse(document, text, start, active)
             if value is not None:
-                document.contents, end = replace_span(document, start, end, value)
-                success = True
-        elif macroName in context.settings.const_macros:
-            logger.exception(
-                f"Exception encountered trying to resolve {match.group(0)} as {macroName} is not a function."
-            )
-        else:
-            logger.warning(
-                f"Invalid macro: found {match.group(0)} in {document.input_path}, but no matching macro is defined."
-            )
-        if success:
-            pointer = start
-        else:
+                pieces.extend([text[pointer:start], value])
+                pointer = end
+            start = text.find("${", end)
+        return "".join(pieces + [text[pointer:]]) if pieces else text
+
+    def _parse(self, document: Document, text: str, start: int, active: Tuple[str, ...]) -> Tuple[int, str | None]:
+        """
+        Parse and resolve the macro starting at a given index in a text.
+        :return: tuple of:
+                   - The end of the text consumed, which is just past the "${" if this isn't a macro.
+                   - The text to replace the consumed text with, or None to leave it as it is.
+        """
+        name_match = regex_macro_name.match(text, start + 2)
+        if name_match is None:
+            return start + 2, None
+        name, pointer = name_match.group(0), name_match.end()
+        if text.startswith("}", pointer):
+            return pointer + 1, self._resolve_const(document, text[start : pointer + 1], name, active)
+        if not text.startswith("(", pointer):
+            return start + 2, None
+
+        args_start = pointer = pointer + 1
+        pieces: List[str] = []
+        close = text.find(")", pointer)
+        nested = text.find("${", pointer, close)
+        while close >= 0 and nested >= 0:
+            end, value = self._parse(document, text, nested, active)
+            pieces.extend([text[pointer:nested], text[nested:end] if value is None else value])
             pointer = end
+            close = text.find(")", pointer)
+            nested = text.find("${", pointer, close)
+        if close < 0:
+            return start + 2, None
+        args = "".join(pieces + [text[pointer:close]])
+        changed = args != text[args_start:close]
+        if not text.startswith("}", close + 1) or not regex_macro_args.fullmatch(args):
+            return close + 1, f"${{{name}({args})" if changed else None
+        source = f"${{{name}({args})}}"
+        value = self._resolve_function(document, source, name, _extract_args(args), active)
+        return close + 2, source if value is None and changed else value
+
+    def _resolve_const(self, document: Document, source: str, name: str, active: Tuple[str, ...]) -> str | None:
+        self.context.add_macro_dependency(document, name)
+        macro = self.context.settings.const_macros.get(name, None)
+        if macro is not None:
+            if name in active:
+                logger.warning(f"Recursive macro: {source} in {document.input_path} refers to itself.")
+                return None
+            self._record(name, 0, 0.0)
+            return self._expand(document, str(macro), active + (name,))
+        elif self.context.settings.function_macros.get(name, None) is not None:
+            logger.exception(f"Exception encountered trying to resolve {source} as {name} is a function, not a const.")
+        else:
+            logger.warning(f"Invalid macro: found {source} in {document.input_path}, but no matching macro is defined.")
+        return None
+
+    def _resolve_function(
+        self, document: Document, source: str, name: str, args: Tuple[str, ...], active: Tuple[str, ...]
+    ) -> str | None:
+        self.context.add_macro_dependency(document, name)
+        function = self.context.settings.function_macros.get(name, None)
+        if function is None:
+            if name in self.context.settings.const_macros:
+                logger.exception(f"Exception encountered trying to resolve {source} as {name} is not a function.")
+            else:
+                logger.warning(
+                    f"Invalid macro: found {source} in {document.input_path}, but no matching macro is defined."
+                )
+            return None
+        if name in active:
+            logger.warning(f"Recursive macro: {source} in {document.input_path} refers to itself.")
+            return None
+        value = self._call(name, function, args, source)
+        return None if value is None else self._expand(document, value, active + (name,))
+
+    def _call(self, name: str, function: FunctionMacro, args: Tuple[str, ...], source: str) -> str | None:
+        pure = not is_impure_macro(function)
+        value = self._cache.get((name, args), None) if pure else None
+        if value is not None:
+            self._record(name, 0, 0.0)
+            return value
+        start = time.perf_counter()
+        value = _run_function_macro(function, args, source)
+        self._record(name, 1, time.perf_counter() - start)
+        if pure and value is not None:  # failures aren't cached, so they're reported for every use.
+            self._cache[(name, args)] = value
+        return value
+
+    def _record(self, name: str, calls: int, seconds: float):
+        with self._lock:
+            self.context.macro_statistics.setdefault(name, MacroStatistics()).add(MacroStatistics(1, calls, seconds))
+
+
+def get_macro_expander(context: ProcessingContext) -> MacroExpander:
+    """
+    Get the macro expander for a context, which is created once per context so cached macro results are shared.
+    :param context: The ProcessingContext.
+    :return: The macro expander.
+    """
+    return context.get_resource(("macros",), lambda: MacroExpander(context))
 
 
-@document_rule("*.md")
+@document_rule("*.md", triggers=["${"], reads=[RuleData.CONTENTS], writes=[RuleData.CONTENTS])
 def apply_macros(context: ProcessingContext, document: Document):
     """
-    Applies any defined macros to the document.
+    Applies any defined macros to the document. Macros inside code blocks or inline code are left as they are. Macros
+    in the value of a macro, or the arguments of a function macro, are expanded too.
     :param context: The ProcessingContext.
     :param document: The document being processed.
     """
-    _replace_const_macros(context, document)
-    _replace_function_macros(context, document)
+    get_macro_expander(context).apply(document)
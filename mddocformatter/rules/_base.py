@@ -1,23 +1,32 @@
 from __future__ import annotations
 
+import os
+import re
 import functools
 
-from fnmatch import fnmatch
-from .._consts import Passes
+from fnmatch import translate
+from .._consts import Passes, RuleData
 
-from typing import Callable, TYPE_CHECKING
+from typing import Callable, FrozenSet, Iterable, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # pragma: no cover
     from .._processing import ProcessingContext
     from .._document import Document
 
 
+_WRITABLE_DATA = frozenset([RuleData.CONTENTS, RuleData.TARGET_PATH])
+
+
 class DocumentRule(object):
     def __init__(
         self,
         function: Callable[[ProcessingContext, Document], None],
         file_filter: str,
         pass_index: Passes = Passes.FIRST,
+        triggers: Iterable[str] = (),
+        reads: Iterable[RuleData] | None = None,
+        writes: Iterable[RuleData] | None = None,
+        prepare: Callable[[ProcessingContext], object] | None = None,
     ):
         """
         Function decorator to create a document processor function. These functions will be called by a
@@ -26,32 +35,80 @@ class DocumentRule(object):
         :param file_filter: fnmatch style file filter.
         :param pass_index: The index of the "pass" of the documents in which to operate. Sometimes rule_set need to wait
                            for other rule_set to run first.
+        :param triggers: Strings, at least one of which a document must contain for the rule to have anything to do,
+                         e.g. "${" for macros. When processing, the rule is skipped for documents which contain none of
+                         them. With no triggers the rule always runs.
+        :param reads: The data the rule reads, which the scheduled backend makes sure is ready before running the rule
+                      on a document, see: RuleScheduler. Rules which don't declare it are assumed to read everything.
+        :param writes: The data the rule writes, either or both of RuleData.CONTENTS and RuleData.TARGET_PATH of the
+                       document it's run on. Rules which don't declare it are assumed to write both.
+        :param prepare: Called with the context once before the rules are run on any document, in the process running
+                        the context, e.g. to create a resource all the documents share, so that worker processes
+                        inherit it rather than each creating their own.
         """
         self.function = function
         self.file_filter = file_filter
         self.pass_index = pass_index
+        self.triggers: Tuple[str, ...] = tuple(x for x in triggers if x)
+        self.reads: FrozenSet[RuleData] = frozenset(RuleData if reads is None else reads)
+        self.writes: FrozenSet[RuleData] = frozenset(_WRITABLE_DATA if writes is None else writes)
+        self.prepare = prepare
+        if not self.writes <= _WRITABLE_DATA:
+            raise ValueError(f"A rule can only write the contents and target path of its document, got: {writes}")
+        self._file_filter_regex = re.compile(translate(os.path.normcase(file_filter)))
         functools.update_wrapper(self, self.function)
 
+    @property
+    def name(self) -> str:
+        """
+        :return: The name of the rule, i.e. the name of the function it was created from.
+        """
+        return getattr(self.function, "__name__", type(self.function).__name__)
+
+    def applies_to(self, resolved_path: str) -> bool:
+        """
+        :param resolved_path: The resolved input path of a document.
+        :return: True if the file filter matches the path, in the same way as fnmatch.
+        """
+        return self._file_filter_regex.match(os.path.normcase(resolved_path)) is not None
+
     def _applies(self, document: Document):
-        return fnmatch(str(document.input_path.resolve()), self.file_filter)
+        return self.applies_to(str(document.input_path.resolve()))
+
+    def apply(self, context: ProcessingContext, document: Document):
+        """
+        Run the rule on a document, which is already known to pass the file filter.
+        :param context: The ProcessingContext.
+        :param document: The document to process.
+        """
+        self.function(context, document)
 
     def __call__(self, context: ProcessingContext, document: Document):
         if self._applies(document):
-            self.function(context, document)
+            self.apply(context, document)
 
 
 def document_rule(
-    file_filter: str = "*.*", pass_index: Passes = Passes.FIRST
+    file_filter: str = "*.*",
+    pass_index: Passes = Passes.FIRST,
+    triggers: Iterable[str] = (),
+    reads: Iterable[RuleData] | None = None,
+    writes: Iterable[RuleData] | None = None,
+    prepare: Callable[[ProcessingContext], object] | None = None,
 ) -> Callable[[Callable[[ProcessingContext, Document], None]], DocumentRule]:
     """
     A wrapper to make simple DocumentRules from functions.
     :param file_filter: fnmatch style file filter string.
     :param pass_index: The index of the "pass" of the documents in which to operate. Sometimes rule_set need to wait for
                        other rule_set to run first.
+    :param triggers: Strings a document must contain at least one of for the rule to run, see: DocumentRule.
+    :param reads: The data the rule reads, see: DocumentRule.
+    :param writes: The data the rule writes, see: DocumentRule.
+    :param prepare: Called with the context before the rule is run on any document, see: DocumentRule.
     :return: A document rule type.
     """
 
     def _inner(func):
-        return DocumentRule(func, file_filter, pass_index)
+        return DocumentRule(func, file_filter, pass_index, triggers, reads, writes, prepare)
 
     return _inner
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 from ._base import document_rule
+from .._consts import RuleData
 
-from typing import TYPE_CHECKING
+from typing import Dict, Iterator, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # pragma: no cover
     from .._processing import ProcessingContext
     from .._document import Document
 
 
+TABLE_OF_CONTENTS_VARIABLE = "${create_table_of_contents}"
+
+
 def _calculate_toc_indent_for_heading(line) -> int:
     """:return: the indent to use for a heading link in a toc based on the heading size."""
     return (max(0, len(line) - len(line.lstrip("#")) - 1)) * 2
@@ -31,19 +35,31 @@ def _create_toc_from_sections(lines):
     return toc
 
 
-@document_rule("*.md")
+def table_of_contents_replacements(contents: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    Find the ${create_table_of_contents} variables in a document and the tables to replace them with. Each table lists
+    the headings below the line the variable is on.
+    :param contents: The document contents.
+    :return: A generator of (start, end, table) tuples for the variables, in order.
+    """
+    tables: Dict[int, str] = {}
+    start = contents.find(TABLE_OF_CONTENTS_VARIABLE)
+    while start >= 0:
+        line_end = contents.find("\n", start)
+        if line_end not in tables:
+            tables[line_end] = _create_toc_from_sections(contents[line_end + 1 :].split("\n") if line_end >= 0 else [])
+        end = start + len(TABLE_OF_CONTENTS_VARIABLE)
+        yield start, end, tables[line_end]
+        start = contents.find(TABLE_OF_CONTENTS_VARIABLE, end)
+
+
+@document_rule("*.md", triggers=[TABLE_OF_CONTENTS_VARIABLE], reads=[RuleData.CONTENTS], writes=[RuleData.CONTENTS])
 def create_table_of_contents(context: ProcessingContext, document: Document):
     """
     Create a table of contents wherever the document has the variable ${create_table_of_contents}
     :param context: The ProcessingContext.
     :param document: The document being processed.
     """
-    TABLE_OF_CONTENTS_VARIABLE = "${create_table_of_contents}"
-    lines = document.contents.split("\n")
-    processed = []
-    for i, line in enumerate(lines):
-        if TABLE_OF_CONTENTS_VARIABLE in line:
-            table = _create_toc_from_sections(lines[i + 1 :])
-            line = line.replace(TABLE_OF_CONTENTS_VARIABLE, table)
-        processed.append(line)
-    document.contents = "\n".join(processed)
+    with document.edit() as edit:
+        for start, end, table in table_of_contents_replacements(edit.text):
+            edit.replace(start, end, table)
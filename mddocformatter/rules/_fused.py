@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from ._base import document_rule, DocumentRule
+from ._addglossarylinks import add_glossary_links, get_glossary_link
+from ._applymacros import apply_macros, get_macro_expander
+from ._createtableofcontents import create_table_of_contents, table_of_contents_replacements
+from ._sanitizeinternallinks import santize_internal_links, sanitized_links
+from ._utils import format_markdown_link
+from .._consts import Passes, RuleData, regex_macro_start
+from .._spans import CODE_SPAN_TYPES, PROTECTED_SPAN_TYPES, Span, find_span
+
+from typing import List, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .._processing import ProcessingContext
+    from .._document import Document
+
+
+Replacement = Tuple[int, int, str]
+
+
+def _replace(text: str, replacements: Sequence[Replacement]) -> str:
+    """:return: The text with the sorted, non-overlapping (start, end, replacement) spans replaced."""
+    pieces, pointer = [], 0
+    for start, end, replacement in replacements:
+        pieces.extend([text[pointer:start], replacement])
+        pointer = end
+    pieces.append(text[pointer:])
+    return "".join(pieces)
+
+
+def _shift_spans(spans: Sequence[Span], replacements: Sequence[Replacement]) -> List[Span]:
+    """
+    :return: The spans moved to where they are in the text once the replacements are made. A replacement must either be
+             inside a span, which grows or shrinks to fit it, or not overlap any span.
+    """
+    shifted, i, offset = [], 0, 0
+    for start, end in spans:
+        while i < len(replacements) and replacements[i][0] < start:
+            offset += len(replacements[i][2]) - (replacements[i][1] - replacements[i][0])
+            i += 1
+        new_start = start + offset
+        while i < len(replacements) and replacements[i][0] < end:
+            offset += len(replacements[i][2]) - (replacements[i][1] - replacements[i][0])
+            i += 1
+        shifted.append((new_start, end + offset))
+    return shifted
+
+
+def _is_same_link_span(original: str, replacement: str) -> bool:
+    """
+    :return: True if indexing the text again would find a sanitized link as a single link spanning the whole of the
+             replacement, just as it found the original, and no code spans would change.
+    """
+    if "`" in original or "`" in replacement or "\n" in replacement:
+        return False
+    return replacement.find(")", replacement.find("](") + 3) == len(replacement) - 1
+
+
+@document_rule("*.md", triggers=["${"], reads=[RuleData.CONTENTS], writes=[RuleData.CONTENTS])
+def fused_toc_and_macros(context: ProcessingContext, document: Document):
+    """
+    Does the work of create_table_of_contents followed by apply_macros. The tables of contents are spliced in and the
+    code spans of the document are moved to match them, rather than indexing the document again, before a single scan
+    of the text for macros. Macros in the tables are expanded unless the variable was inside code.
+    :param context: The ProcessingContext.
+    :param document: The document being processed.
+    """
+    expander = get_macro_expander(context)
+    contents = document.contents
+    tables = list(table_of_contents_replacements(contents))
+    if not tables:
+        expander.apply(document)
+    elif any("`" in table for _, _, table in tables):  # the tables could change which backticks pair up as code.
+        create_table_of_contents.apply(context, document)
+        expander.apply(document)
+    else:
+        code = _shift_spans(document.spans.spans(*CODE_SPAN_TYPES), tables)
+        document.contents = _replace(contents, tables)
+        with document.edit() as edit:
+            for match in edit.matches(regex_macro_start):
+                if find_span(code, match.start()) is None:
+                    expander.expand_at(document, edit, match.start())
+
+
+@document_rule(
+    "*.md",
+    Passes.LINK_UPDATING,
+    reads=[
+        RuleData.CONTENTS,
+        RuleData.TARGET_PATH,
+        RuleData.LINKED_CONTENTS,
+        RuleData.LINKED_TARGET_PATHS,
+        RuleData.GLOSSARY,
+    ],
+    writes=[RuleData.CONTENTS],
+)
+def fused_links_and_glossary(context: ProcessingContext, document: Document):
+    """
+    Does the work of santize_internal_links followed by add_glossary_links. The glossary terms are found in the text
+    with the links sanitized, using the spans of links and code moved to match the new links, rather than indexing the
+    document again, and the contents are only updated once.
+    :param context: The ProcessingContext.
+    :param document: The document being processed.
+    """
+    contents = document.contents
+    protected = document.spans.spans(*PROTECTED_SPAN_TYPES)
+    links = list(sanitized_links(context, document))
+    if links:
+        text = _replace(contents, links)
+        if all(_is_same_link_span(contents[start:end], x) for start, end, x in links):
+            protected = _shift_spans(protected, links)
+        else:
+            document.contents = text
+            protected = document.spans.spans(*PROTECTED_SPAN_TYPES)
+        contents = text
+    terms: List[Replacement] = []
+    glossary_link = get_glossary_link(context, document)
+    if glossary_link is not None:
+        matcher, link = glossary_link
+        for start, end, section in matcher.find_links(contents, link, protected):
+            terms.append((start, end, format_markdown_link(contents[start:end], link, section)))
+    if links or terms:
+        document.contents = _replace(contents, terms)
+
+
+_FUSED_RULES = (
+    (create_table_of_contents, apply_macros, fused_toc_and_macros),
+    (santize_internal_links, add_glossary_links, fused_links_and_glossary),
+)
+
+
+def fuse_rules(rules: Sequence[DocumentRule]) -> List[DocumentRule]:
+    """
+    Replace the built-in rules which run one after the other in the same pass, and scan for the same things, with a
+    single rule that does the work of both with fewer scans of each document: create_table_of_contents followed by
+    apply_macros, and santize_internal_links followed by add_glossary_links. The results are the same.
+    :param rules: The rules to run, in order.
+    :return: The rules to run instead, in order.
+    """
+    rules = list(rules)
+    for first, second, fused in _FUSED_RULES:
+        if first in rules and second in rules:
+            i, j = rules.index(first), rules.index(second)
+            if i < j and all(x.pass_index != first.pass_index for x in rules[i + 1 : j]):
+                rules[i] = fused
+                del rules[j]
+    return rules
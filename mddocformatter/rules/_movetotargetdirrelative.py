@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 
 from ._base import document_rule
+from .._consts import RuleData
 
 from typing import TYPE_CHECKING
 
@@ -11,7 +12,7 @@ if TYPE_CHECKING:  # pragma: no cover
     from .._document import Document
 
 
-@document_rule()
+@document_rule(reads=[], writes=[RuleData.TARGET_PATH])
 def move_to_target_dir_relative(context: ProcessingContext, document: Document):
     """
     Move the target_path file to save a document to, to the same place under the target_path directory.
@@ -1,18 +1,148 @@
 from __future__ import annotations
 
-import re
+import logging
 
 from ._base import document_rule
+from .._consts import RuleData
 from pathlib import Path
-from ._movetotargetdirrelative import move_to_target_dir_relative
 
-from typing import TYPE_CHECKING
+from typing import Dict, Iterable, List, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # pragma: no cover
     from .._processing import ProcessingContext
     from .._document import Document
 
 
+logger = logging.getLogger(__name__)
+
+DirectoryParts = Tuple[str, ...]
+
+
+def _is_titled_after(name: str, parent: str) -> bool:
+    """:return: True if the name is the parent's name, followed by " - " and at least one more character."""
+    return len(name) > len(parent) + 3 and name.startswith(parent) and name.startswith(" - ", len(parent))
+
+
+class _Directory(object):
+    def __init__(self, confluence_style: bool, parts: List[str]):
+        """
+        What the naming plan knows about a directory under the root.
+        :param confluence_style: True if the directory, and every directory above it, is already confluence style.
+        :param parts: The names of the directories from the target directory down to where this one is renamed to.
+        """
+        self.confluence_style = confluence_style
+        self.parts = parts
+
+
+class ConfluenceNamingPlan(object):
+    def __init__(self, root_directory: Path, target_directory: Path, version_name: str):
+        """
+        Works out the "confluence unique" target path of each document, see: rename_uniquely_for_confluence. What's
+        worked out for a directory is kept, so each directory is only considered once however many documents are in it.
+        Documents given the same page title, which Confluence would refuse, are recorded as collisions.
+        :param root_directory: The root directory for the documentation.
+        :param target_directory: The directory the documentation is saved to.
+        :param version_name: the version name from the settings.
+        """
+        self.root_directory = root_directory
+        self.target_directory = target_directory
+        self.version_name = version_name
+        self.collisions: List[Tuple[Path, Path, str]] = []
+        self._directories: Dict[DirectoryParts, _Directory] = {}
+        self._targets: Dict[Path, Path] = {}
+        self._titles: Dict[str, Path] = {}
+
+    def _directory(self, parts: DirectoryParts) -> _Directory:
+        directory = self._directories.get(parts, None)
+        if directory is None:
+            if parts:
+                parent = self._directory(parts[:-1])
+                name = parts[-1]
+                confluence_style = parent.confluence_style and (not self.version_name or self.version_name in name)
+                if len(parts) > 1 and not _is_titled_after(name, parts[-2]):
+                    confluence_style = False
+                title = f"{parent.parts[-1]} - {name}" if parent.parts else name
+                directory = _Directory(confluence_style, parent.parts + [title])
+            else:
+                directory = _Directory(True, [self.version_name] if self.version_name else [])
+            self._directories[parts] = directory
+        return directory
+
+    def is_confluence_style(self, input_path: Path) -> bool:
+        """
+        :param input_path: The path to test.
+        :return: True if the path is already a valid "confluence style" path, see: path_is_confluence_style.
+        """
+        parts = input_path.relative_to(self.root_directory).parts
+        name = parts[-1]
+        if not self._directory(parts[:-1]).confluence_style:
+            return False
+        if self.version_name and self.version_name not in name:
+            return False
+        if len(parts) > 1:
+            return name == f"{parts[-2]}.md" or (_is_titled_after(name, parts[-2]) and name.endswith(".md"))
+        return not self.version_name or (_is_titled_after(name, self.version_name) and name.endswith(".md"))
+
+    def _target(self, input_path: Path) -> Path:
+        if self.is_confluence_style(input_path):
+            if self.target_directory and self.root_directory != self.target_directory:
+                target = self.target_directory / self.version_name if self.version_name else self.target_directory
+                return target / input_path.relative_to(self.root_directory)
+            return input_path
+        parts = self._directory(input_path.parent.relative_to(self.root_directory).parts).parts
+        parent_dir = input_path.parents[0].parts[-1]
+        if input_path.name.lower() == "readme.md" or input_path.name == f"{parent_dir}.md":
+            filename = parts[-1] + ".md"
+        else:
+            filename = f"{parts[-1]} - {input_path.name}"
+        return self.target_directory.joinpath(*parts) / filename
+
+    def target(self, input_path: Path) -> Path:
+        """
+        :param input_path: The input path of a document.
+        :return: The path to save the document to.
+        """
+        target = self._targets.get(input_path, None)
+        if target is None:
+            target = self._targets[input_path] = self._target(input_path)
+            title = target.stem
+            other = self._titles.setdefault(title.lower(), input_path)
+            if other != input_path:
+                logger.warning(f'{other} and {input_path} would both be published as the Confluence page "{title}".')
+                self.collisions.append((other, input_path, title))
+        return target
+
+    def plan(self, input_paths: Iterable[Path]) -> List[Tuple[Path, Path, str]]:
+        """
+        Work out the target paths of a set of documents up front.
+        :param input_paths: The input paths of the documents.
+        :return: The collisions found: tuples of the two input paths and the page title they share.
+        """
+        start = len(self.collisions)
+        for path in input_paths:
+            self.target(path)
+        return self.collisions[start:]
+
+
+def get_confluence_naming_plan(context: ProcessingContext) -> ConfluenceNamingPlan:
+    """
+    Get the naming plan for a context, which is worked out for all its documents when it's first requested. The rule
+    requests it before processing starts, so it's only worked out, and any collisions reported, once, even when the
+    documents are processed on several worker processes.
+    :param context: The ProcessingContext.
+    :return: The naming plan.
+    """
+    settings = context.settings
+
+    def _create() -> ConfluenceNamingPlan:
+        plan = ConfluenceNamingPlan(settings.root_directory, settings.target_directory, settings.version_name)
+        plan.plan(x for x in context.documents if x.suffix == ".md")
+        return plan
+
+    key = ("confluence naming", settings.root_directory, settings.target_directory, settings.version_name)
+    return context.get_resource(key, _create)
+
+
 def path_is_confluence_style(root_directory: Path, input_path: Path, version_name: str) -> bool:
     """
     Test a path to see if it already conforms to the "confluence unique" form.
@@ -24,27 +154,16 @@ def path_is_confluence_style(root_directory: Path, input_path: Path, version_nam
     :param version_name: the version name from the settings.
     :return: True if the path is already a valid "confluence style" path.
     """
-    rel_path = input_path.relative_to(root_directory)
-    for i, part in enumerate(rel_path.parts):
-        if version_name and version_name not in part:
-            return False
-        if i > 0 and (i < len(rel_path.parts) - 1) and not re.match(f"{rel_path.parts[i - 1]} - .+", part):
-            return False
+    return ConfluenceNamingPlan(root_directory, root_directory, version_name).is_confluence_style(input_path)
 
-    if len(rel_path.parts) > 1:
-        regex = f"{rel_path.parts[-2]} - .+.md"
-        return input_path.name == f"{rel_path.parts[-2]}.md" or re.match(regex, input_path.name) is not None
-    else:
-        regex = f"{version_name} - .+.md"
-        return not version_name or re.match(regex, input_path.name) is not None
 
-
-@document_rule("*.md")
+@document_rule("*.md", reads=[], writes=[RuleData.TARGET_PATH], prepare=get_confluence_naming_plan)
 def rename_uniquely_for_confluence(context: ProcessingContext, document: Document):
     """
     Renames each page so that it contains its own tree as part of its name for the purpose of making the file
     uniquely named. This is to comply with the need in confluence for all pages to have unique names. This also
-    renames "README.md" files after their parent directory.
+    renames "README.md" files after their parent directory. The names are worked out for the whole tree at once, see:
+    ConfluenceNamingPlan, and any pages which would end up with the same name are reported.
 
     This will also place the version_name as the root directory.
     So, given a page:
@@ -54,16 +173,4 @@ def rename_uniquely_for_confluence(context: ProcessingContext, document: Documen
     :param context: The ProcessingContext.
     :param document: The document being processed.
     """
-    if path_is_confluence_style(context.settings.root_directory, document.input_path, context.settings.version_name):
-        move_to_target_dir_relative(context, document)
-    else:
-        parts = list(document.input_path.parent.relative_to(context.settings.root_directory).parts)
-        if context.settings.version_name:
-            parts.insert(0, context.settings.version_name)
-        parts = [" - ".join(parts[: i + 1]) for i in range(len(parts))]
-        parent_dir = document.input_path.parents[0].parts[-1]
-        if document.input_path.name.lower() == "readme.md" or document.input_path.name == f"{parent_dir}.md":
-            filename = parts[-1] + ".md"
-        else:
-            filename = f"{parts[-1]} - {document.input_path.name}"
-        document.target_path = context.settings.target_directory.joinpath(*parts) / filename
+    document.target_path = get_confluence_naming_plan(context).target(document.input_path)
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-import re
 import logging
 
 from urllib.parse import unquote
 from ._base import document_rule
-from ._utils import get_next_match, replace_span, format_document_markdown_link
-from .._consts import regex_markdown_link, regex_markdown_link_with_subsection, Passes
+from ._utils import format_document_markdown_link
+from .._consts import regex_markdown_link, regex_markdown_link_with_subsection, Passes, SpanType, RuleData
 
-from typing import Tuple, TYPE_CHECKING
+from typing import Iterator, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # pragma: no cover
     from .._processing import ProcessingContext
@@ -19,52 +18,61 @@ logger = logging.getLogger(__name__)
 
 
 def _get_document_from_link(context: ProcessingContext, document: Document, link: str) -> Document | None:
-    result = context.get_document((document.input_path.parent / link).resolve())
+    result = context.get_document(document.input_path.parent / link)
     if not result:
-        result = context.get_document((context.settings.root_directory / link).resolve())
+        result = context.get_document(context.settings.root_directory / link)
     return result
 
 
-def _get_next_link_match(document: Document, pointer: int) -> Tuple[bool, int, int, str, str, str]:
-    match, start, end = get_next_match(document, pointer, regex_markdown_link_with_subsection)
+def _parse_link(contents: str, start: int, end: int) -> Tuple[str, str, str]:
+    match = regex_markdown_link_with_subsection.fullmatch(contents, start, end)
     if match:
-        return True, start, end, match.group(1), match.group(2), match.group(3)
-    else:
-        match, start, end = get_next_match(document, pointer, regex_markdown_link)
-        if match:
-            return True, start, end, match.group(1), match.group(2), ""
-        else:
-            return False, 0, 0, "", "", ""
+        return match.group(1), match.group(2), match.group(3)
+    match = regex_markdown_link.fullmatch(contents, start, end)
+    assert match is not None, "Link spans are found with regex_markdown_link."
+    return match.group(1), match.group(2), ""
 
 
 def _process_section_reference(section: str, linked_document: Document):
     if section:
-        # find the actual linked section and recreate teh section reference.
-        regex_section_part = section.replace("-", "[ -]")
-        section_regex = re.compile(r"#+\s*(" + regex_section_part + ")", re.IGNORECASE)
-        for line in linked_document.contents.split("\n"):
-            result = re.search(section_regex, line)
-            if result:
-                section = result.group(1)
-                break
+        # find the actual linked section and recreate the section reference.
+        heading = linked_document.spans.anchors.find(section)
+        if heading is not None:
+            section = heading
     return section
 
 
-@document_rule("*.md", Passes.LINK_UPDATING)
-def santize_internal_links(context: ProcessingContext, document: Document):
+def sanitized_links(context: ProcessingContext, document: Document) -> Iterator[Tuple[int, int, str]]:
     """
-    Find any "internal" markdown links and make sure they use the form ()[<relative_path to item>]
+    Find the internal links in a document and the form they should take, see: santize_internal_links.
     :param context: The ProcessingContext.
     :param document: The document being processed.
+    :return: A generator of (start, end, replacement) tuples for the links in the current contents, in order.
     """
-    pointer = 0
-    while pointer < len(document.contents):
-        success, start, pointer, text, path, section = _get_next_link_match(document, pointer)
-        if not success:
-            break
+    contents = document.contents
+    for start, end in document.spans.spans(SpanType.LINK):
+        text, path, section = _parse_link(contents, start, end)
         section, path = unquote(section), unquote(path)
         linked_document = _get_document_from_link(context, document, path)
         if linked_document is not None:
+            context.add_dependency(document, linked_document)
             section = _process_section_reference(section, linked_document)
-            reformatted_link = format_document_markdown_link(text, document, linked_document, section)
-            document.contents, pointer = replace_span(document, start, pointer, reformatted_link)
+            yield start, end, format_document_markdown_link(text, document, linked_document, section)
+
+
+@document_rule(
+    "*.md",
+    Passes.LINK_UPDATING,
+    triggers=["]("],
+    reads=[RuleData.CONTENTS, RuleData.TARGET_PATH, RuleData.LINKED_CONTENTS, RuleData.LINKED_TARGET_PATHS],
+    writes=[RuleData.CONTENTS],
+)
+def santize_internal_links(context: ProcessingContext, document: Document):
+    """
+    Find any "internal" markdown links and make sure they use the form ()[<relative_path to item>]
+    :param context: The ProcessingContext.
+    :param document: The document being processed.
+    """
+    with document.edit() as edit:
+        for start, end, replacement in sanitized_links(context, document):
+            edit.replace(start, end, replacement)
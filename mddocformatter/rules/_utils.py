@@ -1,8 +1,9 @@
-import re
 import os
+import functools
 
 from pathlib import Path
 from typing import Tuple
+from .._consts import N_CACHED_RELATIVE_LINKS
 from .._document import Document
 
 
@@ -30,43 +31,44 @@ def format_document_markdown_link(
     return format_markdown_link(text, form_relative_link(source_document, linked_document), section)
 
 
-def form_relative_link(source_document: Document, linked_document: Document) -> str:
+@functools.lru_cache(maxsize=N_CACHED_RELATIVE_LINKS)
+def _relative_link(source_directory: Tuple[str, ...], target: Tuple[str, ...]) -> str | None:
     """
-    Given a source document, and the document you want to link to, this forms a relative link string for use in a
-    markdown link.
-    :param source_document: The source document where you want to use the link.
-    :param linked_document: The document you want to link to.
-    :return: The relative link.
+    :return: The relative link from a directory to a file, both given as path parts, or None if it can't be worked out
+             from the parts alone, i.e. they're on different drives or either has a ".." part.
     """
-    common = Path(os.path.commonpath([linked_document.target_path, source_document.target_path]))
-    return os.path.join(
-        os.path.relpath(common, source_document.target_path.parent),
-        os.path.relpath(linked_document.target_path, common),
-    ).replace("\\", "/")
+    if ".." in source_directory or ".." in target:
+        return None
+    n, limit = 0, min(len(source_directory), len(target))
+    while n < limit and os.path.normcase(source_directory[n]) == os.path.normcase(target[n]):
+        n += 1
+    if n == 0 and ((source_directory and os.path.isabs(source_directory[0])) or (target and os.path.isabs(target[0]))):
+        return None
+    up = len(source_directory) - n
+    return ("/".join([".."] * up) if up else ".") + "/" + ("/".join(target[n:]) if n < len(target) else ".")
 
 
-def replace_span(document: Document, start: int, end: int, replacement: str) -> Tuple[str, int]:
-    """
-    Replace a span of text in a document's contents - does not alter the document itself.
-    :param document: The document contents to replace a span of.
-    :param start: The start of the span.
-    :param end: The end of the span.
-    :param replacement: The string to replace the span with - does not need to be the same length.
-    :return: tuple of:
-               - The new string after the span has been replaced.
-               - The new "end" position of the span.
-    """
-    return "".join([document.contents[:start], replacement, document.contents[end:]]), start + len(replacement)
+def _form_relative_link(source_path: Path, linked_path: Path) -> str:
+    common = Path(os.path.commonpath([linked_path, source_path]))
+    return os.path.join(
+        os.path.relpath(common, source_path.parent),
+        os.path.relpath(linked_path, common),
+    ).replace("\\", "/")
 
 
-def get_next_match(document: Document, pointer: int, regex: re.Pattern) -> Tuple[re.Match | None, int, int]:
+def form_relative_link(source_document: Document, linked_document: Document) -> str:
     """
-    Convenience function to "get the next match" of a regex, in the document, after the "pointer" which is just an
-    index in the document contents string. Used to be able to go through a file bit by bit and process each match one at
-    a time, while avoiding getting stuck on a match that isn't processed into something that doesn't match.
+    Given a source document, and the document you want to link to, this forms a relative link string for use in a
+    markdown link. Links are worked out from the parts of the target paths and cached by the source directory and the
+    linked path, so the many links from one directory to the same document are only worked out once.
+    :param source_document: The source document where you want to use the link.
+    :param linked_document: The document you want to link to.
+    :return: The relative link.
     """
-    match: re.Match | None = re.search(regex, document.contents[pointer:])
-    if not match:
-        return None, 0, 0
-    start, end = match.span(0)[0] + pointer, match.span(0)[1] + pointer
-    return match, start, end
+    source, target = source_document.target_parts, linked_document.target_parts
+    link = None
+    if target[: len(source)] != source:  # not a link to the source itself.
+        link = _relative_link(source[:-1], target)
+    if link is None:
+        return _form_relative_link(source_document.target_path, linked_document.target_path)
+    return link
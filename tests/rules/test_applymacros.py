@@ -1,7 +1,7 @@
 import unittest
 
 from pathlib import Path
-from mddocformatter import ProcessingSettings, ProcessingContext, Document, rules
+from mddocformatter import ProcessingSettings, ProcessingContext, Document, rules, impure_macro
 
 
 class TestApplyMacros(unittest.TestCase):
@@ -140,6 +140,79 @@ class TestApplyMacros(unittest.TestCase):
         rules.apply_macros(context, doc)
         self.assertEqual("ss", doc.contents)
 
+    def test_macros_in_code_unchanged(self):
+        settings = ProcessingSettings(const_macros={"hello": "world"}, function_macros={"hello2": lambda: "world2"})
+        context = ProcessingContext(settings)
+        doc = Document(
+            Path("test.md"),
+            "${hello} `${hello}` ${hello2()}\n```\n${hello} ${hello2()}\n```\n`${hello2()}` ${hello}",
+        )
+        rules.apply_macros(context, doc)
+        self.assertEqual("world `${hello}` world2\n```\n${hello} ${hello2()}\n```\n`${hello2()}` world", doc.contents)
+
+    def test_const_macro_in_const_macro(self):
+        settings = ProcessingSettings(const_macros={"hello": "${world}!", "world": "world"})
+        context = ProcessingContext(settings)
+        doc = Document(Path("test.md"), "Hello ${hello}")
+        rules.apply_macros(context, doc)
+        self.assertEqual("Hello world!", doc.contents)
+        self.assertEqual({"hello", "world"}, context.macro_dependencies[doc.input_path])
+
+    def test_recursive_const_macro(self):
+        settings = ProcessingSettings(const_macros={"hello": "${hello}"})
+        context = ProcessingContext(settings)
+        doc = Document(Path("test.md"), "Example macro ${hello}")
+        with self.assertLogs("mddocformatter", level="WARNING"):
+            rules.apply_macros(context, doc)
+        self.assertEqual("Example macro ${hello}", doc.contents)
+
+    def test_function_macro_in_function_macro(self):
+        settings = ProcessingSettings(function_macros={"hello": lambda x: f"<{x}>", "upper": lambda x: x.upper()})
+        context = ProcessingContext(settings)
+        doc = Document(Path("test.md"), "Example macro ${hello(${upper(a)})}")
+        rules.apply_macros(context, doc)
+        self.assertEqual("Example macro <A>", doc.contents)
+
+    def test_function_macro_results_cached(self):
+        calls = []
+
+        def _hello(x):
+            calls.append(x)
+            return f"x={x}"
+
+        settings = ProcessingSettings(function_macros={"hello": _hello})
+        context = ProcessingContext(settings)
+        for i in range(3):
+            doc = Document(Path(f"test{i}.md"), "${hello(a)} ${hello(b)} ${hello(a)}")
+            rules.apply_macros(context, doc)
+            self.assertEqual("x=a x=b x=a", doc.contents)
+        self.assertEqual(["a", "b"], calls)
+        self.assertEqual(9, context.macro_statistics["hello"].uses)
+        self.assertEqual(2, context.macro_statistics["hello"].calls)
+
+    def test_impure_function_macro_not_cached(self):
+        calls = []
+
+        @impure_macro
+        def _hello():
+            calls.append(None)
+            return str(len(calls))
+
+        settings = ProcessingSettings(function_macros={"hello": _hello})
+        context = ProcessingContext(settings)
+        doc = Document(Path("test.md"), "${hello()} ${hello()}")
+        rules.apply_macros(context, doc)
+        self.assertEqual("1 2", doc.contents)
+        self.assertEqual(2, context.macro_statistics["hello"].calls)
+
+    def test_const_macro_statistics(self):
+        settings = ProcessingSettings(const_macros={"hello": "world"})
+        context = ProcessingContext(settings)
+        doc = Document(Path("test.md"), "${hello} ${hello}")
+        rules.apply_macros(context, doc)
+        self.assertEqual(2, context.macro_statistics["hello"].uses)
+        self.assertEqual(0, context.macro_statistics["hello"].calls)
+
 
 if __name__ == "__main__":
     unittest.main()
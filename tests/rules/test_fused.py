@@ -0,0 +1,94 @@
+import unittest
+
+from pathlib import Path
+from typing import Dict, List
+from benchmarks import CorpusSpec, generate_corpus
+from benchmarks.suite import create_context
+from mddocformatter import ProcessingSettings, ProcessingContext, Document, DocumentRule, DeploymentStyle, rules
+
+
+GLOSSARY_TEXT = """# Glossary
+### Example
+__*Synonyms: Demo, Demonstration*__
+An example of a glossary term.
+
+### Test Term
+An example of a multi-word term.
+"""
+
+DOCUMENTS = {
+    "glossary.md": GLOSSARY_TEXT,
+    "toc.md": "Intro ${name}\n${create_table_of_contents} and ${name} ${create_table_of_contents}\n# Heading ${name}\n"
+    "## Sub\n```\n${create_table_of_contents}\n${name}\n```\n### Last Example",
+    "code toc.md": "`${create_table_of_contents}` ${upper(a, ${name})}\n# A ${name}\n# B-c",
+    "backtick toc.md": "${create_table_of_contents}\n# One ${name}\n## Two `code`\n`${name}`",
+    "macro toc.md": "${upper(${create_table_of_contents})}\n$${create_table_of_contents}{name}",
+    "links.md": "See [the glossary](glossary.md) and [Sub](sub/page.md#sub-heading) for an Example.\n"
+    "`Demo` [x](missing.md) [y](sub/page.md#Other) a test term\n```\n[z](toc.md)\n```\n"
+    "[v](sub/page.md#sub%20heading%20%28beta%29) [w](sub/page.md#other%20%60code%60) Demonstration ` `\n"
+    "[`Demo` page](sub/page.md) [a `b]`](c.md)",
+    "sub/page.md": "# Sub Heading (beta)\n# Other `code`\nA [link](../links.md) to a Demo.",
+}
+
+
+def _run(rule_set: List[DocumentRule], documents: Dict[str, str]) -> Dict[str, str]:
+    root_dir = Path(__file__).parent / "data" / "docs"
+    settings = ProcessingSettings(
+        root_dir,
+        root_dir / "out",
+        rule_set=rule_set,
+        const_macros={"name": "Value"},
+        function_macros={"upper": lambda *x: ",".join(x).upper()},
+    )
+    context = ProcessingContext(settings)
+    for name, contents in documents.items():
+        context.add_document(Document(root_dir / name, contents))
+    context.run()
+    return {name: context.documents[root_dir / name].contents for name in documents}
+
+
+class TestFused(unittest.TestCase):
+    def test_fuse_rules(self):
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)
+        expected = [rules.fused_toc_and_macros, rules.fused_links_and_glossary, rules.rename_uniquely_for_confluence]
+        self.assertListEqual(expected, rules.fuse_rules(rule_set))
+        github = rules.GetRulesForStyle(DeploymentStyle.GITHUB)
+        self.assertListEqual(github, rules.fuse_rules(github))
+
+    def test_fuse_rules_keeps_rules_between(self):
+        rule = rules.DocumentRule(lambda c, d: None, "*.md")
+        rule_set = [rules.create_table_of_contents, rule, rules.apply_macros]
+        self.assertListEqual(rule_set, rules.fuse_rules(rule_set))
+        rule_set = [rules.apply_macros, rules.create_table_of_contents]
+        self.assertListEqual(rule_set, rules.fuse_rules(rule_set))
+
+    def test_same_results(self):
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)
+        expected = _run(rule_set, DOCUMENTS)
+        actual = _run(rules.fuse_rules(rule_set), DOCUMENTS)
+        for name in DOCUMENTS:
+            with self.subTest(name=name):
+                self.assertEqual(expected[name], actual[name])
+
+    def test_same_results_without_glossary(self):
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)
+        documents = {"a.md": "[b](b.md) ${name}", "b.md": "# B"}
+        with self.assertLogs("mddocformatter.rules", "WARNING") as logs:
+            expected = _run(rule_set, documents)
+        with self.assertLogs("mddocformatter.rules", "WARNING") as fused_logs:
+            self.assertDictEqual(expected, _run(rules.fuse_rules(rule_set), documents))
+        self.assertListEqual(logs.output, fused_logs.output)
+
+    def test_same_results_on_corpus(self):
+        corpus = generate_corpus(CorpusSpec(pages=30, page_size=2000))
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)
+        results = []
+        for rules_to_run in [rule_set, rules.fuse_rules(rule_set)]:
+            context = create_context(corpus, rules_to_run)
+            context.run()
+            results.append({x: (y.contents, y.target_path) for x, y in context.documents.items()})
+        self.assertDictEqual(results[0], results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
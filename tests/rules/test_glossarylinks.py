@@ -1,7 +1,8 @@
 import unittest
 
+from unittest.mock import patch
 from pathlib import Path
-from mddocformatter import ProcessingSettings, ProcessingContext, Document, rules
+from mddocformatter import ProcessingSettings, ProcessingContext, Document, rules, loading
 
 
 GLOSSARY_TEXT = """# Glossary
@@ -96,6 +97,52 @@ class TestGlossaryLinks(unittest.TestCase):
             doc.contents,
         )
 
+    def test_shorter_term_overlapping_longer_term_uses_next_occurrence(self):
+        context = self._createContext()
+        doc = Document(
+            Path(context.settings.root_directory / "test" / "test.md"), "A Test Term then a Term then a Test."
+        )
+        rules.add_glossary_links(context, doc)
+        self.assertEqual(
+            "A [Test Term](<../glossary data/glossary.md#Test Term>) then a Term then a Test.",
+            doc.contents,
+        )
+
+    def test_skip_term_with_existing_glossary_link(self):
+        context = self._createContext()
+        doc = Document(
+            Path(context.settings.root_directory / "test" / "test.md"),
+            "A [demo](<../glossary data/glossary.md#example>) and another demo.",
+        )
+        rules.add_glossary_links(context, doc)
+        self.assertEqual("A [demo](<../glossary data/glossary.md#example>) and another demo.", doc.contents)
+
+    def test_skip_term_in_code(self):
+        context = self._createContext()
+        doc = Document(
+            Path(context.settings.root_directory / "test" / "test.md"),
+            "`An Example`\n```\nExample\n```\nAn Example.",
+        )
+        rules.add_glossary_links(context, doc)
+        self.assertEqual(
+            "`An Example`\n```\nExample\n```\nAn [Example](<../glossary data/glossary.md#Example>).", doc.contents
+        )
+
+    def test_glossary_not_linked_to_itself(self):
+        context = self._createContext()
+        glossary = context.get_document_by_name("glossary.md")
+        rules.add_glossary_links(context, glossary)
+        self.assertTrue(glossary.unchanged)
+
+    def test_glossary_processed_once_per_context(self):
+        context = self._createContext()
+        with patch.object(loading, "process_glossary", wraps=loading.process_glossary) as mock:
+            for i in range(3):
+                doc = Document(Path(context.settings.root_directory / "test" / f"test{i}.md"), "An Example.")
+                rules.add_glossary_links(context, doc)
+                self.assertEqual("An [Example](<../glossary data/glossary.md#Example>).", doc.contents)
+            mock.assert_called_once()
+
     def test_no_glossary(self):
         settings = ProcessingSettings(root_directory=Path(__file__).parent / "data" / "docs")
         context = ProcessingContext(settings)
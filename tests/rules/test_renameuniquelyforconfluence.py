@@ -134,6 +134,54 @@ class TestRenameUniquelyForConfluence(unittest.TestCase):
             with self.subTest(i=i):
                 self.assertFalse(rules.path_is_confluence_style(root_directory, case, version_name))
 
+    def test_naming_plan(self):
+        root_directory = Path(__file__).parent / "data" / "docs"
+        target_directory = Path(__file__).parent / "data" / "processed"
+        plan = rules.ConfluenceNamingPlan(root_directory, target_directory, "beta")
+        paths = [root_directory / "a" / "readme.md", root_directory / "a" / "b" / "c.md"]
+        self.assertListEqual([], plan.plan(paths))
+        self.assertEqual(target_directory / "beta" / "beta - a" / "beta - a.md", plan.target(paths[0]))
+        expected = target_directory / "beta" / "beta - a" / "beta - a - b" / "beta - a - b - c.md"
+        self.assertEqual(expected, plan.target(paths[1]))
+
+    def test_naming_plan_collisions(self):
+        root_directory = Path(__file__).parent / "data" / "docs"
+        plan = rules.ConfluenceNamingPlan(root_directory, root_directory / "out", "")
+        paths = [root_directory / "a" / "b" / "c.md", root_directory / "a" / "B - c.md", root_directory / "a" / "d.md"]
+        with self.assertLogs("mddocformatter.rules", "WARNING"):
+            collisions = plan.plan(paths)
+        self.assertListEqual([(paths[0], paths[1], "a - B - c")], collisions)
+        self.assertListEqual([], plan.plan(paths))
+
+    def test_rule_uses_context_plan(self):
+        root_directory = Path(__file__).parent / "data" / "docs"
+        settings = ProcessingSettings(root_directory=root_directory, target_directory=root_directory / "out")
+        context = ProcessingContext(settings)
+        doc = Document(root_directory / "sub dir" / "general.md", "")
+        context.add_document(doc)
+        rules.rename_uniquely_for_confluence(context, doc)
+        plan = rules.get_confluence_naming_plan(context)
+        self.assertIs(plan, rules.get_confluence_naming_plan(context))
+        self.assertEqual(root_directory / "out" / "sub dir" / "sub dir - general.md", doc.target_path)
+
+    def test_collisions_reported_once_with_worker_processes(self):
+        root_directory = Path(__file__).parent / "data" / "docs"
+        settings = ProcessingSettings(
+            root_directory=root_directory,
+            target_directory=root_directory / "out",
+            rule_set=[rules.rename_uniquely_for_confluence],
+            jobs=2,
+        )
+        context = ProcessingContext(settings)
+        paths = [root_directory / "a" / "b" / "c.md", root_directory / "a" / "B - c.md"]
+        paths.extend(root_directory / "a" / f"d{i}.md" for i in range(6))
+        for path in paths:
+            context.add_document(Document(path, ""))
+        with self.assertLogs("mddocformatter.rules", "WARNING") as logs:
+            context.run()
+        self.assertEqual(1, len(logs.output))
+        self.assertListEqual([(paths[0], paths[1], "a - B - c")], rules.get_confluence_naming_plan(context).collisions)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -139,6 +139,35 @@ class TestSanitizeInternalLinks(unittest.TestCase):
         rules.santize_internal_links(context, doc)
         self.assertEqual(expected, doc.contents)
 
+    def test_link_in_code_unchanged(self):
+        case = (
+            "`[link](sub%20dir/relative%20-%20file.md)`\n"
+            "```\n[link](sub%20dir/relative%20-%20file.md)\n```\n"
+            "[link](sub%20dir/relative%20-%20file.md)"
+        )
+        expected = (
+            "`[link](sub%20dir/relative%20-%20file.md)`\n"
+            "```\n[link](sub%20dir/relative%20-%20file.md)\n```\n"
+            "[link](<../sub dir/relative - file.md>)"
+        )
+        context, doc = self._create_test_data(case)
+        rules.santize_internal_links(context, doc)
+        self.assertEqual(expected, doc.contents)
+
+    def test_link_containing_code(self):
+        case = "[`Foo` page](sub%20dir/relative%20-%20file.md) and `[link](sub%20dir/relative%20-%20file.md)`"
+        expected = "[`Foo` page](<../sub dir/relative - file.md>) and `[link](sub%20dir/relative%20-%20file.md)`"
+        context, doc = self._create_test_data(case)
+        rules.santize_internal_links(context, doc)
+        self.assertEqual(expected, doc.contents)
+
+    def test_link_before_subsection_link(self):
+        case = "[a](sub%20dir/relative%20-%20file.md) and [b](sub%20dir/relative%20-%20file.md#sub%20-%20section)"
+        expected = "[a](<../sub dir/relative - file.md>) and [b](<../sub dir/relative - file.md#sub - section>)"
+        context, doc = self._create_test_data(case)
+        rules.santize_internal_links(context, doc)
+        self.assertEqual(expected, doc.contents)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,47 @@
+import os
+import unittest
+
+from pathlib import Path
+from mddocformatter import Document
+from mddocformatter.rules._utils import form_relative_link
+
+
+def _reference(source: Path, linked: Path) -> str:
+    common = Path(os.path.commonpath([linked, source]))
+    return os.path.join(os.path.relpath(common, source.parent), os.path.relpath(linked, common)).replace("\\", "/")
+
+
+class TestFormRelativeLink(unittest.TestCase):
+    def test_matches_path_arithmetic(self):
+        root = Path(__file__).parent / "data" / "docs"
+        paths = [
+            root / "x.md",
+            root / "y.md",
+            root / "a" / "x.md",
+            root / "a" / "b" / "y.md",
+            root / "c" / "d" / "z.md",
+            Path("x.md"),
+            Path("y.md"),
+            Path("a") / "y.md",
+        ]
+        for source in paths:
+            for linked in paths:
+                if source.is_absolute() != linked.is_absolute():
+                    continue
+                with self.subTest(source=source, linked=linked):
+                    self.assertEqual(_reference(source, linked), form_relative_link(Document(source), Document(linked)))
+
+    def test_same_directory(self):
+        self.assertEqual("./y.md", form_relative_link(Document(Path("/d/x.md")), Document(Path("/d/y.md"))))
+
+    def test_target_path_changed(self):
+        source, linked = Document(Path("/d/x.md")), Document(Path("/d/y.md"))
+        self.assertEqual("./y.md", form_relative_link(source, linked))
+        linked.target_path = Path("/d/e/y.md")
+        self.assertEqual("./e/y.md", form_relative_link(source, linked))
+        source.target_path = Path("/f/x.md")
+        self.assertEqual("../d/e/y.md", form_relative_link(source, linked))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from mddocformatter._ahocorasick import AhoCorasick
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_overlapping_matches(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        expected = [(1, 1), (2, 0), (2, 3), (8, 2), (10, 1), (11, 0)]
+        self.assertListEqual(expected, list(automaton.iter_matches("ushers ahishe")))
+
+    def test_no_matches(self):
+        automaton = AhoCorasick(["abc"])
+        self.assertListEqual([], list(automaton.iter_matches("ab bc ac")))
+
+    def test_empty_patterns_ignored(self):
+        automaton = AhoCorasick(["", "a"])
+        self.assertListEqual([(0, 1), (1, 1)], list(automaton.iter_matches("aa")))
+
+    def test_nested_patterns(self):
+        automaton = AhoCorasick(["example term", "term", "example"])
+        self.assertListEqual([(0, 2), (0, 0), (8, 1)], list(automaton.iter_matches("example term")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import math
+import unittest
+import tempfile
+
+from pathlib import Path
+from mddocformatter import BenchResult, DeploymentStyle, bench_docs, compare_results, rules, run_bench
+
+DOCS_DIR = Path(__file__).parent / "data" / "docs"
+
+
+def _snapshot(directory: Path) -> dict:
+    return {x: x.read_bytes() for x in directory.glob("**/*") if x.is_file()}
+
+
+class TestBench(unittest.TestCase):
+    def test_compare_flags_significant_slowdown(self):
+        baseline = BenchResult(3, {"total": [1.0, 1.01, 0.99]}, {"apply_macros": [0.5, 0.5, 0.5]})
+        current = BenchResult(3, {"total": [1.5, 1.51, 1.49]}, {"apply_macros": [0.5, 0.51, 0.49]})
+        slowdowns = compare_results(current, baseline)
+        self.assertListEqual(["phase total"], [x.name for x in slowdowns])
+        self.assertAlmostEqual(1.5, slowdowns[0].ratio)
+
+    def test_compare_ignores_noise(self):
+        baseline = BenchResult(3, {"total": [1.0, 1.5, 0.5]})
+        current = BenchResult(3, {"total": [1.2, 1.7, 0.7]})
+        self.assertListEqual([], compare_results(current, baseline))
+
+    def test_compare_ignores_small_slowdowns(self):
+        baseline = BenchResult(3, {"total": [1.0, 1.0, 1.0]})
+        current = BenchResult(3, {"total": [1.01, 1.01, 1.01]})
+        self.assertListEqual([], compare_results(current, baseline))
+        self.assertEqual(1, len(compare_results(current, baseline, threshold=0.0)))
+
+    def test_compare_ignores_timings_missing_from_baseline(self):
+        baseline = BenchResult(1, {"total": [1.0]})
+        current = BenchResult(1, {"total": [1.0], "pass first": [1.0]}, {"my_rule": [1.0]})
+        self.assertListEqual([], compare_results(current, baseline))
+
+    def test_result_round_trip(self):
+        result = BenchResult(2, {"total": [1.0, 2.0]}, {"apply_macros": [0.5, 0.25]})
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            path = Path(tempdir) / "bench.json"
+            result.save(path)
+            loaded = BenchResult.load(path)
+        self.assertEqual(2, loaded.runs)
+        self.assertDictEqual(result.phases, loaded.phases)
+        self.assertDictEqual(result.rules, loaded.rules)
+
+    def test_result_version_checked(self):
+        with self.assertRaises(ValueError):
+            BenchResult.from_json({"version": -1, "documents": 0, "phases": {}, "rules": {}})
+
+    def test_run_records_phases_and_rules(self):
+        before = _snapshot(DOCS_DIR)
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)
+        result = run_bench(DOCS_DIR, rule_set, version_name="test", runs=2)
+        self.assertDictEqual(before, _snapshot(DOCS_DIR))
+        self.assertEqual(2, result.runs)
+        self.assertEqual(len(before), result.documents)
+        for phase in ["discovery", "load", "pass first", "pass link_updating", "pass finalize", "save", "total"]:
+            self.assertEqual(2, len(result.phases[phase]), phase)
+        self.assertSetEqual({x.name for x in rule_set}, set(result.rules.keys()))
+
+    def test_bench_docs_against_baseline(self):
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.GITHUB)
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            output_path = Path(tempdir) / "bench.json"
+            self.assertTrue(bench_docs(DOCS_DIR, rule_set, runs=1, output_path=output_path))
+            with open(output_path, "r") as fd:
+                data = json.load(fd)
+            self.assertIn("total", data["phases"])
+            data["phases"]["total"] = [0.0]
+            baseline_path = Path(tempdir) / "baseline.json"
+            with open(baseline_path, "w") as fd:
+                json.dump(data, fd)
+            self.assertFalse(bench_docs(DOCS_DIR, rule_set, runs=1, baseline_path=baseline_path))
+
+    def test_slowdown_ratio_without_baseline_time(self):
+        result = compare_results(BenchResult(1, {"total": [1.0]}), BenchResult(1, {"total": [0.0]}))
+        self.assertTrue(math.isinf(result[0].ratio))
+
+
+if __name__ == "__main__":
+    unittest.main()
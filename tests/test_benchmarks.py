@@ -0,0 +1,63 @@
+import math
+import unittest
+
+from benchmarks import (
+    RULES,
+    BenchmarkResult,
+    CorpusSpec,
+    benchmark_end_to_end,
+    benchmark_rule,
+    generate_corpus,
+    scaling_curve,
+    scaling_exponent,
+)
+
+
+class TestCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        spec = CorpusSpec(pages=10, page_size=500)
+        self.assertEqual(generate_corpus(spec).documents, generate_corpus(spec).documents)
+        other = generate_corpus(CorpusSpec(pages=10, page_size=500, seed=1))
+        self.assertNotEqual(generate_corpus(spec).documents, other.documents)
+
+    def test_shape(self):
+        corpus = generate_corpus(CorpusSpec(pages=20, depth=2, page_size=1000, glossary_size=5))
+        self.assertEqual(21, len(corpus.documents))
+        self.assertEqual(5, corpus.documents["glossary.md"].count("### "))
+        self.assertTrue(any(name.count("/") == 2 for name in corpus.documents))
+        self.assertTrue(all(len(x) >= 1000 for name, x in corpus.documents.items() if name != "glossary.md"))
+
+    def test_densities(self):
+        corpus = generate_corpus(CorpusSpec(pages=5, link_density=0.0, macro_density=0.0, glossary_size=0))
+        text = "".join(corpus.documents.values())
+        self.assertNotIn("](<", text)
+        self.assertNotIn("${badge(", text)
+
+
+class TestSuite(unittest.TestCase):
+    def test_benchmark_rules(self):
+        corpus = generate_corpus(CorpusSpec(pages=5, page_size=500))
+        for rule in RULES:
+            with self.subTest(rule=rule.name):
+                result = benchmark_rule(rule, corpus, repeat=1)
+                self.assertEqual(6, result.pages)
+                self.assertGreater(result.pages_per_second, 0)
+
+    def test_benchmark_end_to_end(self):
+        result = benchmark_end_to_end(generate_corpus(CorpusSpec(pages=5, page_size=500)), repeat=1)
+        self.assertEqual(6, result.pages)
+
+    def test_scaling_curve(self):
+        results = scaling_curve(lambda x: BenchmarkResult("test", len(x.documents), x.size, 1.0), CorpusSpec(), [2, 4])
+        self.assertEqual([3, 5], [x.pages for x in results])
+
+    def test_scaling_exponent(self):
+        linear = [BenchmarkResult("linear", 1, size, size * 0.001) for size in (100, 200, 400)]
+        quadratic = [BenchmarkResult("quadratic", 1, size, size**2 * 0.001) for size in (100, 200, 400)]
+        self.assertAlmostEqual(1.0, scaling_exponent(linear))
+        self.assertAlmostEqual(2.0, scaling_exponent(quadratic))
+        self.assertTrue(math.isnan(scaling_exponent(linear[:1])))
+
+
+if __name__ == "__main__":
+    unittest.main()
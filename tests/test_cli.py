@@ -256,6 +256,117 @@ class TestCLI(unittest.TestCase):
                 )
                 self.assertTrue(validate)
 
+    def test_jobs_option(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                args = cli.parse_options(["--input", "input_file_path", "--jobs", "4"])
+                self.assertEqual(4, args.jobs)
+
+    def test_jobs_default(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                args = cli.parse_options(["--input", "input_file_path"])
+                self.assertEqual(1, args.jobs)
+
+    def test_jobs_invalid(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                for i, case in enumerate(["0", "-1", "many"]):
+                    with self.subTest(i=i):
+                        with self.assertRaises(SystemExit):
+                            cli.parse_options(["--input", "input_file_path", "--jobs", case])
+
+    def test_incremental_option(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                self.assertFalse(cli.parse_options(["--input", "input_file_path"]).incremental)
+                self.assertTrue(cli.parse_options(["--input", "input_file_path", "--incremental"]).incremental)
+                with self.assertRaises(SystemExit):
+                    cli.parse_options(["--input", "input_file_path", "--incremental", "--validate"])
+
+    def test_fused_option(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                args = cli.parse_options(["--input", "input_file_path", "--fused"])
+                self.assertListEqual(
+                    rules.fuse_rules(rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)), args.rule_set
+                )
+                self.assertListEqual(args.rule_set, args.base_rules)
+
+    def test_watch_option(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                self.assertFalse(cli.parse_options(["--input", "input_file_path"]).watch)
+                self.assertTrue(cli.parse_options(["--input", "input_file_path", "--watch"]).watch)
+                with self.assertRaises(SystemExit):
+                    cli.parse_options(["--input", "input_file_path", "--watch", "--validate"])
+                with self.assertRaises(SystemExit):
+                    cli.parse_options(["--input", "input_file_path", "--watch", "--incremental"])
+
+    def test_bench_option(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_isdir:
+                mock_exists.return_value = True
+                mock_isdir.return_value = True
+                self.assertIsNone(cli.parse_options(["--input", "input_file_path"]).bench)
+                self.assertEqual(3, cli.parse_options(["--input", "input_file_path", "--bench", "3"]).bench)
+                for i, case in enumerate(
+                    [["--bench", "0"], ["--bench", "2", "--validate"], ["--bench", "2", "--watch"]]
+                ):
+                    with self.subTest(i=i):
+                        with self.assertRaises(SystemExit):
+                            cli.parse_options(["--input", "input_file_path"] + case)
+
+    def test_run_bench(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_is_dir:
+                with patch.object(cli, "bench_docs") as mock_bench_docs:
+                    with patch.object(cli, "process_docs") as mock_process_docs:
+                        mock_exists.return_value = True
+                        mock_is_dir.return_value = True
+                        mock_bench_docs.return_value = False
+                        self.assertFalse(cli.run(["--input", "input_file_path", "--bench", "2"]))
+                        self.assertEqual(2, mock_bench_docs.call_args.kwargs["runs"])
+                        mock_process_docs.assert_not_called()
+
+    def test_run_trace(self):
+        def _is_dir(v: Path):
+            return not v.name.endswith(".json")
+
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir", new=_is_dir):
+                with patch.object(cli, "process_docs") as mock_process_docs:
+                    with patch.object(cli, "trace_to") as mock_trace_to:
+                        mock_exists.return_value = True
+                        mock_process_docs.return_value = True
+                        cli.run(["--input", "input_file_path", "--trace", "trace.json"])
+                        mock_trace_to.assert_called_once_with(Path("trace.json").resolve())
+                        mock_process_docs.assert_called_once()
+
+    def test_run_watch(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_is_dir:
+                with patch.object(cli, "watch_docs") as mock_watch_docs:
+                    with patch.object(cli, "process_docs") as mock_process_docs:
+                        mock_exists.return_value = True
+                        mock_is_dir.return_value = True
+                        mock_watch_docs.return_value = True
+                        self.assertTrue(cli.run(["--input", "input_file_path", "--watch"]))
+                        mock_watch_docs.assert_called_once()
+                        mock_process_docs.assert_not_called()
+
     def test_run_process(self):
         with patch.object(Path, "exists") as mock_exists:
             with patch.object(Path, "is_dir") as mock_is_dir:
@@ -282,6 +393,27 @@ class TestCLI(unittest.TestCase):
                         mock_process_docs.assert_not_called()
                         mock_validate_docs.assert_called_once()
 
+    def test_run_validate_fail_fast(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_is_dir:
+                with patch.object(cli, "validate_docs") as mock_validate_docs:
+                    mock_exists.return_value = True
+                    mock_is_dir.return_value = True
+                    mock_validate_docs.return_value = False
+                    self.assertFalse(cli.run(["--input", "input_file_path", "--validate", "--fail-fast", "--no-diff"]))
+                    _, kwargs = mock_validate_docs.call_args
+                    self.assertTrue(kwargs["fail_fast"])
+                    self.assertFalse(kwargs["show_changes"])
+
+    def test_fail_fast_requires_validate(self):
+        with patch.object(Path, "exists") as mock_exists:
+            with patch.object(Path, "is_dir") as mock_is_dir:
+                mock_exists.return_value = True
+                mock_is_dir.return_value = True
+                for argv in [["--fail-fast"], ["--no-diff"]]:
+                    with self.assertRaises(SystemExit):
+                        cli.parse_options(["--input", "input_file_path"] + argv)
+
 
 if __name__ == "__main__":
     unittest.main()
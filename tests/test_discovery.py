@@ -0,0 +1,100 @@
+import os
+import unittest
+import tempfile
+
+from pathlib import Path
+from mddocformatter import DocumentScanner, IgnoreRules, discover_documents
+
+
+def _write(root: Path, *names: str):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+
+
+class TestIgnoreRules(unittest.TestCase):
+    def test_patterns(self):
+        rules = IgnoreRules("", ["# comment", "", "*.png", "build/", "/top.md", "docs/**/draft*", "!keep.png"])
+        cases = [
+            ("image.png", False, True),
+            ("sub/image.png", False, True),
+            ("sub/keep.png", False, False),
+            ("build", True, True),
+            ("build", False, None),
+            ("sub/build", True, True),
+            ("top.md", False, True),
+            ("sub/top.md", False, None),
+            ("docs/a/b/draft 1.md", False, True),
+            ("docs/draft.md", False, True),
+            ("readme.md", False, None),
+        ]
+        for path, is_directory, expected in cases:
+            with self.subTest(path=path, is_directory=is_directory):
+                self.assertEqual(expected, rules.match(path, is_directory))
+
+    def test_relative_to_base(self):
+        rules = IgnoreRules("sub", ["/local.md", "*.tmp"])
+        self.assertTrue(rules.match("sub/local.md", False))
+        self.assertIsNone(rules.match("local.md", False))
+        self.assertIsNone(rules.match("other/sub/local.md", False))
+        self.assertTrue(rules.match("sub/deeper/x.tmp", False))
+        self.assertIsNone(rules.match("x.tmp", False))
+
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory(prefix="mddocformatter")
+        self.root = Path(self._tempdir.name).resolve()
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+
+    def _relative(self, paths):
+        return [x.relative_to(self.root).as_posix() for x in paths]
+
+    def test_finds_all_files_in_order(self):
+        _write(self.root, "b.md", "a.md", "LICENSE", "sub/c.md", "sub/deeper/d.md", "other/e.md")
+        expected = ["LICENSE", "a.md", "b.md", "other/e.md", "sub/c.md", "sub/deeper/d.md"]
+        for jobs in [1, 4]:
+            with self.subTest(jobs=jobs):
+                self.assertListEqual(expected, self._relative(discover_documents(self.root, jobs=jobs)))
+
+    def test_prunes_ignored_directories(self):
+        _write(self.root, "a.md", ".git/HEAD", "node_modules/x/readme.md", ".mddocformatter/manifest.json")
+        self.assertListEqual(["a.md"], self._relative(discover_documents(self.root)))
+
+    def test_excludes_output_directory(self):
+        _write(self.root, "a.md", "out/a.md")
+        self.assertListEqual(["a.md"], self._relative(discover_documents(self.root, [self.root / "out"])))
+        self.assertListEqual(["a.md", "out/a.md"], self._relative(discover_documents(self.root, [self.root])))
+
+    def test_ignore_files(self):
+        _write(self.root, "a.md", "b.tmp", "drafts/x.md", "sub/c.md", "sub/d.md", "sub/e.tmp")
+        (self.root / ".gitignore").write_text("*.tmp\ndrafts/\n!sub/e.tmp\n")
+        (self.root / "sub" / ".mdignore").write_text("d.md\n")
+        self.assertListEqual(
+            [".gitignore", "a.md", "sub/.mdignore", "sub/c.md", "sub/e.tmp"],
+            self._relative(discover_documents(self.root)),
+        )
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "Symlinks aren't supported.")
+    def test_symlinks_deduplicated(self):
+        _write(self.root, "real/a.md", "b.md")
+        try:
+            os.symlink(self.root / "real", self.root / "z link", target_is_directory=True)
+            os.symlink(self.root / "b.md", self.root / "c.md")
+            os.symlink(self.root, self.root / "real" / "loop", target_is_directory=True)
+        except OSError:
+            self.skipTest("Unable to create symlinks.")
+        self.assertListEqual(["b.md", "real/a.md"], self._relative(discover_documents(self.root)))
+
+    def test_generator(self):
+        _write(self.root, "a.md", "sub/b.md")
+        scan = DocumentScanner(self.root).scan()
+        self.assertEqual(self.root / "a.md", next(scan))
+        scan.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+
+from fnmatch import fnmatch
+from pathlib import Path
+from unittest.mock import patch
+from mddocformatter import Document, Passes, rules
+from mddocformatter._execution import DispatchPlan, FeatureIndex, RuleStatistics, apply_rules
+
+
+def _noop(context, document):
+    pass
+
+
+class TestDispatchPlan(unittest.TestCase):
+    def test_file_filter_matches_fnmatch(self):
+        paths = ["/docs/readme.md", "/docs/image.png", "/docs/sub/page.MD", "/docs/[x].md", "/notes.txt"]
+        for file_filter in ["*.md", "*.*", "*/sub/*", "*.[mM][dD]", "/docs/?mage.png", "*[!t]"]:
+            rule = rules.DocumentRule(_noop, file_filter)
+            for path in paths:
+                with self.subTest(file_filter=file_filter, path=path):
+                    self.assertEqual(fnmatch(path, file_filter), rule.applies_to(path))
+
+    def test_rules_grouped_by_pass_and_filtered(self):
+        first = rules.DocumentRule(_noop, "*.md")
+        second = rules.DocumentRule(_noop, "*.*", Passes.LINK_UPDATING)
+        third = rules.DocumentRule(_noop, "*.png")
+        markdown, image = Document(Path("doc.md")), Document(Path("image.png"))
+        plan = DispatchPlan([first, second, third], [markdown, image])
+        self.assertListEqual([first, third], plan.passes[Passes.FIRST])
+        self.assertListEqual([first], plan.rules_for(Passes.FIRST, markdown))
+        self.assertListEqual([third], plan.rules_for(Passes.FIRST, image))
+        self.assertListEqual([second], plan.rules_for(Passes.LINK_UPDATING, image))
+        self.assertListEqual([], plan.rules_for(Passes.FINALIZE, markdown))
+
+    def test_paths_resolved_once(self):
+        rule_set = [rules.DocumentRule(_noop, "*.md"), rules.DocumentRule(_noop, "*.md", Passes.FINALIZE)]
+        documents = [Document(Path(f"{i}.md")) for i in range(3)]
+        resolved_paths: dict = {}
+        with patch.object(Path, "resolve", autospec=True, side_effect=lambda x: x) as mock_resolve:
+            plan = DispatchPlan(rule_set, documents, resolved_paths)
+            for index in Passes:
+                for document in documents:
+                    plan.rules_for(index, document)
+            DispatchPlan(rule_set, documents, resolved_paths)
+            self.assertEqual(3, mock_resolve.call_count)
+
+    def test_unplanned_document(self):
+        rule = rules.DocumentRule(_noop, "*.md")
+        plan = DispatchPlan([rule])
+        self.assertListEqual([rule], plan.rules_for(Passes.FIRST, Document(Path("late.md"))))
+
+
+class TestTriggers(unittest.TestCase):
+    def test_rule_skipped_without_triggers(self):
+        calls = []
+
+        def links(context, document):
+            calls.append(("links", document))
+
+        def macros(context, document):
+            calls.append(("macros", document))
+
+        def always(context, document):
+            calls.append(("always", document))
+
+        rule_set = [
+            rules.DocumentRule(links, "*.md", triggers=["]("]),
+            rules.DocumentRule(macros, "*.md", triggers=["${", "$["]),
+            rules.DocumentRule(always, "*.md"),
+        ]
+        plain, linked = Document(Path("plain.md"), "text"), Document(Path("linked.md"), "[a](b.md) $[x]")
+        features = FeatureIndex(rule_set)
+        statistics: dict = {}
+        for document in [plain, linked]:
+            apply_rules(None, document, rule_set, features=features, rule_statistics=statistics)
+        self.assertListEqual([("always", plain), ("links", linked), ("macros", linked), ("always", linked)], calls)
+        self.assertEqual((1, 1), (statistics["links"].runs, statistics["links"].skips))
+        self.assertEqual((2, 0), (statistics["always"].runs, statistics["always"].skips))
+
+    def test_features_rescanned_after_change(self):
+        rule = rules.DocumentRule(_noop, "*.md", triggers=["${"])
+        document = Document(Path("doc.md"), "text")
+        features = FeatureIndex([rule])
+        self.assertFalse(features.triggered(rule, document))
+        document.contents = "${macro}"
+        self.assertTrue(features.triggered(rule, document))
+
+    def test_unscanned_without_triggers(self):
+        document = Document(Path("doc.md"), None)
+        features = FeatureIndex([rules.DocumentRule(_noop, "*.md")])
+        self.assertTrue(features.triggered(rules.DocumentRule(_noop, "*.md"), document))
+        self.assertFalse(document.loaded)
+
+    def test_statistics(self):
+        statistics = RuleStatistics(1, 3)
+        statistics.add(RuleStatistics(1, 1))
+        self.assertEqual(2, statistics.runs)
+        self.assertAlmostEqual(4 / 6, statistics.skip_rate)
+
+    def test_builtin_triggers(self):
+        self.assertTupleEqual(("${",), rules.apply_macros.triggers)
+        self.assertTupleEqual(("](",), rules.santize_internal_links.triggers)
+        self.assertTupleEqual((), rules.add_glossary_links.triggers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
+import re
 import unittest
+import tempfile
+import threading
 
 from pathlib import Path
-from mddocformatter import Document
+from unittest.mock import patch
+from mddocformatter import Document, ProcessingContext, ProcessingSettings, rules
 
 
 class TestLoading(unittest.TestCase):
@@ -32,6 +36,135 @@ class TestLoading(unittest.TestCase):
         doc.contents = "Line 1\n" "Line 5\n" "Line 3\n"
         self.assertEqual("-Line 2\n+Line 5\n", doc.changes(0))
 
+    def test_document_iter_changes(self):
+        doc = Document(Path(), "Line 1\n" "Line 2\n" "Line 3\n")
+        doc.contents = "Line 1\n" "Line 5\n" "Line 3\n"
+        self.assertListEqual(["-Line 2\n", "+Line 5\n"], list(doc.iter_changes(0)))
+        doc.contents = doc.original_contents
+        self.assertListEqual([], list(doc.iter_changes(0)))
+
+
+class TestLazyDocument(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tempdir.name)
+        self.path = self.root / "doc.md"
+        self.path.write_text("contents")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_contents_read_on_first_use(self):
+        doc = Document(self.path, None)
+        self.assertFalse(doc.loaded)
+        self.assertTrue(doc.unchanged)
+        self.assertEqual(len("contents"), doc.size)
+        self.assertFalse(doc.loaded)
+        self.assertEqual("contents", doc.contents)
+        self.assertTrue(doc.loaded)
+        self.assertFalse(doc.modified)
+
+    def test_load(self):
+        doc = Document(self.path, None)
+        self.assertEqual(len("contents"), doc.load())
+        self.assertTrue(doc.loaded)
+        self.assertFalse(doc.modified)
+        self.assertEqual("contents", doc.contents)
+        self.assertEqual(0, doc.load())
+
+    def test_set_contents_without_reading(self):
+        doc = Document(self.path, None)
+        doc.contents = "changed"
+        self.assertTrue(doc.modified)
+        self.assertEqual("contents", doc.original_contents)
+        self.assertFalse(doc.unchanged)
+
+    def test_release(self):
+        doc = Document(self.path, None)
+        doc.contents = "changed"
+        self.path.write_text("saved")
+        doc.release()
+        self.assertFalse(doc.loaded)
+        self.assertEqual("saved", doc.contents)
+
+    def test_restore_reads_previous_output_on_first_use(self):
+        output = self.root / "out.md"
+        output.write_text("previous output")
+        doc = Document(self.path, None)
+        doc.contents = "changed"
+        doc.restore(output)
+        self.assertFalse(doc.loaded)
+        self.assertEqual(output, doc.source_path)
+        self.assertEqual(len("previous output"), doc.size)
+        self.assertEqual("previous output", doc.contents)
+        self.assertEqual(self.path, doc.input_path)
+
+    def test_edit_kept_when_another_thread_loads_concurrently(self):
+        doc = Document(self.path, None)
+        started, finish = threading.Event(), threading.Event()
+        read = Document._read
+
+        def _read(document: Document):
+            if threading.current_thread() is not threading.main_thread():  # e.g. a rule reading a linked document.
+                started.set()
+                finish.wait(5)
+            return read(document)
+
+        with patch.object(Document, "_read", _read):
+            reader = threading.Thread(target=lambda: doc.spans)
+            reader.start()
+            self.assertTrue(started.wait(5))
+            threading.Timer(0.1, finish.set).start()
+            doc.contents = doc.contents.upper()
+            reader.join()
+        self.assertEqual("CONTENTS", doc.contents)
+
+    def test_move_does_not_read(self):
+        settings = ProcessingSettings(root_directory=self.root, target_directory=self.root / "out")
+        doc = Document(self.path, None)
+        rules.move_to_target_dir_relative(ProcessingContext(settings), doc)
+        self.assertEqual(self.root / "out" / "doc.md", doc.target_path)
+        self.assertFalse(doc.loaded)
+
+
+class TestDocumentEdit(unittest.TestCase):
+    def test_replacements_applied_on_commit(self):
+        doc = Document(Path(), "a1 b22 c333")
+        with doc.edit() as edit:
+            for match in edit.matches(re.compile(r"\d+")):
+                edit.replace(match.start(), match.end(), str(len(match.group(0))))
+            self.assertEqual("a1 b22 c333", doc.contents)
+        self.assertEqual("a1 b2 c3", doc.contents)
+
+    def test_no_replacements_leaves_contents(self):
+        doc = Document(Path(), "contents")
+        contents = doc.contents
+        with doc.edit() as edit:
+            self.assertIsNone(edit.find(re.compile("missing")))
+        self.assertFalse(edit.changed)
+        self.assertIs(contents, doc.contents)
+
+    def test_find_moves_cursor(self):
+        doc = Document(Path(), "x x x")
+        edit = doc.edit()
+        self.assertEqual(0, edit.find(re.compile("x")).start())
+        self.assertEqual(2, edit.find(re.compile("x")).start())
+        self.assertEqual(3, edit.pointer)
+
+    def test_overlapping_replacement_raises(self):
+        edit = Document(Path(), "abcdef").edit()
+        edit.replace(2, 4, "")
+        with self.assertRaises(ValueError):
+            edit.replace(3, 5, "")
+
+    def test_not_committed_on_exception(self):
+        doc = Document(Path(), "abc")
+        with self.assertRaises(RuntimeError):
+            with doc.edit() as edit:
+                edit.replace(0, 1, "x")
+                raise RuntimeError()
+        self.assertEqual("abc", doc.contents)
+
 
 if __name__ == "__main__":
     unittest.main()
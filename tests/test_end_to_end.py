@@ -62,6 +62,27 @@ class TestEndToEnd(unittest.TestCase):
             result = cli.run(["--input", tempdir, "--style", "confluence", "--validate"])
             self.assertTrue(result)
 
+    def test_process_test_docs_confluence_style_parallel(self):
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            cli.run(
+                [
+                    "--input",
+                    str(Path(__file__).parent / "data" / "docs"),
+                    "--output",
+                    tempdir,
+                    "--style",
+                    "confluence",
+                    "--version",
+                    "test",
+                    "--jobs",
+                    "2",
+                ]
+            )
+            files = list(Path(tempdir).glob("**/*.*"))
+            self.assertEqual(4, len(files))
+            result = cli.run(["--input", tempdir, "--style", "confluence", "--version", "test", "--validate"])
+            self.assertTrue(result)
+
     def test_validate_test_docs_github_style_fail(self):
         result = cli.run(
             [
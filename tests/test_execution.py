@@ -0,0 +1,134 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+from benchmarks import CorpusSpec, generate_corpus
+from mddocformatter import (
+    ProcessingSettings,
+    ProcessingContext,
+    Document,
+    DeploymentStyle,
+    ExecutionBackend,
+    discover_documents,
+    rules,
+    Passes,
+)
+from mddocformatter._execution import chunk_documents
+
+
+@rules.document_rule("*.md")
+def _append_name(context: ProcessingContext, document: Document):
+    document.contents += document.input_path.stem
+
+
+@rules.document_rule("*.md", Passes.LINK_UPDATING)
+def _append_link_count(context: ProcessingContext, document: Document):
+    document.contents += str(sum(1 for x in context.documents.values() if x.contents.startswith("doc")))
+
+
+@rules.document_rule("*.*")
+def _move(context: ProcessingContext, document: Document):
+    document.target_path = context.settings.target_directory / document.input_path.name
+
+
+class TestExecution(unittest.TestCase):
+    @staticmethod
+    def _create_context(backend: ExecutionBackend) -> ProcessingContext:
+        root_dir = Path(__file__).parent / "data" / "docs"
+        settings = ProcessingSettings(
+            root_directory=root_dir,
+            target_directory=Path(__file__).parent / "data" / "processed",
+            rule_set=[_append_name, _append_link_count, _move],
+            jobs=3,
+            backend=backend,
+        )
+        context = ProcessingContext(settings)
+        for i in range(10):
+            context.add_document(Document(root_dir / f"doc{i}.md", "doc " * i))
+        context.add_document(Document(root_dir / "image.png", "not markdown"))
+        return context
+
+    def test_threads_read_shared_documents_deterministically(self):
+        corpus = generate_corpus(CorpusSpec(pages=60, page_size=2000))
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            root_dir = Path(tempdir)
+            corpus.write(root_dir)
+            results = []
+            for backend, jobs in [(ExecutionBackend.THREAD, 1)] + [(ExecutionBackend.THREAD, 4)] * 5:
+                settings = ProcessingSettings(
+                    root_directory=root_dir,
+                    target_directory=root_dir / "out",
+                    rule_set=rules.GetRulesForStyle(DeploymentStyle.GITHUB),
+                    const_macros=corpus.const_macros,
+                    function_macros=corpus.function_macros,
+                    jobs=jobs,
+                    backend=backend,
+                )
+                context = ProcessingContext(settings)
+                context.add_documents(discover_documents(root_dir), load=False)  # read lazily, as the rules use them.
+                context.run()
+                results.append({x: (y.contents, y.target_path) for x, y in context.documents.items()})
+        for i, result in enumerate(results[1:]):
+            with self.subTest(run=i):
+                self.assertDictEqual(results[0], result)
+
+    def test_chunk_documents_balanced(self):
+        documents = [Document(Path(f"{i}.md"), "x" * size) for i, size in enumerate([1000, 10, 10, 10, 10, 10])]
+        chunks = chunk_documents(documents, 2)
+        self.assertEqual(2, len(chunks))
+        self.assertListEqual([documents[0]], chunks[0])
+        self.assertListEqual(documents[1:], chunks[1])
+
+    def test_chunk_documents_more_chunks_than_documents(self):
+        documents = [Document(Path(f"{i}.md"), "x") for i in range(3)]
+        chunks = chunk_documents(documents, 8)
+        self.assertEqual(3, len(chunks))
+
+    def test_run_parallel_matches_serial(self):
+        serial = self._create_context(ExecutionBackend.PROCESS)
+        serial.settings.jobs = 1
+        serial.run()
+        for backend in ExecutionBackend:
+            with self.subTest(backend=backend):
+                context = self._create_context(backend)
+                context.run()
+                for path, document in serial.documents.items():
+                    self.assertEqual(document.contents, context.documents[path].contents)
+                    self.assertEqual(document.target_path, context.documents[path].target_path)
+
+    def test_macro_statistics_merged_from_workers(self):
+        for backend in ExecutionBackend:
+            with self.subTest(backend=backend):
+                context = self._create_context(backend)
+                context.settings.rules = [rules.apply_macros]
+                context.settings.const_macros = {"name": "value"}
+                for document in context.documents.values():
+                    document.contents = "${name}"
+                context.run()
+                self.assertEqual(10, context.macro_statistics["name"].uses)
+
+    def test_rule_timings_merged_from_workers(self):
+        for backend in ExecutionBackend:
+            with self.subTest(backend=backend):
+                context = self._create_context(backend)
+                context.run()
+                self.assertSetEqual({"_append_name", "_append_link_count", "_move"}, set(context.rule_timings.keys()))
+                self.assertSetEqual({"pass first", "pass link_updating", "pass finalize"}, set(context.timings.keys()))
+
+    def test_rule_statistics_merged_from_workers(self):
+        for backend in ExecutionBackend:
+            with self.subTest(backend=backend):
+                context = self._create_context(backend)
+                context.settings.rules = [rules.apply_macros, _move]
+                context.settings.const_macros = {"name": "value"}
+                for i in range(4):
+                    context.documents[context.settings.root_directory / f"doc{i}.md"].contents = "${name}"
+                context.run()
+                self.assertEqual(4, context.rule_statistics["apply_macros"].runs)
+                self.assertEqual(6, context.rule_statistics["apply_macros"].skips)
+                self.assertEqual(11, context.rule_statistics["_move"].runs)
+                self.assertEqual("value", context.documents[context.settings.root_directory / "doc0.md"].contents)
+
+
+if __name__ == "__main__":
+    unittest.main()
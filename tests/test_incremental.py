@@ -0,0 +1,123 @@
+import shutil
+import unittest
+import tempfile
+
+from pathlib import Path
+from mddocformatter import ProcessingContext, Document, DeploymentStyle, rules, process_docs, loading
+from mddocformatter._consts import CACHE_DIRECTORY_NAME, MANIFEST_FILE_NAME
+from mddocformatter._incremental import Manifest
+
+processed = []
+
+
+@rules.document_rule("*.md")
+def _record_processed(context: ProcessingContext, document: Document):
+    processed.append(document.input_path.relative_to(context.settings.root_directory).as_posix())
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory(prefix="mddocformatter")
+        self.input_dir = Path(self.tempdir.name) / "input"
+        self.output_dir = Path(self.tempdir.name) / "output"
+        shutil.copytree(Path(__file__).parent / "data" / "docs", self.input_dir)
+        processed.clear()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _process(self, version_name="test", const_macros=None, function_macros=None):
+        processed.clear()
+        rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE) + [_record_processed]
+        process_docs(
+            self.input_dir,
+            self.output_dir,
+            rule_set,
+            const_macros,
+            function_macros,
+            version_name=version_name,
+            incremental=True,
+        )
+        return sorted(processed)
+
+    def test_first_build_processes_everything(self):
+        result = self._process()
+        self.assertEqual(4, len(result))
+        manifest = Manifest.load(self.output_dir / CACHE_DIRECTORY_NAME / MANIFEST_FILE_NAME)
+        self.assertEqual(4, len(manifest.documents))
+        self.assertIn("sub section 1/README.md", manifest.documents["README.md"].documents)
+        self.assertIn("Glossary.md", manifest.documents["README.md"].documents)
+
+    def test_unchanged_build_processes_nothing(self):
+        self._process()
+        self.assertListEqual([], self._process())
+
+    def test_changed_document_and_dependents_processed(self):
+        self._process()
+        with open(self.input_dir / "sub section 1" / "README.md", "a") as fd:
+            fd.write("\nA new line.\n")
+        self.assertListEqual(["README.md", "sub section 1/README.md"], self._process())
+
+    def test_changed_document_processes_dependents_of_dependents(self):
+        (self.input_dir / "a.md").write_text("# A\n[B](b.md)")
+        (self.input_dir / "b.md").write_text("# B\n[C](c.md)")
+        (self.input_dir / "c.md").write_text("# C")
+        self._process()
+        with open(self.input_dir / "c.md", "a") as fd:
+            fd.write("\nA new line.\n")
+        self.assertListEqual(["a.md", "b.md", "c.md"], self._process())
+
+    def test_changed_glossary_processes_dependents(self):
+        self._process()
+        with open(self.input_dir / "Glossary.md", "a") as fd:
+            fd.write("\n### New Term\n")
+        self.assertEqual(4, len(self._process()))
+
+    def test_missing_output_is_processed(self):
+        self._process()
+        (self.output_dir / "test" / "test - sub section 2" / "test - sub section 2.md").unlink()
+        self.assertListEqual(["sub section 2/README.md"], self._process())
+
+    def test_changed_version_processes_everything(self):
+        self._process()
+        self.assertEqual(4, len(self._process(version_name="other")))
+
+    def test_changed_macro_processes_users(self):
+        with open(self.input_dir / "sub section 2" / "README.md", "a") as fd:
+            fd.write("\n${author}\n")
+        self._process(const_macros={"author": "a", "unused": "b"})
+        self.assertListEqual([], self._process(const_macros={"author": "a", "unused": "c"}))
+        self.assertListEqual(["sub section 2/README.md"], self._process(const_macros={"author": "b", "unused": "c"}))
+        output = self.output_dir / "test" / "test - sub section 2" / "test - sub section 2.md"
+        self.assertTrue(output.read_text().endswith("\nb\n"))
+
+    def test_changed_macro_helper_processes_users(self):
+        with open(self.input_dir / "sub section 2" / "README.md", "a") as fd:
+            fd.write("\n${f(x)}\n")
+        module = 'def f(a):\n    return _h()\n\n\ndef _h():\n    return "{}"\n'
+        _, function_macros = loading.load_macros_from_module_contents(module.format("one"))
+        self._process(function_macros=function_macros)
+        self.assertListEqual([], self._process(function_macros=function_macros))
+        _, function_macros = loading.load_macros_from_module_contents(module.format("two"))
+        self.assertIn("sub section 2/README.md", self._process(function_macros=function_macros))
+        output = self.output_dir / "test" / "test - sub section 2" / "test - sub section 2.md"
+        self.assertTrue(output.read_text().endswith("\ntwo\n"))
+
+    def test_binary_file_kept_across_builds(self):
+        image = bytes(range(256)) * 4
+        (self.input_dir / "image.png").write_bytes(image)
+        self._process()
+        with open(self.input_dir / "sub section 1" / "README.md", "a") as fd:
+            fd.write("\nA new line.\n")
+        self.assertListEqual(["README.md", "sub section 1/README.md"], self._process())
+        manifest = Manifest.load(self.output_dir / CACHE_DIRECTORY_NAME / MANIFEST_FILE_NAME)
+        self.assertEqual(image, Path(manifest.documents["image.png"].target_path).read_bytes())
+
+    def test_new_document_processes_everything(self):
+        self._process()
+        (self.input_dir / "new.md").write_text("# New")
+        self.assertEqual(5, len(self._process()))
+
+
+if __name__ == "__main__":
+    unittest.main()
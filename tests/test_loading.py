@@ -1,4 +1,6 @@
+import os
 import unittest
+import tempfile
 
 from unittest.mock import patch
 from mddocformatter import loading, Document
@@ -53,6 +55,39 @@ class TestLoading(unittest.TestCase):
                 with self.assertRaises(IsADirectoryError):
                     loading.load_document(Path())
 
+    def test_save_unread_document_copies(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = Path(tempdir) / "image.png"
+            path.write_bytes(b"\x89PNG\xff")
+            document = loading.load_document(path)
+            document.target_path = Path(tempdir) / "out" / "image.png"
+            loading.save_document(document)
+            self.assertFalse(document.loaded)
+            self.assertEqual(b"\x89PNG\xff", document.target_path.read_bytes())
+
+    def test_save_skips_identical_target(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            document = Document(Path(tempdir) / "doc.md", "hello\nworld\n")
+            document.target_path = Path(tempdir) / "out" / "doc.md"
+            self.assertTrue(loading.save_document(document))
+            os.utime(document.target_path, ns=(0, 0))
+            self.assertFalse(loading.save_document(document))
+            self.assertEqual(0, document.target_path.stat().st_mtime_ns)
+            document.contents = "hello\nthere\n"
+            self.assertTrue(loading.save_document(document))
+            self.assertEqual("hello\nthere\n", document.target_path.read_text())
+            self.assertListEqual(["doc.md"], os.listdir(document.target_path.parent))
+
+    @unittest.skipIf(os.name == "nt", "POSIX permissions.")
+    def test_save_keeps_permissions(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            document = Document(Path(tempdir) / "doc.md", "new")
+            document.target_path.write_text("old")
+            document.target_path.chmod(0o640)
+            self.assertTrue(loading.save_document(document))
+            self.assertEqual(0o640, document.target_path.stat().st_mode & 0o777)
+            self.assertEqual("new", document.target_path.read_text())
+
     def test_load_macros_from_module_contents(self):
         const_macros, function_macros = loading.load_macros_from_module_contents(MACROS_TEXT)
         self.assertIn("author", const_macros)
@@ -62,6 +97,11 @@ class TestLoading(unittest.TestCase):
         self.assertIn("capitalize", function_macros)
         self.assertTrue(callable(function_macros["capitalize"]))
 
+    def test_load_macros_skips_impure_macro_decorator(self):
+        text = "from mddocformatter import impure_macro\n\n\n@impure_macro\ndef now():\n    return 'now'\n"
+        _, function_macros = loading.load_macros_from_module_contents(text)
+        self.assertListEqual(["now"], list(function_macros))
+
     def test_macros_loading(self):
         with patch.object(loading, "load_document") as mock:
             mock.return_value = Document(Path("macros.py"), MACROS_TEXT)
@@ -113,6 +153,31 @@ class TestLoading(unittest.TestCase):
             ]
             self.assertListEqual(expected, glossary_data)
 
+    def test_process_glossary_with_cache(self):
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            expected = loading.process_glossary(GLOSSARY_TEXT)
+            self.assertListEqual(expected, loading.process_glossary_with_cache(GLOSSARY_TEXT, Path(tempdir)))
+            self.assertEqual(1, len(list(Path(tempdir).glob("**/*.json"))))
+            with patch.object(loading, "process_glossary") as mock:
+                self.assertListEqual(expected, loading.process_glossary_with_cache(GLOSSARY_TEXT, Path(tempdir)))
+                mock.assert_not_called()
+
+    def test_process_glossary_with_cache_corrupt(self):
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            loading.process_glossary_with_cache(GLOSSARY_TEXT, Path(tempdir))
+            for path in Path(tempdir).glob("**/*.json"):
+                path.write_text("{")
+            with self.assertLogs("mddocformatter", level="WARNING"):
+                glossary_data = loading.process_glossary_with_cache(GLOSSARY_TEXT, Path(tempdir))
+            self.assertListEqual(loading.process_glossary(GLOSSARY_TEXT), glossary_data)
+
+    def test_process_glossary_duplicate_terms(self):
+        glossary = "".join(f"### Term {i % 10}\n__*Synonyms: Same, Term {i}*__\n" for i in range(100))
+        glossary_data = loading.process_glossary(glossary)
+        self.assertEqual(101, len(glossary_data))
+        self.assertEqual(len(glossary_data), len(set(x[0] for x in glossary_data)))
+        self.assertIn(("same", "Term 0"), glossary_data)
+
     def test_rules_not_py_file(self):
         with self.assertRaises(ValueError):
             loading.load_custom_rules_from_py_file(Path("something.md"))
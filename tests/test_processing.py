@@ -1,4 +1,6 @@
 import unittest
+import tempfile
+import threading
 
 from pathlib import Path
 from unittest.mock import patch, MagicMock
@@ -38,6 +40,89 @@ class TestProcessing(unittest.TestCase):
         with self.assertRaises(ValueError):
             context.add_document(Document(Path("doc.md")))
 
+    def test_context_add_documents(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            root_dir = Path(tempdir)
+            names = [f"doc {i}.md" for i in range(10)]
+            for name in names:
+                (root_dir / name).write_text(name)
+            (root_dir / "image.png").write_bytes(b"\x89PNG\xff\xfe")
+            context = ProcessingContext(ProcessingSettings(root_directory=root_dir, target_directory=root_dir))
+            paths = [root_dir / x for x in names] + [
+                root_dir / "image.png",
+                root_dir / "missing.md",
+                Path("/elsewhere.md"),
+            ]
+            with self.assertLogs("mddocformatter", "ERROR"):
+                report = context.add_documents(paths)
+            self.assertListEqual(paths[:11], list(context.documents.keys()))
+            self.assertTrue(all(context.documents[root_dir / x].loaded for x in names))
+            self.assertEqual("doc 3.md", context.documents[root_dir / "doc 3.md"].contents)
+            self.assertFalse(context.documents[root_dir / "image.png"].loaded)
+            self.assertEqual(10, report.files)
+            self.assertEqual(sum(len(x) for x in names), report.bytes)
+            self.assertListEqual([root_dir / "image.png"], report.unread)
+            self.assertListEqual([root_dir / "missing.md", Path("/elsewhere.md")], [x for x, _ in report.errors])
+            self.assertGreater(report.files_per_second, 0)
+
+    def test_context_add_documents_lazily(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        context = ProcessingContext(ProcessingSettings(root_directory=root_dir, target_directory=root_dir))
+        with self.assertLogs("mddocformatter._processing", "ERROR"):
+            report = context.add_documents([root_dir / "README.md", root_dir / "missing.md"], load=False)
+        self.assertListEqual([root_dir / "README.md"], list(context.documents.keys()))
+        self.assertFalse(context.documents[root_dir / "README.md"].loaded)
+        self.assertEqual(0, report.files)
+        self.assertEqual(1, len(report.errors))
+
+    def test_context_add_documents_reads_while_discovering(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        context = ProcessingContext(ProcessingSettings(root_directory=root_dir, target_directory=root_dir))
+        loaded, load = threading.Event(), Document.load
+
+        def _load(document: Document):
+            result = load(document)
+            loaded.set()
+            return result
+
+        def _paths():
+            yield root_dir / "README.md"
+            self.assertTrue(loaded.wait(5))  # the first document is read before the next path is found.
+            yield root_dir / "Glossary.md"
+
+        with patch.object(Document, "load", _load), patch.object(Path, "exists") as mock_exists:
+            report = context.add_documents(_paths(), verify=False)
+        mock_exists.assert_not_called()
+        self.assertEqual(2, report.files)
+        self.assertListEqual([root_dir / "README.md", root_dir / "Glossary.md"], list(context.documents.keys()))
+
+    def test_context_get_document(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        context = ProcessingContext(ProcessingSettings(root_directory=root_dir, target_directory=root_dir))
+        doc = Document(root_dir / "a" / "doc.md", "")
+        context.add_document(doc)
+        with patch.object(Path, "resolve", side_effect=AssertionError("resolved")):
+            self.assertIs(doc, context.get_document(root_dir / "a" / "doc.md"))
+        for path in [Path("a/doc.md"), root_dir / "b" / ".." / "a" / "." / "doc.md", Path("a/../a/doc.md")]:
+            with self.subTest(path=path):
+                self.assertIs(doc, context.get_document(path))
+        self.assertIsNone(context.get_document(root_dir / "b" / "doc.md"))
+        context.remove_document(doc.input_path)
+        self.assertIsNone(context.get_document(Path("a/doc.md")))
+
+    def test_context_get_document_through_symlink(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            root_dir = Path(tempdir).resolve()
+            (root_dir / "real").mkdir()
+            (root_dir / "real" / "doc.md").write_text("")
+            (root_dir / "link").symlink_to(root_dir / "real", target_is_directory=True)
+            context = ProcessingContext(ProcessingSettings(root_directory=root_dir, target_directory=root_dir))
+            doc = Document(root_dir / "link" / "doc.md", "")
+            context.add_document(doc)
+            self.assertIs(doc, context.get_document(root_dir / "real" / "doc.md"))
+            with patch.object(Path, "resolve", side_effect=AssertionError("resolved")):
+                self.assertIs(doc, context.get_document(root_dir / "real" / "doc.md"))
+
     def test_context_get_document_by_name(self):
         root_dir = Path(__file__).parent / "data" / "docs"
         settings = ProcessingSettings(
@@ -60,6 +145,54 @@ class TestProcessing(unittest.TestCase):
             with self.subTest(i=i):
                 self.assertIsNotNone(context.get_document_by_name(case))
 
+    def test_context_get_document_by_name_precedence(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        context = ProcessingContext(ProcessingSettings(root_directory=root_dir))
+        prefixed = Document(root_dir / "test" / "test - Doc.md")
+        lower = Document(root_dir / "doc.md")
+        first = Document(root_dir / "a" / "Doc.md")
+        second = Document(root_dir / "b" / "Doc.md")
+        for document in (prefixed, lower, first, second):
+            context.add_document(document)
+        self.assertIs(first, context.get_document_by_name("Doc.md"))
+        self.assertIs(lower, context.get_document_by_name("doc.md"))
+        self.assertIs(prefixed, context.get_document_by_name("test - Doc"))
+        self.assertIsNone(context.get_document_by_name("missing.md"))
+
+    def test_context_remove_document(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        context = ProcessingContext(ProcessingSettings(root_directory=root_dir))
+        first, second = Document(root_dir / "a" / "Doc.md"), Document(root_dir / "b" / "Doc.md")
+        context.add_document(first)
+        context.add_document(second)
+        self.assertIs(first, context.remove_document(first.input_path))
+        self.assertIsNone(context.remove_document(first.input_path))
+        self.assertIs(second, context.get_document_by_name("Doc.md"))
+        context.remove_document(second.input_path)
+        self.assertIsNone(context.get_document_by_name("Doc.md"))
+        self.assertEqual(0, len(context.documents))
+
+    def test_context_replace_document(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        context = ProcessingContext(ProcessingSettings(root_directory=root_dir))
+        first, second = Document(root_dir / "a" / "Doc.md"), Document(root_dir / "b" / "Doc.md")
+        context.add_document(first)
+        context.add_document(second)
+        replacement = Document(first.input_path, "new")
+        context.add_document(replacement)
+        self.assertIs(replacement, context.get_document_by_name("Doc.md"))
+        self.assertEqual(2, len(context.documents))
+
+    def test_context_get_resource(self):
+        context = ProcessingContext(ProcessingSettings())
+        factory = MagicMock(return_value="resource")
+        self.assertEqual("resource", context.get_resource("key", factory))
+        self.assertEqual("resource", context.get_resource("key", factory))
+        factory.assert_called_once()
+        context.clear_resources()
+        context.get_resource("key", factory)
+        self.assertEqual(2, factory.call_count)
+
     def test_run(self):
         mock = MagicMock()
         rule = rules.DocumentRule(mock, "*.md", Passes.FINALIZE)
@@ -84,7 +217,7 @@ class TestProcessing(unittest.TestCase):
         )
         context = ProcessingContext(settings)
         context.add_document(Document(root_dir / "doc.md"))
-        with patch("mddocformatter._processing.save_document") as mock:
+        with patch("mddocformatter._saving.save_document") as mock:
             context.save()
             mock.assert_called_once()
 
@@ -92,30 +225,52 @@ class TestProcessing(unittest.TestCase):
         rule_func_mock = MagicMock()
         rule = rules.DocumentRule(rule_func_mock, "*.md", Passes.FINALIZE)
         root_dir = Path(__file__).parent / "data" / "docs"
-        doc_path = root_dir / "doc.md"
-        with patch.object(Path, "glob") as glob_mock:
-            with patch("mddocformatter._processing.load_document") as load_document_mock:
-                with patch("mddocformatter._processing.save_document"):
-                    load_document_mock.return_value = Document(doc_path)
-                    glob_mock.return_value = [doc_path]
-                    result = process_docs(
-                        input_dir=root_dir, output_dir=Path(__file__).parent / "data" / "processed", rule_set=[rule]
-                    )
-                    rule_func_mock.assert_called_once()
-                    self.assertTrue(result)
+        doc_path = root_dir / "README.md"
+        with patch("mddocformatter._processing._discover_documents") as discover_mock:
+            with patch("mddocformatter._saving.save_document"):
+                discover_mock.return_value = [doc_path]
+                result = process_docs(
+                    input_dir=root_dir, output_dir=Path(__file__).parent / "data" / "processed", rule_set=[rule]
+                )
+                rule_func_mock.assert_called_once()
+                self.assertTrue(result)
+
+    def test_process_docs_reads_documents_while_processing(self):
+        root_dir = Path(__file__).parent / "data" / "docs"
+        paths = [root_dir / "README.md", root_dir / "Glossary.md"]
+        loaded, load = threading.Event(), Document.load
+        waited = []
+
+        def _load(document: Document):
+            result = load(document)
+            if document.input_path == paths[1]:
+                loaded.set()
+            return result
+
+        def _rule(context: ProcessingContext, document: Document):
+            if document.input_path == paths[0]:  # the next document is read while the first is processed.
+                waited.append(loaded.wait(5))
+
+        rule = rules.DocumentRule(_rule, "*.md")
+        with patch("mddocformatter._processing._discover_documents") as discover_mock:
+            with patch("mddocformatter._saving.save_document"), patch.object(Document, "load", _load):
+                discover_mock.return_value = paths
+                result = process_docs(
+                    input_dir=root_dir, output_dir=Path(__file__).parent / "data" / "processed", rule_set=[rule]
+                )
+        self.assertTrue(result)
+        self.assertListEqual([True], waited)
 
     def test_validate_docs(self):
         rule_func_mock = MagicMock()
         rule = rules.DocumentRule(rule_func_mock, "*.md", Passes.FINALIZE)
         root_dir = Path(__file__).parent / "data" / "docs"
-        doc_path = root_dir / "doc.md"
-        with patch.object(Path, "glob") as glob_mock:
-            with patch("mddocformatter._processing.load_document") as load_document_mock:
-                load_document_mock.return_value = Document(doc_path)
-                glob_mock.return_value = [doc_path]
-                result = validate_docs(input_dir=root_dir, rule_set=[rule])
-                rule_func_mock.assert_called_once()
-                self.assertTrue(result)
+        doc_path = root_dir / "README.md"
+        with patch("mddocformatter._processing._discover_documents") as discover_mock:
+            discover_mock.return_value = [doc_path]
+            result = validate_docs(input_dir=root_dir, rule_set=[rule])
+            rule_func_mock.assert_called_once()
+            self.assertTrue(result)
 
     def test_validate_docs_invalid(self):
         @rules.document_rule("*.md")
@@ -123,13 +278,11 @@ class TestProcessing(unittest.TestCase):
             d.contents += "hello world"
 
         root_dir = Path(__file__).parent / "data" / "docs"
-        doc_path = root_dir / "doc.md"
-        with patch.object(Path, "glob") as glob_mock:
-            with patch("mddocformatter._processing.load_document") as load_document_mock:
-                load_document_mock.return_value = Document(doc_path)
-                glob_mock.return_value = [doc_path]
-                result = validate_docs(input_dir=root_dir, rule_set=[rule])
-                self.assertFalse(result)
+        doc_path = root_dir / "README.md"
+        with patch("mddocformatter._processing._discover_documents") as discover_mock:
+            discover_mock.return_value = [doc_path]
+            result = validate_docs(input_dir=root_dir, rule_set=[rule])
+            self.assertFalse(result)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+import unittest
+import tempfile
+
+from pathlib import Path
+from unittest.mock import patch
+from mddocformatter import Document, save_documents
+
+
+class TestSaving(unittest.TestCase):
+    def test_report(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            output = Path(tempdir) / "out"
+            documents = [Document(Path(tempdir) / f"{i}.md", f"doc {i}") for i in range(6)]
+            for document in documents:
+                document.target_path = output / "sub" / document.input_path.name
+            (output / "sub").mkdir(parents=True)
+            (output / "sub" / "0.md").write_text("doc 0")
+            report = save_documents(documents, jobs=3)
+            self.assertEqual(5, len(report.written))
+            self.assertListEqual([output / "sub" / "0.md"], report.skipped)
+            self.assertListEqual([], report.failed)
+            self.assertFalse(any(x.loaded for x in documents))
+            self.assertEqual("5 written, 1 already up to date, 0 failed", str(report))
+
+    def test_failures_reported(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            good, bad = Document(Path(tempdir) / "good.md", "good"), Document(Path(tempdir) / "bad.md", "bad")
+            good.target_path = Path(tempdir) / "out" / "good.md"
+            (Path(tempdir) / "file").write_text("not a directory")
+            bad.target_path = Path(tempdir) / "file" / "bad.md"
+            with self.assertLogs("mddocformatter._saving", "ERROR"):
+                report = save_documents([bad, good])
+            self.assertListEqual([good.target_path], report.written)
+            self.assertListEqual([bad.target_path], [x for x, _ in report.failed])
+            self.assertTrue(bad.loaded)
+            self.assertEqual("good", good.target_path.read_text())
+
+    def test_directories_created_once(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            documents = [Document(Path(tempdir) / f"{i}.md", "x") for i in range(4)]
+            for document in documents:
+                document.target_path = Path(tempdir) / "out" / document.input_path.name
+            with patch.object(Path, "mkdir", autospec=True, side_effect=Path.mkdir) as mock_mkdir:
+                save_documents(documents, jobs=1)
+                self.assertEqual(1, mock_mkdir.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import threading
+import unittest
+
+from pathlib import Path
+from typing import List
+from benchmarks import CorpusSpec, generate_corpus
+from benchmarks.suite import create_context
+from mddocformatter import (
+    ProcessingSettings,
+    ProcessingContext,
+    Document,
+    DeploymentStyle,
+    ExecutionBackend,
+    Passes,
+    RuleData,
+    RuleScheduler,
+    rules,
+)
+from mddocformatter._execution import DispatchPlan
+
+DOCS_DIR = Path(__file__).parent / "data" / "docs"
+
+
+def _create_context(names, rule_set, jobs: int) -> ProcessingContext:
+    settings = ProcessingSettings(
+        DOCS_DIR, DOCS_DIR / "out", rule_set=rule_set, jobs=jobs, backend=ExecutionBackend.SCHEDULED
+    )
+    context = ProcessingContext(settings)
+    for name in names:
+        context.add_document(Document(DOCS_DIR / name, name))
+    return context
+
+
+def _blocking_move(blocked: str, event: threading.Event) -> rules.DocumentRule:
+    """:return: A rule which sets the target path of each document, waiting for the event first for one of them."""
+
+    @rules.document_rule("*.md", reads=[], writes=[RuleData.TARGET_PATH])
+    def _move(context: ProcessingContext, document: Document):
+        if document.input_path.name == blocked and not event.wait(5):
+            raise TimeoutError(f"{blocked} was never unblocked.")
+        document.target_path = context.settings.target_directory / document.input_path.name
+
+    return _move
+
+
+def _link_rule(event: threading.Event, reads, seen: list) -> rules.DocumentRule:
+    """:return: A rule which records the target paths of all the documents, then sets the event for a.md."""
+
+    @rules.document_rule("*.md", Passes.LINK_UPDATING, reads=reads, writes=[RuleData.CONTENTS])
+    def _link(context: ProcessingContext, document: Document):
+        seen.append((document.input_path.name, {x.input_path.name: x.target_path for x in context.documents.values()}))
+        if document.input_path.name == "a.md":
+            event.set()
+
+    return _link
+
+
+class TestScheduling(unittest.TestCase):
+    def test_declarations(self):
+        rule = rules.DocumentRule(lambda c, d: None, "*.md")
+        self.assertSetEqual(set(RuleData), set(rule.reads))
+        self.assertSetEqual({RuleData.CONTENTS, RuleData.TARGET_PATH}, set(rule.writes))
+        self.assertSetEqual(set(), set(rules.rename_uniquely_for_confluence.reads))
+        self.assertIn(RuleData.LINKED_TARGET_PATHS, rules.santize_internal_links.reads)
+        with self.assertRaises(ValueError):
+            rules.DocumentRule(lambda c, d: None, "*.md", writes=[RuleData.LINKED_CONTENTS])
+
+    def test_documents_advance_without_waiting_for_the_pass(self):
+        event, seen = threading.Event(), []
+        rule_set = [_blocking_move("b.md", event), _link_rule(event, [RuleData.CONTENTS], seen)]
+        context = _create_context(["a.md", "b.md"], rule_set, jobs=2)
+        context.run()
+        self.assertEqual(2, len(seen))
+        self.assertEqual(DOCS_DIR / "b.md", dict(seen)["a.md"]["b.md"])  # b.md was still waiting to be moved.
+
+    def test_linked_reads_wait_for_earlier_writes(self):
+        event, seen = threading.Event(), []
+        event.set()
+        rule_set = [_blocking_move("", event), _link_rule(event, [RuleData.LINKED_TARGET_PATHS], seen)]
+        names = [f"doc {i}.md" for i in range(12)]
+        context = _create_context(names, rule_set, jobs=3)
+        context.run()
+        self.assertEqual(12, len(seen))
+        for name, targets in seen:
+            with self.subTest(name=name):
+                self.assertDictEqual({x: DOCS_DIR / "out" / x for x in names}, targets)
+
+    def test_glossary_reads_only_wait_for_the_glossary(self):
+        event, seen = threading.Event(), []
+        rule_set = [_blocking_move("b.md", event), _link_rule(event, [RuleData.GLOSSARY], seen)]
+        context = _create_context(["a.md", "b.md", "glossary.md"], rule_set, jobs=3)
+        context.run()
+        targets = dict(seen)["a.md"]
+        self.assertEqual(DOCS_DIR / "out" / "glossary.md", targets["glossary.md"])
+        self.assertEqual(DOCS_DIR / "b.md", targets["b.md"])
+
+    def test_triggers_are_checked_without_holding_the_condition(self):
+        @rules.document_rule("*.md", reads=[], writes=[RuleData.CONTENTS])
+        def _first(context: ProcessingContext, document: Document):
+            pass
+
+        @rules.document_rule("*.md", Passes.LINK_UPDATING, triggers=["x"], reads=[RuleData.LINKED_CONTENTS])
+        def _link(context: ProcessingContext, document: Document):
+            pass
+
+        context = _create_context([f"doc {i}.md" for i in range(6)], [_first, _link], jobs=2)
+        documents = list(context.documents.values())
+        scheduler = RuleScheduler(context, DispatchPlan(context.settings.rules, documents), documents)
+        free: List[bool] = []
+
+        def _try_condition():
+            if scheduler._condition.acquire(timeout=1):
+                scheduler._condition.release()
+                free.append(True)
+            else:
+                free.append(False)
+
+        def _triggered(rule: rules.DocumentRule, document: Document) -> bool:
+            checker = threading.Thread(target=_try_condition)
+            checker.start()
+            checker.join()
+            return False
+
+        scheduler.plan.features.triggered = _triggered
+        scheduler.run()
+        self.assertTrue(free)
+        self.assertTrue(all(free))
+
+    def test_rule_exception(self):
+        @rules.document_rule("*.md")
+        def _fail(context: ProcessingContext, document: Document):
+            raise RuntimeError("failed")
+
+        for jobs in [1, 2]:
+            with self.subTest(jobs=jobs):
+                context = _create_context([f"doc {i}.md" for i in range(4)], [_fail], jobs)
+                with self.assertRaises(RuntimeError):
+                    context.run()
+
+    def test_same_results_on_corpus(self):
+        corpus = generate_corpus(CorpusSpec(pages=30, page_size=2000))
+        results = []
+        for backend, jobs in [
+            (ExecutionBackend.PROCESS, 1),
+            (ExecutionBackend.SCHEDULED, 1),
+            (ExecutionBackend.SCHEDULED, 3),
+        ]:
+            context = create_context(corpus, rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE))
+            context.settings.backend, context.settings.jobs = backend, jobs
+            context.run()
+            results.append({x: (y.contents, y.target_path) for x, y in context.documents.items()})
+            self.assertSetEqual({"pass first", "pass link_updating", "pass finalize"}, set(context.timings.keys()))
+        self.assertDictEqual(results[0], results[1])
+        self.assertDictEqual(results[0], results[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
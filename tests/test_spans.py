@@ -0,0 +1,122 @@
+import unittest
+
+from pathlib import Path
+from unittest.mock import patch
+from mddocformatter import Document, SpanIndex, SpanType
+
+
+TEXT = """# Title
+Some text with a [link](<other.md>) and `inline [code](x.md)` in it.
+
+```python
+# not a heading
+print("[not a link](y.md)")
+```
+
+## Section
+Unmatched `` backticks and ``` more.
+"""
+
+
+class TestSpanIndex(unittest.TestCase):
+    def _texts(self, index: SpanIndex, span_type: SpanType):
+        return [TEXT[start:end] for start, end in index.spans(span_type)]
+
+    def test_links(self):
+        self.assertEqual(["[link](<other.md>)"], self._texts(SpanIndex(TEXT), SpanType.LINK))
+
+    def test_link_containing_inline_code(self):
+        text = "`[a](x.md)` [`Foo` page](b.md) [b](y `z)`"
+        links = [text[start:end] for start, end in SpanIndex(text).spans(SpanType.LINK)]
+        self.assertEqual(["[`Foo` page](b.md)"], links)
+
+    def test_inline_code(self):
+        self.assertEqual(["`inline [code](x.md)`"], self._texts(SpanIndex(TEXT), SpanType.INLINE_CODE))
+
+    def test_code_fences(self):
+        expected = '```python\n# not a heading\nprint("[not a link](y.md)")\n```'
+        self.assertEqual([expected], self._texts(SpanIndex(TEXT), SpanType.CODE_FENCE))
+
+    def test_headings(self):
+        self.assertEqual(["# Title", "## Section"], self._texts(SpanIndex(TEXT), SpanType.HEADING))
+
+    def test_unclosed_fence_runs_to_end(self):
+        text = "text\n~~~~\ncode\n~~~\nstill code"
+        self.assertEqual([(5, len(text))], SpanIndex(text).spans(SpanType.CODE_FENCE))
+
+    def test_merged_spans_are_sorted(self):
+        index = SpanIndex(TEXT)
+        spans = index.spans(SpanType.LINK, SpanType.INLINE_CODE, SpanType.CODE_FENCE)
+        self.assertEqual(3, len(spans))
+        self.assertEqual(sorted(spans), spans)
+
+    def test_is_protected(self):
+        index = SpanIndex(TEXT)
+        self.assertTrue(index.is_protected(TEXT.index("link")))
+        self.assertTrue(index.is_protected(TEXT.index("inline")))
+        self.assertTrue(index.is_protected(TEXT.index("print")))
+        self.assertFalse(index.is_protected(TEXT.index("Some")))
+        self.assertFalse(index.is_protected(TEXT.index("Title"), SpanType.LINK))
+        self.assertTrue(index.is_protected(TEXT.index("Title"), SpanType.HEADING))
+
+    def test_find(self):
+        index = SpanIndex(TEXT)
+        start = TEXT.index("[link]")
+        self.assertEqual((start, start + len("[link](<other.md>)")), index.find(start + 3, SpanType.LINK))
+        self.assertIsNone(index.find(start - 1, SpanType.LINK))
+
+
+class TestAnchorIndex(unittest.TestCase):
+    def test_exact(self):
+        anchors = SpanIndex("# Intro\n## Sub - Section ##\n```\n# Code\n```\n").anchors
+        self.assertEqual("Intro", anchors.find("intro"))
+        self.assertEqual("Sub - Section", anchors.find("sub---section"))
+        self.assertEqual("Sub - Section", anchors.find("SUB - SECTION"))
+        self.assertIsNone(anchors.find("code"))
+        self.assertIsNone(anchors.find("missing"))
+
+    def test_prefix(self):
+        anchors = SpanIndex("# Setting up\n# Set\n# Settings\n").anchors
+        self.assertEqual("Set", anchors.find("set"))
+        self.assertEqual("Setting", anchors.find("setting"))
+
+    def test_first_heading_wins(self):
+        anchors = SpanIndex("# Usage Notes\n# Usage-notes\n").anchors
+        self.assertEqual("Usage Notes", anchors.find("usage-notes"))
+
+    def test_invalidated_by_contents_change(self):
+        doc = Document(Path("test.md"), "# Before")
+        self.assertEqual("Before", doc.spans.anchors.find("before"))
+        doc.contents = "# After"
+        self.assertIsNone(doc.spans.anchors.find("before"))
+        self.assertEqual("After", doc.spans.anchors.find("after"))
+
+
+class TestDocumentSpans(unittest.TestCase):
+    def test_spans_cached(self):
+        doc = Document(Path("test.md"), TEXT)
+        self.assertIs(doc.spans, doc.spans)
+
+    def test_spans_invalidated_by_contents_change(self):
+        doc = Document(Path("test.md"), TEXT)
+        spans = doc.spans
+        doc.contents = "[a](b.md)"
+        self.assertIsNot(spans, doc.spans)
+        self.assertEqual([(0, 9)], doc.spans.spans(SpanType.LINK))
+
+    def test_spans_of_replaced_contents_not_kept(self):
+        doc = Document(Path("test.md"), TEXT)
+
+        def _index(text: str) -> SpanIndex:
+            if text is TEXT:  # the contents are replaced, e.g. by another thread, while they're being indexed.
+                doc.contents = "[a](b.md)"
+            return SpanIndex(text)
+
+        with patch("mddocformatter._document.SpanIndex", _index):
+            self.assertIs(TEXT, doc.spans.text)
+            self.assertEqual("[a](b.md)", doc.spans.text)
+        self.assertEqual([(0, 9)], doc.spans.spans(SpanType.LINK))
+
+
+if __name__ == "__main__":
+    unittest.main()
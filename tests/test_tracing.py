@@ -0,0 +1,80 @@
+import json
+import unittest
+import tempfile
+
+from pathlib import Path
+from mddocformatter import Document, ExecutionBackend, ProcessingContext, ProcessingSettings, rules, trace, trace_to
+from mddocformatter import DeploymentStyle, process_docs
+from mddocformatter._tracing import active_tracer
+
+DOCS_DIR = Path(__file__).parent / "data" / "docs"
+
+
+@rules.document_rule("*.md")
+def _append_name(context: ProcessingContext, document: Document):
+    document.contents += document.input_path.stem
+
+
+class TestTracing(unittest.TestCase):
+    def test_disabled_by_default(self):
+        self.assertIsNone(active_tracer())
+        with trace("nothing", "test"):
+            pass
+        with trace_to(None) as tracer:
+            self.assertIsNone(tracer)
+            self.assertIsNone(active_tracer())
+
+    def test_spans_recorded_and_saved(self):
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            path = Path(tempdir) / "trace.json"
+            with trace_to(path) as tracer:
+                self.assertIs(tracer, active_tracer())
+                with trace("outer", "test", detail="value"):
+                    with trace("inner", "test"):
+                        pass
+            self.assertIsNone(active_tracer())
+            with open(path, "r") as fd:
+                data = json.load(fd)
+        spans = {x["name"]: x for x in data["traceEvents"] if x["ph"] == "X"}
+        self.assertSetEqual({"outer", "inner"}, set(spans.keys()))
+        self.assertEqual("value", spans["outer"]["args"]["detail"])
+        self.assertLessEqual(spans["outer"]["ts"], spans["inner"]["ts"])
+        self.assertGreaterEqual(spans["outer"]["dur"], spans["inner"]["dur"])
+        self.assertTrue(any(x["ph"] == "M" and x["name"] == "process_name" for x in data["traceEvents"]))
+
+    def test_process_docs_phases(self):
+        with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+            with trace_to(Path(tempdir) / "trace.json") as tracer:
+                rule_set = rules.GetRulesForStyle(DeploymentStyle.CONFLUENCE)
+                process_docs(DOCS_DIR, Path(tempdir) / "output", rule_set, version_name="test")
+        assert tracer is not None
+        names = {(x["cat"], x["name"]) for x in tracer.events}
+        for phase in ["discovery", "pass first", "pass link_updating", "pass finalize", "save"]:
+            self.assertIn(("phase", phase), names)
+        self.assertIn(("load", "load_document"), names)
+        self.assertIn(("save", "save_document"), names)
+        self.assertIn(("rule", "santize_internal_links"), names)
+        rule_event = next(x for x in tracer.events if x["cat"] == "rule")
+        self.assertIn("document", rule_event["args"])
+
+    def test_worker_tracks(self):
+        for backend in ExecutionBackend:
+            with self.subTest(backend=backend):
+                root_dir = DOCS_DIR
+                settings = ProcessingSettings(root_dir, root_dir, rule_set=[_append_name], jobs=2, backend=backend)
+                context = ProcessingContext(settings)
+                for i in range(8):
+                    context.add_document(Document(root_dir / f"doc{i}.md", "doc"))
+                with tempfile.TemporaryDirectory(prefix="mddocformatter") as tempdir:
+                    with trace_to(Path(tempdir) / "trace.json") as tracer:
+                        context.run()
+                assert tracer is not None
+                rule_events = [x for x in tracer.events if x["cat"] == "rule"]
+                self.assertEqual(8, len(rule_events))
+                tracks = {(x["pid"], x["tid"]) for x in rule_events}
+                main = [x for x in tracer.events if x["name"] == "pass first"][0]
+                self.assertNotIn((main["pid"], main["tid"]), tracks)
+
+
+if __name__ == "__main__":
+    unittest.main()
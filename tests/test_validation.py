@@ -0,0 +1,56 @@
+import unittest
+
+from pathlib import Path
+from mddocformatter import Document, diff_documents, is_unchanged, validate_documents, validate_docs, rules
+
+
+def _document(name: str, original: str, contents: str | None = None) -> Document:
+    document = Document(Path(name), original)
+    if contents is not None:
+        document.contents = contents
+    return document
+
+
+class TestValidation(unittest.TestCase):
+    def test_is_unchanged(self):
+        self.assertTrue(is_unchanged(_document("a.md", "text")))
+        self.assertTrue(is_unchanged(_document("a.md", "text", "te" + "xt")))
+        self.assertFalse(is_unchanged(_document("a.md", "text", "text!")))
+        self.assertFalse(is_unchanged(_document("a.md", "text", "TEXT")))
+
+    def test_validate_documents(self):
+        documents = [_document("a.md", "a"), _document("b.md", "b", "B"), _document("c.md", "c", "C")]
+        report = validate_documents(documents)
+        self.assertFalse(report.valid)
+        self.assertEqual(3, report.checked)
+        self.assertListEqual(documents[1:], report.invalid)
+        self.assertEqual("3 checked, 2 invalid", str(report))
+
+    def test_fail_fast(self):
+        documents = [_document("a.md", "a"), _document("b.md", "b", "B"), _document("c.md", "c", "C")]
+        report = validate_documents(documents, fail_fast=True)
+        self.assertEqual(2, report.checked)
+        self.assertListEqual(documents[1:2], report.invalid)
+        self.assertTrue(report.stopped)
+
+    def test_diff_documents(self):
+        documents = [_document(f"{i}.md", f"line\n{i}\n", f"line\n{i + 1}\n") for i in range(3)]
+        expected = [(x, x.changes(0)) for x in documents]
+        for jobs in [1, 2]:
+            with self.subTest(jobs=jobs):
+                self.assertListEqual(expected, [(x, "".join(y)) for x, y in diff_documents(documents, 0, jobs)])
+
+    def test_validate_docs_without_changes(self):
+        @rules.document_rule("*.md")
+        def rule(c, d: Document):
+            d.contents += "hello world"
+
+        root_dir = Path(__file__).parent / "data" / "docs"
+        with self.assertLogs(level="WARNING") as logs:
+            self.assertFalse(validate_docs(root_dir, [rule], fail_fast=True, show_changes=False))
+        self.assertEqual(1, len(logs.output))
+        self.assertNotIn("hello world", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import tempfile
+
+from pathlib import Path
+from mddocformatter import ProcessingSettings, Watcher, WatchChanges, rules, loading
+
+
+GLOSSARY_TEXT = """# Glossary
+### Example
+An example of a glossary term.
+"""
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        temp = Path(self.tempdir.name)
+        self.root, self.output, self.macros_path = temp / "docs", temp / "out", temp / "macros.py"
+        self.root.mkdir()
+        self._write("a.md", "Link to [b](b.md) with ${name}.")
+        self._write("b.md", "# B\nAn example.")
+        self._write("c.md", "Uses ${other}.")
+        self._write("glossary.md", GLOSSARY_TEXT)
+        self.macros_path.write_text('name = "x"\nother = "y"\n')
+        const_macros, function_macros = loading.load_macros_from_py_file(self.macros_path)
+        settings = ProcessingSettings(
+            self.root,
+            self.output,
+            rule_set=[
+                rules.apply_macros,
+                rules.santize_internal_links,
+                rules.add_glossary_links,
+                rules.move_to_target_dir_relative,
+            ],
+            const_macros=const_macros,
+            function_macros=function_macros,
+        )
+        self.watcher = Watcher(settings, macros_path=self.macros_path)
+        self.watcher.build()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _write(self, name: str, contents: str):
+        (self.root / name).write_text(contents)
+
+    def _process(self):
+        return sorted(x.input_path.name for x in self.watcher.process(self.watcher.poll()))
+
+    def test_build(self):
+        self.assertEqual("Link to [b](<./b.md>) with x.", (self.output / "a.md").read_text())
+        self.assertEqual("Uses y.", (self.output / "c.md").read_text())
+        self.assertFalse(self.watcher.poll())
+
+    def test_modified_document_and_dependents_processed(self):
+        self._write("b.md", "# B\nChanged, not an example.")
+        self.assertEqual(["a.md", "b.md"], self._process())
+        self.assertIn("Changed", (self.output / "b.md").read_text())
+
+    def test_dependents_of_dependents_processed(self):
+        self._write("d.md", "Link to [a](a.md).")
+        self._process()
+        self._write("b.md", "# B\nChanged, not an example.")
+        self.assertEqual(["a.md", "b.md", "d.md"], self._process())
+
+    def test_failed_save_logged(self):
+        (self.output / "c.md").unlink()
+        (self.output / "c.md").mkdir()
+        self._write("c.md", "Now uses ${name}.")
+        with self.assertLogs("mddocformatter._watch", "ERROR") as logs:
+            self.assertEqual(["c.md"], self._process())
+        self.assertIn(str(self.output / "c.md"), logs.output[0])
+
+    def test_only_modified_document_processed(self):
+        self._write("c.md", "Now uses ${name}.")
+        self.assertEqual(["c.md"], self._process())
+        self.assertEqual("Now uses x.", (self.output / "c.md").read_text())
+
+    def test_macros_reloaded(self):
+        self.macros_path.write_text('name = "x"\nother = "changed"\n')
+        self.assertEqual(["c.md"], self._process())
+        self.assertEqual("Uses changed.", (self.output / "c.md").read_text())
+
+    def test_created_document_processes_everything(self):
+        self._write("d.md", "New.")
+        self.assertEqual(["a.md", "b.md", "c.md", "d.md", "glossary.md"], self._process())
+        self.assertTrue((self.output / "d.md").exists())
+
+    def test_deleted_document(self):
+        (self.root / "b.md").unlink()
+        self.assertEqual(["a.md"], self._process())
+        self.assertFalse((self.output / "b.md").exists())
+        self.assertNotIn(self.root / "b.md", self.watcher.context.documents)
+
+    def test_run_builds_until_stopped(self):
+        self.watcher.context.documents.clear()
+        self.watcher.run(stop=lambda: True)
+        self.assertEqual(4, len(self.watcher.context.documents))
+
+
+class TestWatchChanges(unittest.TestCase):
+    def test_update(self):
+        a, b, c, d = Path("a"), Path("b"), Path("c"), Path("d")
+        changes = WatchChanges(created={a}, modified={b}, deleted={c})
+        changes.update(WatchChanges(created={c}, modified={a, d}, deleted={a, b}))
+        self.assertEqual(set(), changes.created)
+        self.assertEqual({c, d}, changes.modified)
+        self.assertEqual({b}, changes.deleted)
+        self.assertFalse(WatchChanges())
+
+
+if __name__ == "__main__":
+    unittest.main()